@@ -0,0 +1,132 @@
+# Compares throughput and latency of the lecture 1 math api implemented with
+# fastapi and as plain asgi app, both served by uvicorn in a separate process
+# and loaded by keep-alive connections sending requests one after another.
+# Usage:
+#
+#   python -m benchmarks.math_asgi [requests] [connections]
+#
+# e.g. `python -m benchmarks.math_asgi 20000 32`
+import asyncio
+import socket
+import subprocess
+import sys
+from statistics import quantiles
+from sys import argv
+from time import perf_counter, sleep
+
+DEFAULT_REQUESTS = 20_000
+DEFAULT_CONNECTIONS = 32
+
+APPS = {
+    "fastapi": "lecture_1.math_example:app",
+    "plain asgi": "lecture_1.hw.math_plain_asgi:app",
+}
+
+MEAN_BODY = b"[1, 2.5, 3, 4.25, 5]"
+REQUESTS = {
+    "factorial": b"GET /factorial?n=20 HTTP/1.1\r\nhost: bench\r\n\r\n",
+    "fibonacci": b"GET /fibonacci/50 HTTP/1.1\r\nhost: bench\r\n\r\n",
+    "mean": b"GET /mean HTTP/1.1\r\nhost: bench\r\ncontent-type: application/json\r\n"
+    b"content-length: %d\r\n\r\n%s" % (len(MEAN_BODY), MEAN_BODY),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(app: str, port: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            app,
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ]
+    )
+
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return server
+        except ConnectionRefusedError:
+            sleep(0.1)
+
+    server.kill()
+    raise RuntimeError(f"{app} did not start")
+
+
+async def read_response(reader: asyncio.StreamReader) -> None:
+    head = await reader.readuntil(b"\r\n\r\n")
+
+    for line in head.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            await reader.readexactly(int(value))
+            return
+
+    raise RuntimeError("response without content-length")
+
+
+async def connection(port: int, request: bytes, count: int, latencies: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+    for _ in range(count):
+        started = perf_counter()
+        writer.write(request)
+        await read_response(reader)
+        latencies.append(perf_counter() - started)
+
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(port: int, request: bytes, requests: int, connections: int):
+    latencies: list[float] = []
+
+    # warm up
+    await connection(port, request, 100, [])
+
+    started = perf_counter()
+    await asyncio.gather(
+        *(
+            connection(port, request, requests // connections, latencies)
+            for _ in range(connections)
+        )
+    )
+    elapsed = perf_counter() - started
+
+    return len(latencies) / elapsed, quantiles(latencies, n=100)
+
+
+def main(requests: int, connections: int) -> None:
+    print(f"{'app':>10} {'request':>10} {'rps':>8} {'p50, ms':>8} {'p99, ms':>8}")
+
+    for name, app in APPS.items():
+        port = free_port()
+        server = serve(app, port)
+
+        try:
+            for kind, request in REQUESTS.items():
+                rps, percentiles = asyncio.run(
+                    load(port, request, requests, connections)
+                )
+                print(
+                    f"{name:>10} {kind:>10} {rps:>8.0f} "
+                    f"{percentiles[49] * 1e3:>8.2f} {percentiles[98] * 1e3:>8.2f}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in argv[1:]]
+    main(*(sizes + [DEFAULT_REQUESTS, DEFAULT_CONNECTIONS][len(sizes) :]))
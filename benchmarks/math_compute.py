@@ -0,0 +1,83 @@
+# Measures compute layer of the math api on large factorials: latency of a
+# cold request computed by process pool, of concurrent identical requests
+# (coalesced into one computation) and of cached ones, and the longest event
+# loop stall next to computing inline. Usage:
+#
+#   python -m benchmarks.math_compute [n]
+#
+# e.g. `python -m benchmarks.math_compute 100000`
+import asyncio
+from sys import argv, set_int_max_str_digits
+from time import perf_counter
+
+from lecture_1 import compute
+
+DEFAULT_N = 100_000
+CONCURRENT_REQUESTS = 16
+
+
+async def timed_ms(*requests) -> float:
+    started = perf_counter()
+    await asyncio.gather(*requests)
+    return (perf_counter() - started) * 1e3
+
+
+async def stall_ms(n: int) -> float:
+    # longest gap between ticks of event loop while request is served
+    stall = 0.0
+    done = False
+
+    async def tick() -> None:
+        nonlocal stall
+        while not done:
+            started = perf_counter()
+            await asyncio.sleep(0)
+            stall = max(stall, perf_counter() - started)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0)
+    await compute.factorial_text(n)
+    done = True
+    await ticker
+
+    return stall * 1e3
+
+
+async def run(n: int) -> None:
+    compute.use(compute.Limits(max_factorial_n=n, inline_factorial_n=0))
+
+    # starts workers
+    await compute.factorial_text(1)
+
+    cold = await timed_ms(compute.factorial_text(n))
+    misses = compute.cache().stats.misses
+    coalesced = await timed_ms(
+        *(compute.factorial_text(n - 1) for _ in range(CONCURRENT_REQUESTS))
+    )
+    computations = compute.cache().stats.misses - misses
+    cached = await timed_ms(compute.factorial_text(n))
+    offloaded = await stall_ms(n - 2)
+
+    compute.use(compute.Limits(max_factorial_n=n, inline_factorial_n=n))
+    # inline computation can not convert result to decimal above the limit
+    set_int_max_str_digits(0)
+    inline = await stall_ms(n - 3)
+
+    print(f"{n}! has {len(await compute.factorial_text(n))} digits")
+    print(f"cold request: {cold:.1f}ms, cached: {cached:.3f}ms")
+    print(
+        f"{CONCURRENT_REQUESTS} concurrent requests: {coalesced:.1f}ms, "
+        f"{computations} computations"
+    )
+    print(f"event loop stall: {offloaded:.1f}ms offloaded, {inline:.1f}ms inline")
+
+
+def main(n: int) -> None:
+    try:
+        asyncio.run(run(n))
+    finally:
+        compute.shutdown()
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in argv[1:]] or [DEFAULT_N])
@@ -0,0 +1,87 @@
+# Compares fibonacci of the math api computed by fast doubling (cold and with
+# checkpoints of a close number cached) with the former loop of additions, and
+# measures the longest event loop stall while large numbers are requested.
+# Usage:
+#
+#   python -m benchmarks.math_fibonacci [max n]
+#
+# e.g. `python -m benchmarks.math_fibonacci 1000000`
+import asyncio
+from sys import argv, set_int_max_str_digits
+from time import perf_counter
+
+from lecture_1 import compute
+
+DEFAULT_MAX_N = 1_000_000
+# loop of additions is quadratic, so it is measured for smaller numbers only
+MAX_LOOP_N = 200_000
+CONCURRENT_REQUESTS = 8
+
+
+def loop(n: int) -> int:
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+
+    return a
+
+
+def elapsed_ms(f, *args) -> float:
+    started = perf_counter()
+    f(*args)
+    return (perf_counter() - started) * 1e3
+
+
+async def stall_ms(n: int) -> float:
+    # longest gap between ticks of event loop while requests are served
+    stall = 0.0
+    done = False
+
+    async def tick() -> None:
+        nonlocal stall
+        while not done:
+            started = perf_counter()
+            await asyncio.sleep(0)
+            stall = max(stall, perf_counter() - started)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.gather(
+        *(compute.fibonacci_text(n + i) for i in range(CONCURRENT_REQUESTS))
+    )
+    done = True
+    await ticker
+
+    return stall * 1e3
+
+
+def main(max_n: int) -> None:
+    print(f"{'n':>9} {'loop, ms':>10} {'cold, ms':>10} {'close, ms':>10}")
+
+    n = 1_000
+    while n <= max_n:
+        compute._pair.cache_clear()
+        cold = elapsed_ms(compute.fibonacci, n)
+        close = elapsed_ms(compute.fibonacci, n + 1)
+        looped = f"{elapsed_ms(loop, n):>10.2f}" if n <= MAX_LOOP_N else f"{'-':>10}"
+
+        print(f"{n:>9} {looped} {cold:>10.2f} {close:>10.2f}")
+        n *= 10
+
+    compute.use(compute.Limits(max_fibonacci_n=2 * max_n))
+    offloaded = asyncio.run(stall_ms(max_n))
+
+    compute.use(compute.Limits(max_fibonacci_n=2 * max_n, inline_fibonacci_n=2 * max_n))
+    compute._recent.clear()
+    # inline computation can not convert result to decimal above the limit
+    set_int_max_str_digits(0)
+    inline = asyncio.run(stall_ms(max_n))
+    compute.shutdown()
+
+    print(
+        f"event loop stall serving {CONCURRENT_REQUESTS} x F({max_n}): "
+        f"{offloaded:.1f}ms offloaded, {inline:.1f}ms inline"
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in argv[1:]] or [DEFAULT_MAX_N])
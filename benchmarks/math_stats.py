@@ -0,0 +1,82 @@
+# Measures `/mean` and `/stats` aggregation of the math api on a large body:
+# streamed through incremental parser by chunks (json array and raw float64)
+# next to validating whole json body as list of floats first, as fastapi did
+# for `data: list[float]`. Reports throughput and peak memory allocated while
+# body is aggregated. Usage:
+#
+#   python -m benchmarks.math_stats [body MiB]
+#
+# e.g. `python -m benchmarks.math_stats 100`
+import asyncio
+import json
+import random
+import struct
+import tracemalloc
+from functools import partial
+from sys import argv
+from time import perf_counter
+
+from pydantic import TypeAdapter
+
+from lecture_1 import stats
+
+DEFAULT_MIB = 100
+CHUNK_SIZE = 64 << 10
+
+
+async def chunks(body: bytes):
+    view = memoryview(body)
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield bytes(view[start : start + CHUNK_SIZE])
+
+
+def streamed(body: bytes, binary: bool, detailed: bool) -> float:
+    return asyncio.run(stats.aggregate(chunks(body), binary, detailed)).mean
+
+
+def validated(body: bytes) -> float:
+    data = TypeAdapter(list[float]).validate_json(body)
+    return sum(data) / len(data)
+
+
+def measure(name: str, body: bytes, aggregate) -> None:
+    started = perf_counter()
+    aggregate(body)
+    elapsed = perf_counter() - started
+
+    # peak is measured by separate run, as tracing slows allocations down
+    tracemalloc.start()
+    aggregate(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{name:>16} {len(body) / 2**20 / elapsed:>8.1f} {peak / 2**20:>10.1f}")
+
+
+def main(mib: int) -> None:
+    rng = random.Random(0)
+    # json number of `random()` with separator takes about 20 bytes
+    numbers = [rng.random() for _ in range(mib * 2**20 // 20)]
+    text = json.dumps(numbers).encode()
+    binary = struct.pack(f"<{len(numbers)}d", *numbers)
+    del numbers
+
+    print(f"{len(text) / 2**20:.0f} MiB json, {len(binary) / 2**20:.0f} MiB float64")
+    print(f"{'aggregation':>16} {'MiB/s':>8} {'peak, MiB':>10}")
+
+    for detailed, endpoint in [(False, "mean"), (True, "stats")]:
+        for kind, body, binary_body in [
+            ("json", text, False),
+            ("float64", binary, True),
+        ]:
+            measure(
+                f"{kind} {endpoint}",
+                body,
+                partial(streamed, binary=binary_body, detailed=detailed),
+            )
+
+    measure("json validated", text, validated)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in argv[1:]] or [DEFAULT_MIB])
@@ -0,0 +1,58 @@
+# Measures query string parser of lecture 4 next to `urllib.parse.parse_qs`
+# on query strings of different shapes: eager parsing, and lazy view with one
+# parameter read from it. Usage:
+#
+#   python -m benchmarks.parse_qs [repeats]
+#
+# e.g. `python -m benchmarks.parse_qs 20000`
+import urllib.parse
+from functools import partial
+from sys import argv
+from timeit import timeit
+
+from lecture_4.example_parse_qs import parse_qs
+
+DEFAULT_REPEATS = 20_000
+
+QUERY_STRINGS = {
+    "short": "n=10",
+    "plain": "&".join(f"key{i}=value{i}" for i in range(20)),
+    "encoded": urllib.parse.urlencode(
+        [(f"ключ {i}", f"значение {i} & co") for i in range(20)]
+    ),
+    "repeated": "&".join(f"tag=t{i}" for i in range(100)),
+    "long values": urllib.parse.urlencode({f"key{i}": "x/y " * 500 for i in range(5)}),
+}
+
+
+def lazy_read(query_string: bytes) -> None:
+    parse_qs(query_string, lazy=True).get("key1")
+
+
+def main(repeats: int) -> None:
+    print(
+        f"{'query string':>12} {'bytes':>6} {'urllib, µs':>11} "
+        f"{'eager, µs':>10} {'lazy, µs':>9}"
+    )
+
+    for name, query_string in QUERY_STRINGS.items():
+        raw = query_string.encode()
+        results = [
+            timeit(parse, number=repeats) / repeats * 1e6
+            for parse in [
+                # bytes are parsed by urllib only if they are ascii after
+                # unquoting, so it is given text as asgi app would decode it
+                partial(urllib.parse.parse_qs, raw.decode(), keep_blank_values=True),
+                partial(parse_qs, raw),
+                partial(lazy_read, raw),
+            ]
+        ]
+
+        print(
+            f"{name:>12} {len(raw):>6} {results[0]:>11.2f} "
+            f"{results[1]:>10.2f} {results[2]:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in argv[1:]] or [DEFAULT_REPEATS])
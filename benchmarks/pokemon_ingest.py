@@ -0,0 +1,63 @@
+# Compares ingest rate of single-item `POST /pokemon/` with batch
+# `POST /pokemon/batch` (json array and ndjson), requests are sent in-process
+# through ASGI test client. Usage:
+#
+#   python -m benchmarks.pokemon_ingest [batch size]
+import json
+from sys import argv
+from time import perf_counter
+
+from fastapi.testclient import TestClient
+
+from lecture_2.rest_example.main import app
+
+SINGLE_REQUESTS = 2_000
+BATCHES = 20
+DEFAULT_BATCH_SIZE = 5_000
+
+
+def pokemon(i: int) -> dict:
+    return {"name": f"pokemon-{i}", "published": i % 2 == 0}
+
+
+def single(client: TestClient) -> float:
+    started = perf_counter()
+
+    for i in range(SINGLE_REQUESTS):
+        client.post("/pokemon/", json=pokemon(i))
+
+    return SINGLE_REQUESTS / (perf_counter() - started)
+
+
+def batch(client: TestClient, size: int, ndjson: bool) -> float:
+    pokemons = [pokemon(i) for i in range(size)]
+    if ndjson:
+        body = "\n".join(json.dumps(p) for p in pokemons)
+        headers = {"content-type": "application/x-ndjson"}
+    else:
+        body = json.dumps(pokemons)
+        headers = {"content-type": "application/json"}
+
+    started = perf_counter()
+
+    for _ in range(BATCHES):
+        client.post("/pokemon/batch", content=body, headers=headers)
+
+    return BATCHES * size / (perf_counter() - started)
+
+
+def main(size: int) -> None:
+    client = TestClient(app)
+
+    single_rate = single(client)
+    print(f"{'route':>24} {'records/s':>12} {'speedup':>8}")
+    print(f"{'POST /pokemon/':>24} {single_rate:>12.0f} {1:>8.1f}")
+
+    for ndjson in [False, True]:
+        rate = batch(client, size, ndjson)
+        name = "POST /pokemon/batch" + (" nd" if ndjson else "")
+        print(f"{name:>24} {rate:>12.0f} {rate / single_rate:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else DEFAULT_BATCH_SIZE)
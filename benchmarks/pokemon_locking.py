@@ -0,0 +1,70 @@
+# Compares write throughput of the pokemon store with per-pokemon lock stripes
+# and with a single global lock, for threads changing distinct pokemons and
+# all of them changing the same one. Usage:
+#
+#   python -m benchmarks.pokemon_locking [threads ...]
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from sys import argv
+from threading import RLock
+from time import perf_counter
+
+from lecture_2.rest_example import store
+from lecture_2.rest_example.store import queries
+from lecture_2.rest_example.store.models import PatchPokemonInfo, PokemonInfo
+
+DEFAULT_THREADS = [1, 2, 4, 8]
+CHANGES = 20_000
+POKEMONS = 1_000
+
+
+@contextmanager
+def global_lock():
+    # every change of any pokemon takes the same lock
+    lock = RLock()
+    stripes = queries._stripes
+
+    queries._stripes = (lock,) * len(stripes)
+    try:
+        yield
+    finally:
+        queries._stripes = stripes
+
+
+def run(threads: int, ids: list[int]) -> float:
+    def work(thread: int) -> None:
+        for i in range(CHANGES // threads):
+            id = ids[(thread + i * threads) % len(ids)]
+            store.patch(id, PatchPokemonInfo(name=f"pokemon-{i}"))
+
+    started = perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(work, range(threads)))
+
+    return CHANGES / (perf_counter() - started)
+
+
+def main(threads: list[int]) -> None:
+    ids = [store.add(PokemonInfo(f"pokemon-{i}", True)).id for i in range(POKEMONS)]
+
+    print(
+        f"{'threads':>8} {'striped, ops/s':>15} {'global, ops/s':>14} "
+        f"{'striped hot, ops/s':>19} {'global hot, ops/s':>18}"
+    )
+
+    for count in threads:
+        striped = run(count, ids)
+        striped_hot = run(count, ids[:1])
+
+        with global_lock():
+            single = run(count, ids)
+            single_hot = run(count, ids[:1])
+
+        print(
+            f"{count:>8} {striped:>15.0f} {single:>14.0f} "
+            f"{striped_hot:>19.0f} {single_hot:>18.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in argv[1:]] or DEFAULT_THREADS)
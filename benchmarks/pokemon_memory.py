@@ -0,0 +1,37 @@
+# Reports memory taken by pokemon storage engines per stored record (python
+# allocations traced by tracemalloc). Usage:
+#
+#   python -m benchmarks.pokemon_memory [records]
+import tracemalloc
+from sys import argv
+
+from lecture_2.rest_example.store.engines import ColumnarEngine, InMemoryEngine
+from lecture_2.rest_example.store.models import PokemonEntity, PokemonInfo
+
+DEFAULT_RECORDS = 1_000_000
+
+
+def bytes_per_record(engine: InMemoryEngine | ColumnarEngine, records: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    for i in range(records):
+        info = PokemonInfo(f"pokemon-{i}", i % 2 == 0)
+        engine.put(PokemonEntity(engine.next_id(), info))
+
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    return used / records
+
+
+def main(records: int) -> None:
+    print(f"{'engine':>10} {'bytes/record':>14}")
+
+    for engine in [InMemoryEngine(), ColumnarEngine()]:
+        name = type(engine).__name__.removesuffix("Engine").lower()
+        print(f"{name:>10} {bytes_per_record(engine, records):>14.1f}")
+
+
+if __name__ == "__main__":
+    main(int(argv[1]) if len(argv) > 1 else DEFAULT_RECORDS)
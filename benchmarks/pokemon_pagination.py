@@ -0,0 +1,52 @@
+# Measures latency of `/pokemon/` pages served by the store on growing
+# collections. Usage:
+#
+#   python -m benchmarks.pokemon_pagination [size ...]
+#
+# e.g. `python -m benchmarks.pokemon_pagination 1000 100000 10000000`
+from sys import argv
+from timeit import repeat
+
+from lecture_2.rest_example import store
+from lecture_2.rest_example.store.models import PokemonInfo
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+PAGE_SIZE = 10
+ROUNDS = 1_000
+
+
+def fill(start: int, stop: int) -> None:
+    for i in range(start, stop):
+        store.add(PokemonInfo(name=f"pokemon-{i}", published=i % 2 == 0))
+
+
+def page_latency_us(offset: int, after_id: int | None = None) -> float:
+    timings = repeat(
+        lambda: list(store.get_many(offset, PAGE_SIZE, after_id)),
+        number=1,
+        repeat=ROUNDS,
+    )
+    return min(timings) * 1e6
+
+
+def main(sizes: list[int]) -> None:
+    print(
+        f"{'size':>10} {'head, us':>10} {'middle, us':>11} "
+        f"{'tail, us':>10} {'keyset, us':>11}"
+    )
+
+    filled = 0
+    for size in sorted(sizes):
+        fill(filled, size)
+        filled = size
+
+        head = page_latency_us(0)
+        middle = page_latency_us(size // 2)
+        tail = page_latency_us(size - PAGE_SIZE)
+        keyset = page_latency_us(0, after_id=size - PAGE_SIZE - 1)
+
+        print(f"{size:>10} {head:>10.2f} {middle:>11.2f} {tail:>10.2f} {keyset:>11.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,92 @@
+# Compares pydantic response models with the fast json encoding of pokemons
+# on `/pokemon/` pages of different sizes: encoding alone and the whole
+# request handled by the app (without network). Usage:
+#
+#   python -m benchmarks.pokemon_serialization [page size ...]
+import asyncio
+from sys import argv
+from time import perf_counter
+from timeit import repeat
+
+from pydantic import TypeAdapter
+
+from lecture_2.rest_example import store
+from lecture_2.rest_example.api.pokemon import PokemonResponse, encoding
+from lecture_2.rest_example.main import app
+from lecture_2.rest_example.store.models import PokemonInfo
+
+DEFAULT_PAGE_SIZES = [10, 100, 1_000]
+ROUNDS = 200
+
+# response model of the list route as fastapi validates and dumps it
+PokemonResponseList = TypeAdapter(list[PokemonResponse])
+
+
+def encode_pydantic(entities: list[store.PokemonEntity]) -> bytes:
+    models = [PokemonResponse.from_entity(entity) for entity in entities]
+    return PokemonResponseList.dump_json(PokemonResponseList.validate_python(models))
+
+
+def encoding_us(encode, entities: list[store.PokemonEntity]) -> float:
+    return min(repeat(lambda: encode(entities), number=1, repeat=ROUNDS)) * 1e6
+
+
+async def request_us(page_size: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/pokemon/",
+        "raw_path": b"/pokemon/",
+        "query_string": f"limit={page_size}".encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1),
+        "server": ("localhost", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = perf_counter()
+        await app(scope, receive, send)
+        best = min(best, perf_counter() - started)
+
+    return best * 1e6
+
+
+def main(page_sizes: list[int]) -> None:
+    for i in range(max(page_sizes)):
+        store.add(PokemonInfo(name=f"pokemon-{i} ✨", published=i % 2 == 0))
+
+    print(
+        f"{'page':>6} {'pydantic, us':>13} {'fast, us':>10} "
+        f"{'request pydantic, us':>21} {'request fast, us':>17}"
+    )
+
+    for page_size in page_sizes:
+        entities = list(store.get_many(0, page_size))
+
+        slow = encoding_us(encode_pydantic, entities)
+        fast = encoding_us(encoding.encode_entities, entities)
+
+        encoding.use_fast_path(False)
+        slow_request = asyncio.run(request_us(page_size))
+        encoding.use_fast_path(True)
+        fast_request = asyncio.run(request_us(page_size))
+
+        print(
+            f"{page_size:>6} {slow:>13.1f} {fast:>10.1f} "
+            f"{slow_request:>21.1f} {fast_request:>17.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in argv[1:]] or DEFAULT_PAGE_SIZES)
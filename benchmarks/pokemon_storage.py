@@ -0,0 +1,78 @@
+# Measures sustained write throughput of pokemon storage engines and time to
+# recover durable storage on startup. Usage:
+#
+#   python -m benchmarks.pokemon_storage [records]
+#
+# e.g. `python -m benchmarks.pokemon_storage 5000000`
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import uuid4
+
+from lecture_2.rest_example.store.engines import (
+    InMemoryEngine,
+    LogEngine,
+    SharedMemoryEngine,
+)
+from lecture_2.rest_example.store.models import PokemonEntity, PokemonInfo
+
+DEFAULT_RECORDS = 1_000_000
+WRITES = 200_000
+
+
+def write(engine: InMemoryEngine | SharedMemoryEngine, count: int) -> float:
+    started = perf_counter()
+
+    for i in range(count):
+        info = PokemonInfo(f"pokemon-{i}", i % 2 == 0)
+        engine.put(PokemonEntity(engine.next_id(), info))
+
+    return count / (perf_counter() - started)
+
+
+def throughput() -> None:
+    print(f"{'engine':>28} {'writes/s':>12}")
+    print(f"{'memory':>28} {write(InMemoryEngine(), WRITES):>12.0f}")
+
+    for sync_every in [1, 64, 1024]:
+        with TemporaryDirectory() as path:
+            engine = LogEngine(path, sync_every=sync_every)
+            rate = write(engine, WRITES // 10 if sync_every == 1 else WRITES)
+            engine.close()
+
+        print(f"{f'log, sync_every={sync_every}':>28} {rate:>12.0f}")
+
+    engine = SharedMemoryEngine(f"pokemon-bench-{uuid4().hex[:8]}", capacity=WRITES)
+    rate = write(engine, WRITES)
+    engine.close()
+    engine.unlink()
+
+    print(f"{'shared memory':>28} {rate:>12.0f}")
+
+
+def recovery(records: int) -> None:
+    print(f"\n{'recover':>28} {'records':>12} {'seconds':>9}")
+
+    with TemporaryDirectory() as path:
+        engine = LogEngine(path, snapshot_every=records + 1)
+        write(engine, records)
+        engine.close()
+
+        started = perf_counter()
+        engine = LogEngine(path)
+        print(f"{'from log':>28} {len(engine):>12} {perf_counter() - started:>9.2f}")
+
+        engine.snapshot()
+        engine.close()
+
+        started = perf_counter()
+        engine = LogEngine(path)
+        print(
+            f"{'from snapshot':>28} {len(engine):>12} {perf_counter() - started:>9.2f}"
+        )
+        engine.close()
+
+
+if __name__ == "__main__":
+    throughput()
+    recovery(int(argv[1]) if len(argv) > 1 else DEFAULT_RECORDS)
@@ -0,0 +1,98 @@
+# Measures memory taken by cart history of the shop store per event and cost
+# of rebuilding cart content from it: from the last snapshot (current and
+# point-in-time content) next to replay of all cart events. Usage:
+#
+#   python -m benchmarks.shop_history [events] [carts]
+#
+# e.g. `python -m benchmarks.shop_history 10000000 100000`
+import random
+from sys import argv, getsizeof
+from time import perf_counter
+
+from lecture_2.hw.shop_api.store.history import CartHistory
+
+DEFAULT_EVENTS = 10_000_000
+DEFAULT_CARTS = 100_000
+ITEMS = 10_000
+ROUNDS = 10_000
+
+
+def fill(history: CartHistory, events: int, carts: int) -> None:
+    rng = random.Random(0)
+
+    for cart in range(carts):
+        history.create(cart, 0)
+
+    for time in range(1, events + 1):
+        history.append(rng.randrange(carts), rng.randrange(ITEMS), 1, time)
+
+
+def memory(history: CartHistory) -> tuple[int, int]:
+    # bytes taken by event columns and by per-cart snapshots
+    columns = sum(
+        getsizeof(column)
+        for column in [
+            history._times,
+            history._items,
+            history._deltas,
+            history._previous,
+        ]
+    )
+    snapshots = getsizeof(history._logs) + sum(
+        getsizeof(log)
+        + getsizeof(log.snapshot_times)
+        + getsizeof(log.snapshots)
+        + sum(
+            getsizeof(s) + getsizeof(s.items) + getsizeof(s.quantities)
+            for s in log.snapshots
+        )
+        for log in history._logs.values()
+    )
+    return columns, snapshots
+
+
+def replay_us(rebuild, carts: int) -> float:
+    rng = random.Random(1)
+    ids = [rng.randrange(carts) for _ in range(ROUNDS)]
+
+    started = perf_counter()
+    for id in ids:
+        rebuild(id)
+
+    return (perf_counter() - started) / ROUNDS * 1e6
+
+
+def main(events: int, carts: int) -> None:
+    history = CartHistory()
+
+    started = perf_counter()
+    fill(history, events, carts)
+    elapsed = perf_counter() - started
+    print(f"appended {events} events in {elapsed:.1f}s ({events / elapsed:.0f}/s)")
+
+    columns, snapshots = memory(history)
+    print(
+        f"events: {columns / events:.1f} bytes/event, "
+        f"snapshots: {snapshots / events:.1f} bytes/event, "
+        f"total: {(columns + snapshots) / 2**20:.0f} MiB"
+    )
+
+    rng = random.Random(2)
+
+    def full(id: int) -> dict[int, int]:
+        # replay of every event of cart from its creation
+        return history._replay(history._logs[id], 0, history._logs[id].last)
+
+    print(f"{'rebuild':>14} {'us/cart':>10}")
+
+    for name, rebuild in [
+        ("current", history.quantities),
+        ("point-in-time", lambda id: history.quantities_at(id, rng.randrange(events))),
+        ("full replay", full),
+    ]:
+        print(f"{name:>14} {replay_us(rebuild, carts):>10.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in argv[1:]]
+    main(*(sizes + [DEFAULT_EVENTS, DEFAULT_CARTS][len(sizes) :]))
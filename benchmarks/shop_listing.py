@@ -0,0 +1,87 @@
+# Measures latency of filtered `/item` and `/cart` listings of the shop store
+# served from sorted indexes, next to a full scan of the same filter. Usage:
+#
+#   python -m benchmarks.shop_listing [items] [carts]
+#
+# e.g. `python -m benchmarks.shop_listing 1000000 1000000`
+import random
+from sys import argv
+from time import perf_counter
+from timeit import repeat
+
+from lecture_2.hw.shop_api import store
+from lecture_2.hw.shop_api.store import queries
+
+DEFAULT_SIZE = 1_000_000
+ITEMS_PER_CART = 3
+PAGE_SIZE = 10
+ROUNDS = 200
+
+
+def fill(items: int, carts: int) -> None:
+    rng = random.Random(0)
+
+    for i in range(items):
+        store.add_item(store.ItemInfo(f"item-{i}", rng.randint(100, 100_000) / 100))
+
+    for i in range(0, items, 10):
+        store.delete_item(i)
+
+    for _ in range(carts):
+        cart = store.add_cart()
+        for _ in range(rng.randint(0, ITEMS_PER_CART)):
+            store.add_to_cart(cart.id, rng.randrange(1, items))
+
+
+def latency_us(list_page, offset: int, filters) -> float:
+    timings = repeat(
+        lambda: list(list_page(offset, PAGE_SIZE, filters)),
+        number=1,
+        repeat=ROUNDS,
+    )
+    return min(timings) * 1e6
+
+
+def scan_carts_us(filters: store.CartFilter) -> float:
+    # what listing costs without indexes: every cart is checked
+    started = perf_counter()
+    matched = [
+        id
+        for id, cart in queries._carts.items()
+        if filters.matches(cart.price, cart.quantity)
+    ]
+    matched[:PAGE_SIZE]
+    return (perf_counter() - started) * 1e6
+
+
+def main(items: int, carts: int) -> None:
+    started = perf_counter()
+    fill(items, carts)
+    print(f"filled {items} items and {carts} carts in {perf_counter() - started:.1f}s")
+
+    queries_ = [
+        ("items", store.get_items, store.ItemFilter()),
+        ("items, deleted", store.get_items, store.ItemFilter(show_deleted=True)),
+        ("items by price", store.get_items, store.ItemFilter(100.0, 200.0)),
+        ("carts", store.get_carts, store.CartFilter()),
+        ("carts by price", store.get_carts, store.CartFilter(100.0, 200.0)),
+        ("carts by quantity", store.get_carts, store.CartFilter(None, None, 2, 2)),
+        ("carts by both", store.get_carts, store.CartFilter(100.0, 200.0, 2, 2)),
+    ]
+
+    print(f"{'listing':>20} {'head, us':>10} {'middle, us':>11} {'scan, us':>10}")
+
+    for name, list_page, filters in queries_:
+        head = latency_us(list_page, 0, filters)
+        middle = latency_us(list_page, 10_000, filters)
+        scan = scan_carts_us(filters) if list_page is store.get_carts else None
+
+        print(
+            f"{name:>20} {head:>10.1f} {middle:>11.1f} "
+            f"{'' if scan is None else f'{scan:.0f}':>10}"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in argv[1:]]
+    main(*(sizes + [DEFAULT_SIZE] * (2 - len(sizes))))
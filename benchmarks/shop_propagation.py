@@ -0,0 +1,78 @@
+# Measures cost of changing item price for carts totals of the shop store:
+# propagation through item -> carts index (right away and deferred) next to a
+# scan of all carts looking for the item. Usage:
+#
+#   python -m benchmarks.shop_propagation [carts] [hot carts]
+#
+# e.g. `python -m benchmarks.shop_propagation 1000000 100000`
+from sys import argv
+from time import perf_counter
+
+from lecture_2.hw.shop_api import store
+from lecture_2.hw.shop_api.store import queries
+
+DEFAULT_CARTS = 1_000_000
+DEFAULT_HOT_CARTS = 100_000
+COLD_CARTS = 10
+CHANGES = 20
+
+
+def change_us(item_id: int, base: float) -> float:
+    started = perf_counter()
+
+    for i in range(CHANGES):
+        store.patch_item(item_id, store.PatchItemInfo(price=base + i))
+
+    return (perf_counter() - started) / CHANGES * 1e6
+
+
+def scan_us(item_id: int) -> float:
+    # what finding carts with item costs without index at least: scan of item
+    # column of cart events, which would be followed by walking cart chains
+    started = perf_counter()
+    [
+        position
+        for position, item in enumerate(queries._history._items)
+        if item == item_id
+    ]
+    return (perf_counter() - started) * 1e6
+
+
+def main(carts: int, hot_carts: int) -> None:
+    hot = store.add_item(store.ItemInfo("hot", 1.0))
+    cold = store.add_item(store.ItemInfo("cold", 1.0))
+    other = store.add_item(store.ItemInfo("other", 1.0))
+
+    for i in range(carts):
+        cart = store.add_cart()
+        store.add_to_cart(cart.id, other.id)
+
+        if i < hot_carts:
+            store.add_to_cart(cart.id, hot.id)
+        if i < COLD_CARTS:
+            store.add_to_cart(cart.id, cold.id)
+
+    print(
+        f"{'item':>5} {'carts':>8} {'indexed, us':>12} {'deferred, us':>13} "
+        f"{'flush, us':>10} {'scan, us':>10}"
+    )
+
+    for name, item, count in [("cold", cold, COLD_CARTS), ("hot", hot, hot_carts)]:
+        indexed = change_us(item.id, 1.0)
+
+        store.defer_propagation(True)
+        deferred = change_us(item.id, 100.0)
+        started = perf_counter()
+        store.flush_pending()
+        flush = (perf_counter() - started) * 1e6
+        store.defer_propagation(False)
+
+        print(
+            f"{name:>5} {count:>8} {indexed:>12.1f} {deferred:>13.1f} "
+            f"{flush:>10.1f} {scan_us(item.id):>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in argv[1:]]
+    main(*(sizes + [DEFAULT_CARTS, DEFAULT_HOT_CARTS][len(sizes) :]))
@@ -0,0 +1,110 @@
+# Measures delivery latency of ws_example broadcaster to many subscribers,
+# a few of which are slow (every send of theirs waits as if socket buffer
+# was full), next to sending to subscribers one by one as it was done before.
+# Messages are published at fixed rate; latency of message is counted from
+# the moment it was due to be published to the moment fast subscriber got it.
+# Usage:
+#
+#   python -m benchmarks.ws_broadcast [subscribers] [slow subscribers]
+#
+# e.g. `python -m benchmarks.ws_broadcast 10000 10`
+import asyncio
+import statistics
+from sys import argv
+from time import perf_counter
+from typing import Any
+
+from lecture_2.ws_example.broadcaster import Broadcaster, Overflow
+
+DEFAULT_SUBSCRIBERS = 10_000
+DEFAULT_SLOW = 10
+MESSAGES = 100
+INTERVAL = 0.05
+SLOW_SEND_DELAY = 0.02
+
+
+class FakeWebSocket:
+    def __init__(self, slow: bool, published: dict[str, float]) -> None:
+        self.slow = slow
+        self.published = published
+        self.latencies: list[float] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send(self, event: dict[str, Any]) -> None:
+        await self.send_text(event["text"])
+
+    async def send_text(self, message: str) -> None:
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND_DELAY)
+        else:
+            self.latencies.append(perf_counter() - self.published[message])
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+
+class SequentialBroadcaster:
+    def __init__(self) -> None:
+        self.subscribers: list[FakeWebSocket] = []
+
+    async def subscribe(self, ws: FakeWebSocket) -> None:
+        self.subscribers.append(ws)
+
+    async def publish(self, message: str) -> None:
+        for ws in self.subscribers:
+            await ws.send_text(message)
+
+
+async def run(queued: bool, subscribers: int, slow: int) -> list[float]:
+    published: dict[str, float] = {}
+    sockets = [FakeWebSocket(i < slow, published) for i in range(subscribers)]
+    broadcaster = (
+        Broadcaster(queue_size=MESSAGES, overflow=Overflow.DROP_OLDEST)
+        if queued
+        else SequentialBroadcaster()
+    )
+
+    for ws in sockets:
+        await broadcaster.subscribe(ws)
+
+    started = perf_counter()
+
+    for i in range(MESSAGES):
+        message = str(i)
+        published[message] = started + i * INTERVAL
+        await asyncio.sleep(max(0.0, published[message] - perf_counter()))
+
+        if queued:
+            broadcaster.publish(message)
+        else:
+            await broadcaster.publish(message)
+
+    # fast subscribers get the last message in time of a few intervals
+    while any(len(ws.latencies) < MESSAGES for ws in sockets[slow:]):
+        await asyncio.sleep(INTERVAL)
+
+    if queued:
+        for ws in sockets:
+            await broadcaster.unsubscribe(ws)
+
+    return [latency for ws in sockets[slow:] for latency in ws.latencies]
+
+
+def main(subscribers: int, slow: int) -> None:
+    print(f"{subscribers} subscribers, {slow} slow, {MESSAGES} messages")
+    print(f"{'broadcaster':>12} {'p50, ms':>8} {'p99, ms':>8} {'max, ms':>8}")
+
+    for name, queued in [("sequential", False), ("queued", True)]:
+        latencies = asyncio.run(run(queued, subscribers, slow))
+        percentiles = statistics.quantiles(latencies, n=100)
+
+        print(
+            f"{name:>12} {percentiles[49] * 1e3:>8.1f} {percentiles[98] * 1e3:>8.1f} "
+            f"{max(latencies) * 1e3:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in argv[1:]] or [DEFAULT_SUBSCRIBERS, DEFAULT_SLOW])
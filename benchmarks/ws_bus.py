@@ -0,0 +1,138 @@
+# Measures bus relaying websocket messages between worker processes of
+# ws_example: one worker publishes messages as fast as it can, others get
+# them through hub run by one of workers. Reports relay throughput, latency
+# from publish to delivery and messages lost by workers which fell behind,
+# and checks messages keep their order.
+# Usage:
+#
+#   python -m benchmarks.ws_bus [workers] [messages] [payload bytes]
+#
+# e.g. `python -m benchmarks.ws_bus 4 100000 256`
+import asyncio
+import multiprocessing
+import statistics
+import struct
+import tempfile
+from pathlib import Path
+from sys import argv
+from time import perf_counter
+
+from lecture_2.ws_example.bus import Bus
+
+DEFAULT_WORKERS = 4
+DEFAULT_MESSAGES = 100_000
+DEFAULT_PAYLOAD = 256
+QUIET_PERIOD = 1.0
+
+# sequence number and time message was published at
+_STAMP = struct.Struct("!Qd")
+
+
+async def run_worker(
+    path: str,
+    publisher: bool,
+    messages: int,
+    payload: int,
+    barrier,
+    done,
+) -> tuple[list[float], bool, float, float]:
+    latencies: list[float] = []
+    ordered = True
+    last_seq = -1
+    first_sent = last_received = 0.0
+
+    def deliver(message: bytes, topic: str) -> None:
+        nonlocal ordered, last_seq, last_received
+
+        seq, published = _STAMP.unpack_from(message)
+        last_received = perf_counter()
+        ordered = ordered and seq > last_seq
+        last_seq = seq
+        latencies.append(last_received - published)
+
+    bus = Bus(path, deliver)
+    await bus.start()
+    await asyncio.to_thread(barrier.wait)
+
+    if publisher:
+        first_sent = perf_counter()
+        padding = bytes(payload - _STAMP.size)
+        for seq in range(messages):
+            bus.send(_STAMP.pack(seq, perf_counter()) + padding, "benchmark")
+            # lets event loop write to socket now and then
+            if seq % 100 == 0:
+                await asyncio.sleep(0)
+
+        await asyncio.sleep(0)
+        done.set()
+    else:
+        # messages are lost once worker falls behind too much
+        while len(latencies) < messages and not (
+            done.is_set() and perf_counter() - last_received > QUIET_PERIOD
+        ):
+            await asyncio.sleep(0.01)
+
+    # hub may run in this worker, so it waits for the others
+    await asyncio.to_thread(barrier.wait)
+    await bus.close()
+
+    return latencies, ordered, first_sent, last_received
+
+
+def worker(path, publisher, messages, payload, barrier, done, results) -> None:
+    results.put(
+        asyncio.run(run_worker(path, publisher, messages, payload, barrier, done))
+    )
+
+
+def main(workers: int, messages: int, payload: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "bus.sock")
+        barrier = multiprocessing.Barrier(workers)
+        done = multiprocessing.Event()
+        results = multiprocessing.Queue()
+
+        started = perf_counter()
+        processes = [
+            multiprocessing.Process(
+                target=worker,
+                args=(path, i == 0, messages, payload, barrier, done, results),
+            )
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        received = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    subscribers = [r for r in received if r[0]]
+    latencies = [latency for r in subscribers for latency in r[0]]
+    first_sent = max(r[2] for r in received)
+    last_received = max(r[3] for r in subscribers)
+    percentiles = statistics.quantiles(latencies, n=100)
+
+    print(
+        f"{workers} workers, {messages} messages of {payload} bytes, "
+        f"took {perf_counter() - started:.1f}s"
+    )
+    print(
+        f"delivered {len(latencies) / (last_received - first_sent):.0f} messages/s "
+        f"to {len(subscribers)} workers"
+    )
+    print(
+        f"latency p50 {percentiles[49] * 1e3:.2f}ms, "
+        f"p99 {percentiles[98] * 1e3:.2f}ms, max {max(latencies) * 1e3:.2f}ms"
+    )
+    print(
+        f"lost {messages * len(subscribers) - len(latencies)}, "
+        f"in order: {all(r[1] for r in subscribers)}"
+    )
+
+
+if __name__ == "__main__":
+    main(
+        *[int(arg) for arg in argv[1:]]
+        or [DEFAULT_WORKERS, DEFAULT_MESSAGES, DEFAULT_PAYLOAD]
+    )
@@ -0,0 +1,86 @@
+# Measures cost of keeping history of ws_example broadcaster: time to publish
+# message with and without subscribers, how many messages history of given
+# budget keeps, and time for subscriber which reconnects to get messages it
+# missed.
+# Usage:
+#
+#   python -m benchmarks.ws_history [messages] [payload bytes] [history bytes]
+#
+# e.g. `python -m benchmarks.ws_history 100000 256 16777216`
+import asyncio
+from sys import argv
+from time import perf_counter
+from typing import Any
+
+from lecture_2.ws_example.broadcaster import Broadcaster
+from lecture_2.ws_example.history import History
+
+DEFAULT_MESSAGES = 100_000
+DEFAULT_PAYLOAD = 256
+DEFAULT_HISTORY = 16 << 20
+GAPS = [10, 100, 1000]
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.received = 0
+
+    async def accept(self) -> None:
+        pass
+
+    async def send(self, event: dict[str, Any]) -> None:
+        self.received += 1
+
+
+async def publish(broadcaster: Broadcaster, messages: int, payload: str) -> float:
+    started = perf_counter()
+    for _ in range(messages):
+        broadcaster.publish(payload, "benchmark")
+
+    return (perf_counter() - started) / messages
+
+
+async def run(messages: int, payload: int, history: int) -> None:
+    text = "x" * payload
+
+    broadcaster = Broadcaster(history=History(history))
+    idle = await publish(broadcaster, messages, text)
+
+    print(f"{messages} messages of {payload} bytes, history of {history} bytes")
+    print(
+        f"publish without subscribers {idle * 1e6:.2f}µs, "
+        f"kept {len(broadcaster.history)} messages "
+        f"({broadcaster.history.size / (1 << 20):.1f}MiB)"
+    )
+
+    live, sequenced = FakeWebSocket(), FakeWebSocket()
+    await broadcaster.subscribe(live)
+    await broadcaster.subscribe(sequenced, last_seq=broadcaster.history.last_seq)
+    busy = await publish(broadcaster, messages, text)
+    print(f"publish to live and sequenced subscriber {busy * 1e6:.2f}µs")
+
+    print(f"{'gap':>6} {'replay':>10} {'per message':>12}")
+    for gap in GAPS:
+        if gap > len(broadcaster.history):
+            continue
+
+        ws = FakeWebSocket()
+        started = perf_counter()
+        await broadcaster.subscribe(ws, last_seq=broadcaster.history.last_seq - gap)
+        while ws.received <= gap:
+            await asyncio.sleep(0)
+        elapsed = perf_counter() - started
+
+        await broadcaster.unsubscribe(ws)
+        print(f"{gap:>6} {elapsed * 1e3:>8.2f}ms {elapsed / gap * 1e6:>10.2f}µs")
+
+
+def main(messages: int, payload: int, history: int) -> None:
+    asyncio.run(run(messages, payload, history))
+
+
+if __name__ == "__main__":
+    main(
+        *[int(arg) for arg in argv[1:]]
+        or [DEFAULT_MESSAGES, DEFAULT_PAYLOAD, DEFAULT_HISTORY]
+    )
@@ -0,0 +1,276 @@
+import asyncio
+import math
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Hashable, Iterator
+
+# computations of the math api shared by its fastapi and plain asgi apps;
+# results are produced as decimal ascii text:
+#
+# - small ones are computed inline, large ones by process pool, as both
+#   computing them and converting them to decimal take long enough to stall
+#   event loop
+# - concurrent requests of the same result wait for one computation
+#   (single-flight)
+# - results are kept by lru cache limited by their total size
+# - large results are sent in chunks instead of being copied into one body
+
+# fibonacci numbers are computed by fast doubling in O(log n) big int
+# multiplications:
+#
+#   F(2k) = F(k) * (2 * F(k + 1) - F(k))
+#   F(2k + 1) = F(k) ** 2 + F(k + 1) ** 2
+#
+# pair for n is built from pair for n // 2, so pairs for every prefix of n
+# bits (checkpoints) are kept by lru cache and requests for close n reuse them
+
+
+class TooLargeError(ValueError):
+    def __init__(self, n: int, max_n: int) -> None:
+        super().__init__(f"Invalid value for n, must be at most {max_n}")
+        self.n = n
+        self.max_n = max_n
+
+
+@dataclass(slots=True)
+class Limits:
+    # F(n) has about 0.209 * n decimal digits
+    max_fibonacci_n: int = 1_000_000
+    # results of larger n are computed by process pool; smaller ones are
+    # below `sys.get_int_max_str_digits()` as well
+    inline_fibonacci_n: int = 20_000
+    # n! has about 456k digits for n = 100k
+    max_factorial_n: int = 100_000
+    inline_factorial_n: int = 1_000
+
+
+_limits = Limits(
+    max_fibonacci_n=int(os.environ.get("MATH_MAX_FIBONACCI_N", "1000000")),
+    inline_fibonacci_n=int(os.environ.get("MATH_INLINE_FIBONACCI_N", "20000")),
+    max_factorial_n=int(os.environ.get("MATH_MAX_FACTORIAL_N", "100000")),
+    inline_factorial_n=int(os.environ.get("MATH_INLINE_FACTORIAL_N", "1000")),
+)
+
+# results longer than that are sent in chunks of that size
+CHUNK_SIZE = 64 << 10
+
+# approximate size of entry bookkeeping besides result
+_ENTRY_OVERHEAD = 128
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+
+@dataclass(slots=True)
+class ResultCache:
+    max_bytes: int = 64 << 20
+
+    stats: CacheStats = field(init=False, default_factory=CacheStats)
+    _entries: OrderedDict[Hashable, bytes] = field(
+        init=False, default_factory=OrderedDict
+    )
+    _bytes: int = field(init=False, default=0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        # bytes taken by cached results
+        return self._bytes
+
+    def get(self, key: Hashable) -> bytes | None:
+        result = self._entries.get(key)
+
+        if result is not None:
+            self._entries.move_to_end(key)
+
+        return result
+
+    def put(self, key: Hashable, result: bytes) -> None:
+        size = len(result) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        self._drop(key)
+
+        while self._bytes + size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+        self._entries[key] = result
+        self._bytes += size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _drop(self, key: Hashable) -> None:
+        result = self._entries.pop(key, None)
+
+        if result is not None:
+            self._bytes -= len(result) + _ENTRY_OVERHEAD
+
+
+_cache = ResultCache(int(os.environ.get("MATH_CACHE_BYTES", str(64 << 20))))
+# key -> computation of result which is being awaited
+_computing = dict[Hashable, asyncio.Future[bytes]]()
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def use(limits: Limits) -> None:
+    global _limits
+
+    _limits = limits
+
+
+def limits() -> Limits:
+    return _limits
+
+
+def use_cache(cache: ResultCache) -> None:
+    global _cache
+
+    _cache = cache
+
+
+def cache() -> ResultCache:
+    return _cache
+
+
+@lru_cache(maxsize=1024)
+def _pair(n: int) -> tuple[int, int]:
+    # (F(n), F(n + 1))
+    if n == 0:
+        return 0, 1
+
+    a, b = _pair(n >> 1)
+    c = a * (2 * b - a)
+    d = a * a + b * b
+
+    return (d, c + d) if n & 1 else (c, d)
+
+
+def fibonacci(n: int) -> int:
+    if n < 0:
+        raise ValueError("Invalid value for n, must be non-negative")
+
+    return _pair(n)[0]
+
+
+def _fibonacci_text(n: int) -> bytes:
+    return str(fibonacci(n)).encode("ascii")
+
+
+def _factorial_text(n: int) -> bytes:
+    return str(math.factorial(n)).encode("ascii")
+
+
+def _init_worker() -> None:
+    # workers convert only numbers they computed themselves, so decimal
+    # conversion limit (which guards parsing of untrusted input) is lifted
+    sys.set_int_max_str_digits(0)
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+
+    if _pool is None:
+        _pool = ProcessPoolExecutor(initializer=_init_worker)
+
+    return _pool
+
+
+def shutdown() -> None:
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def _compute(
+    key: Hashable,
+    function: Callable[[int], bytes],
+    n: int,
+    inline: bool,
+) -> bytes:
+    if (result := _cache.get(key)) is not None:
+        _cache.stats.hits += 1
+        return result
+
+    if (computing := _computing.get(key)) is not None:
+        _cache.stats.coalesced += 1
+        return await asyncio.shield(computing)
+
+    _cache.stats.misses += 1
+
+    if inline:
+        result = function(n)
+        _cache.put(key, result)
+        return result
+
+    # computation is not bound to request which started it, so it is
+    # finished for others even if that request is cancelled
+    loop = asyncio.get_running_loop()
+    computing = asyncio.ensure_future(loop.run_in_executor(_executor(), function, n))
+    _computing[key] = computing
+
+    def done(future: asyncio.Future[bytes]) -> None:
+        del _computing[key]
+
+        if not future.cancelled() and future.exception() is None:
+            _cache.put(key, future.result())
+
+    computing.add_done_callback(done)
+
+    return await asyncio.shield(computing)
+
+
+async def fibonacci_text(n: int) -> bytes:
+    # F(n) in decimal
+    if n < 0:
+        raise ValueError("Invalid value for n, must be non-negative")
+
+    if n > _limits.max_fibonacci_n:
+        raise TooLargeError(n, _limits.max_fibonacci_n)
+
+    inline = n <= _limits.inline_fibonacci_n
+    return await _compute(("fibonacci", n), _fibonacci_text, n, inline)
+
+
+async def factorial_text(n: int) -> bytes:
+    # n! in decimal
+    if n < 0:
+        raise ValueError("Invalid value for n, must be non-negative")
+
+    if n > _limits.max_factorial_n:
+        raise TooLargeError(n, _limits.max_factorial_n)
+
+    inline = n <= _limits.inline_factorial_n
+    return await _compute(("factorial", n), _factorial_text, n, inline)
+
+
+def result_chunks(text: bytes) -> Iterator[bytes]:
+    # json body `{"result": <text>}` in chunks of at most `CHUNK_SIZE` bytes
+    # of result, so whole body is never copied at once
+    yield b'{"result":'
+
+    for start in range(0, len(text), CHUNK_SIZE):
+        yield text[start : start + CHUNK_SIZE]
+
+    yield b"}"
+
+
+def result_length(text: bytes) -> int:
+    return len(text) + len(b'{"result":}')
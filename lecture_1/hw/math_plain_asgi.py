@@ -1,8 +1,246 @@
-from typing import Any, Awaitable, Callable
+import re
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Awaitable, Callable
+from urllib.parse import unquote_plus
 
+from lecture_1 import compute, stats
 
-async def app(
-    scope: dict[str, Any],
-    receive: Callable[[], Awaitable[dict[str, Any]]],
-    send: Callable[[dict[str, Any]], Awaitable[None]],
-) -> None: ...
+# math api of `lecture_1/math_example.py` as plain asgi app, run it with
+#
+#   uvicorn lecture_1.hw.math_plain_asgi:app
+#
+# requests are routed by plain string comparisons, query strings and bodies
+# are parsed by hand and everything which does not depend on request (error
+# responses, headers) is built once on import
+
+type Scope = dict[str, Any]
+type Receive = Callable[[], Awaitable[dict[str, Any]]]
+type Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+_CONTENT_TYPE = (b"content-type", b"application/json")
+
+_INTEGER = re.compile(rb"[+-]?[0-9]+")
+
+
+type Response = tuple[dict[str, Any], dict[str, Any]]
+
+
+def _response(status: HTTPStatus, body: bytes) -> Response:
+    start = {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [_CONTENT_TYPE, (b"content-length", b"%d" % len(body))],
+    }
+    return start, {"type": "http.response.body", "body": body}
+
+
+def _error_response(status: HTTPStatus, detail: str) -> Response:
+    return _response(status, b'{"detail":"' + detail.encode() + b'"}')
+
+
+class _Error(Exception):
+    def __init__(self, response: Response) -> None:
+        super().__init__(response[1]["body"])
+        self.response = response
+
+
+_NOT_FOUND = _error_response(HTTPStatus.NOT_FOUND, "Not Found")
+_INVALID_N = _error_response(
+    HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid value for n, must be integer"
+)
+_NEGATIVE_N = _error_response(
+    HTTPStatus.BAD_REQUEST, "Invalid value for n, must be non-negative"
+)
+_INVALID_BODY = _error_response(
+    HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid value for body, must be array of floats"
+)
+_EMPTY_BODY = _error_response(
+    HTTPStatus.BAD_REQUEST,
+    "Invalid value for body, must be non-empty array of floats",
+)
+
+
+def _parse_n(value: bytes | None) -> int:
+    if value is None or not _INTEGER.fullmatch(value):
+        raise _Error(_INVALID_N)
+
+    try:
+        n = int(value)
+    except ValueError:
+        # more digits than int conversion allows
+        raise _Error(_INVALID_N) from None
+
+    if n < 0:
+        raise _Error(_NEGATIVE_N)
+
+    return n
+
+
+def _query_param(query_string: bytes, name: bytes) -> bytes | None:
+    # the last value wins, as with starlette
+    value = None
+
+    for pair in query_string.split(b"&"):
+        key, sep, raw = pair.partition(b"=")
+
+        if b"%" in key or b"+" in key:
+            key = unquote_plus(key.decode("latin-1")).encode("latin-1")
+
+        if key == name and sep:
+            value = raw
+
+    if value is not None and (b"%" in value or b"+" in value):
+        value = unquote_plus(value.decode("latin-1")).encode()
+
+    return value
+
+
+async def _body(receive: Receive) -> AsyncIterator[bytes]:
+    while True:
+        message = await receive()
+
+        if message["type"] == "http.disconnect":
+            return
+
+        yield message.get("body", b"")
+
+        if not message.get("more_body", False):
+            return
+
+
+def _header(scope: Scope, name: bytes) -> bytes:
+    for key, value in scope["headers"]:
+        if key.lower() == name:
+            return value
+
+    return b""
+
+
+async def _aggregate(
+    scope: Scope,
+    receive: Receive,
+    detailed: bool,
+) -> stats.Aggregate:
+    # numbers are aggregated while body is received, as json array or raw
+    # float64 values
+    binary = _header(scope, b"content-type").startswith(
+        stats.FLOAT64_MEDIA_TYPE.encode()
+    )
+
+    try:
+        result = await stats.aggregate(_body(receive), binary, detailed)
+    except ValueError:
+        raise _Error(_INVALID_BODY) from None
+
+    if not result.count:
+        raise _Error(_EMPTY_BODY)
+
+    return result
+
+
+async def _computed(text: Awaitable[bytes]) -> bytes:
+    try:
+        return await text
+    except compute.TooLargeError as e:
+        raise _Error(_error_response(HTTPStatus.BAD_REQUEST, str(e))) from None
+
+
+# handlers return result as json number text
+
+
+async def _factorial(scope: Scope, receive: Receive) -> bytes:
+    n = _parse_n(_query_param(scope["query_string"], b"n"))
+    return await _computed(compute.factorial_text(n))
+
+
+async def _mean(scope: Scope, receive: Receive) -> bytes:
+    return repr((await _aggregate(scope, receive, False)).mean).encode()
+
+
+async def _stats(scope: Scope, receive: Receive) -> bytes:
+    summary = (await _aggregate(scope, receive, True)).summary()
+    quantiles = ",".join(f'"{q}":{v!r}' for q, v in summary.quantiles.items())
+
+    return (
+        f'{{"count":{summary.count},"mean":{summary.mean!r},'
+        f'"variance":{summary.variance!r},"min":{summary.min!r},'
+        f'"max":{summary.max!r},"quantiles":{{{quantiles}}}}}'
+    ).encode()
+
+
+_ROUTES = {
+    "/factorial": _factorial,
+    "/mean": _mean,
+    "/stats": _stats,
+}
+_FIBONACCI = "/fibonacci/"
+
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            compute.shutdown()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _handle(scope: Scope, receive: Receive) -> bytes:
+    if scope["method"] != "GET":
+        raise _Error(_NOT_FOUND)
+
+    path = scope["path"]
+
+    if (handler := _ROUTES.get(path)) is not None:
+        return await handler(scope, receive)
+
+    if path.startswith(_FIBONACCI) and "/" not in path[len(_FIBONACCI) :]:
+        n = _parse_n(path[len(_FIBONACCI) :].encode() or None)
+        return await _computed(compute.fibonacci_text(n))
+
+    raise _Error(_NOT_FOUND)
+
+
+async def _send_chunked(text: bytes, send: Send) -> None:
+    # large result is sent by chunks of known total length
+    await send(
+        {
+            "type": "http.response.start",
+            "status": HTTPStatus.OK,
+            "headers": [
+                _CONTENT_TYPE,
+                (b"content-length", b"%d" % compute.result_length(text)),
+            ],
+        }
+    )
+
+    for chunk in compute.result_chunks(text):
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def app(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    if scope["type"] != "http":
+        return
+
+    try:
+        text = await _handle(scope, receive)
+    except _Error as e:
+        start, body = e.response
+    else:
+        if len(text) > compute.CHUNK_SIZE:
+            await _send_chunked(text, send)
+            return
+
+        start, body = _response(HTTPStatus.OK, b'{"result":' + text + b"}")
+
+    await send(start)
+    await send(body)
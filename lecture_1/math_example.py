@@ -1,49 +1,96 @@
-import math
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Awaitable
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 
-app = FastAPI()
+from lecture_1 import compute, stats
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    compute.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def _result(text: Awaitable[bytes]) -> Response:
+    try:
+        result = await text
+    except compute.TooLargeError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+
+    # result may be too long for json encoder to convert it to decimal again,
+    # so its decimal text is put into body as is
+    if len(result) > compute.CHUNK_SIZE:
+        return StreamingResponse(
+            compute.result_chunks(result),
+            media_type="application/json",
+            headers={"content-length": str(compute.result_length(result))},
+        )
+
+    return Response(b'{"result":' + result + b"}", media_type="application/json")
 
 
 @app.get("/factorial")
-def get_factorial(n: Annotated[int, Query()]) -> JSONResponse:
+async def get_factorial(n: Annotated[int, Query()]) -> Response:
     if n < 0:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Invalid value for n, must be non-negative",
         )
 
-    result = math.factorial(n)
-
-    return JSONResponse({"result": result})
+    return await _result(compute.factorial_text(n))
 
 
 @app.get("/fibonacci/{n}")
-def get_fibonacci(n: int) -> JSONResponse:
+async def get_fibonacci(n: int) -> Response:
     if n < 0:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Invalid value for n, must be non-negative",
         )
 
-    a, b = 0, 1
-    for _ in range(n):
-        a, b = b, a + b
+    return await _result(compute.fibonacci_text(n))
 
-    return JSONResponse({"result": b})
 
+async def _aggregate(request: Request, detailed: bool) -> stats.Aggregate:
+    # body is aggregated while it is received instead of being validated as
+    # list of floats first, it is json array or raw float64 values
+    binary = request.headers.get("content-type", "").startswith(
+        stats.FLOAT64_MEDIA_TYPE
+    )
 
-@app.get("/mean")
-def get_mean(data: list[float]) -> JSONResponse:
-    if len(data) == 0:
+    try:
+        result = await stats.aggregate(request.stream(), binary, detailed)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=f"Invalid value for body: {e}",
+        )
+
+    if not result.count:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Invalid value for body, must be non-empty array of floats",
         )
 
-    result = sum(data) / len(data)
+    return result
+
+
+@app.get("/mean")
+async def get_mean(request: Request) -> JSONResponse:
+    result = await _aggregate(request, False)
+
+    return JSONResponse({"result": result.mean})
+
+
+@app.get("/stats")
+async def get_stats(request: Request) -> JSONResponse:
+    summary = (await _aggregate(request, True)).summary()
 
-    return JSONResponse({"result": result})
+    return JSONResponse({"result": asdict(summary)})
@@ -0,0 +1,257 @@
+import math
+import random
+import re
+import sys
+from array import array
+from dataclasses import dataclass, field
+from itertools import repeat
+from operator import sub
+from typing import AsyncIterable
+
+# statistics of numbers streamed in request body, which is either json array
+# of numbers or raw little-endian float64 values; body is parsed chunk by
+# chunk as it is received and every chunk is aggregated right away, so memory
+# does not depend on body size:
+#
+# - mean and variance of chunk are computed in two passes and merged into
+#   totals by Chan et al. formula, which is stable unlike sum of squares
+# - quantiles are estimated from uniform sample of fixed size (reservoir)
+
+FLOAT64_MEDIA_TYPE = "application/octet-stream"
+
+RESERVOIR_SIZE = 10_000
+QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+# longest number (with surrounding whitespace) json array may have
+_MAX_TOKEN = 1024
+
+_NUMBER = rb"\s*-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?\s*"
+_NUMBERS = re.compile(_NUMBER + rb"(?:," + _NUMBER + rb")*")
+_WHITESPACE = re.compile(rb"\s*")
+_JSON_WHITESPACE = b" \t\n\r"
+
+type Values = list[float]
+
+
+def _finite(value: float) -> float:
+    # non-finite number makes sum of chunk non-finite as well
+    if not math.isfinite(value):
+        raise ValueError("Numbers and their sums must be finite")
+
+    return value
+
+
+@dataclass(slots=True)
+class JsonArrayParser:
+    _buffer: bytes = field(init=False, default=b"")
+    _opened: bool = field(init=False, default=False)
+    _closed: bool = field(init=False, default=False)
+    # whether any number was parsed, so `[]` and `[1,]` are told apart
+    _parsed: bool = field(init=False, default=False)
+
+    def feed(self, data: bytes) -> Values:
+        buffer = self._buffer + data
+
+        if self._closed:
+            self._check_whitespace(buffer)
+            return []
+
+        if not self._opened:
+            buffer = buffer.lstrip()
+            if not buffer:
+                return []
+            if buffer[:1] != b"[":
+                raise ValueError("Body must be json array of numbers")
+
+            buffer = buffer[1:]
+            self._opened = True
+
+        end = buffer.find(b"]")
+
+        if end >= 0:
+            self._check_whitespace(buffer[end + 1 :])
+            self._closed = True
+            self._buffer = b""
+
+            last = buffer[:end]
+            if not self._parsed and not last.strip():
+                return []
+
+            return self._parse(last)
+
+        # numbers up to the last comma are complete; whitespace around the
+        # incomplete one is squeezed, so only the number counts toward limit
+        comma = buffer.rfind(b",")
+        rest = buffer[comma + 1 :]
+        token = rest.strip(_JSON_WHITESPACE)
+        if token and rest[-1:] != token[-1:]:
+            token += b" "
+        self._buffer = token
+
+        if len(self._buffer) > _MAX_TOKEN:
+            raise ValueError("Body must be json array of numbers")
+
+        return self._parse(buffer[:comma]) if comma >= 0 else []
+
+    def close(self) -> None:
+        if not self._closed:
+            raise ValueError("Body must be json array of numbers")
+
+    def _parse(self, numbers: bytes) -> Values:
+        if not _NUMBERS.fullmatch(numbers):
+            raise ValueError("Body must be json array of numbers")
+
+        self._parsed = True
+        return list(map(float, numbers.split(b",")))
+
+    @staticmethod
+    def _check_whitespace(data: bytes) -> None:
+        if not _WHITESPACE.fullmatch(data):
+            raise ValueError("Body must be json array of numbers")
+
+
+@dataclass(slots=True)
+class Float64Parser:
+    _buffer: bytes = field(init=False, default=b"")
+
+    def feed(self, data: bytes) -> Values:
+        buffer = self._buffer + data
+        size = len(buffer) - len(buffer) % 8
+        self._buffer = buffer[size:]
+
+        values = array("d", buffer[:size])
+        if sys.byteorder == "big":
+            values.byteswap()
+
+        # plain python aggregates lists faster than arrays
+        return values.tolist()
+
+    def close(self) -> None:
+        if self._buffer:
+            raise ValueError("Body length must be multiple of 8 bytes")
+
+
+@dataclass(slots=True)
+class Summary:
+    count: int
+    mean: float
+    # population variance
+    variance: float
+    min: float
+    max: float
+    # estimated from sample, exact while count is within `RESERVOIR_SIZE`
+    quantiles: dict[float, float]
+
+
+@dataclass(slots=True)
+class Aggregate:
+    # only count and mean are aggregated unless summary is needed
+    detailed: bool = True
+
+    count: int = 0
+    mean: float = 0.0
+    # sum of squared deviations from mean
+    m2: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+
+    _sample: list[float] = field(init=False, default_factory=list)
+    _random: random.Random = field(init=False, default_factory=random.Random)
+    # reservoir is filled by algorithm L: index of the next value taken into
+    # it and weight it is chosen with
+    _next: int = field(init=False, default=RESERVOIR_SIZE - 1)
+    _weight: float = field(init=False, default=1.0)
+
+    def add(self, values: Values) -> None:
+        n = len(values)
+        if not n:
+            return
+
+        try:
+            mean = _finite(math.fsum(values) / n)
+        except (ValueError, OverflowError):
+            raise ValueError("Numbers and their sums must be finite") from None
+
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+
+        if self.detailed:
+            deviations = list(map(sub, values, repeat(mean)))
+            m2 = math.sumprod(deviations, deviations)
+            low, high = min(values), max(values)
+
+            self.m2 = _finite(self.m2 + m2 + delta * delta * self.count * n / total)
+            self.min = min(self.min, low)
+            self.max = max(self.max, high)
+
+            self._fill_sample(values)
+
+        self.count = total
+
+    def summary(self) -> Summary:
+        sample = sorted(self._sample)
+
+        return Summary(
+            count=self.count,
+            mean=self.mean,
+            variance=self.m2 / self.count if self.count else 0.0,
+            min=self.min,
+            max=self.max,
+            quantiles={q: self._quantile(sample, q) for q in QUANTILES},
+        )
+
+    def _fill_sample(self, values: Values) -> None:
+        start = self.count
+        free = RESERVOIR_SIZE - len(self._sample)
+
+        if free > 0:
+            self._sample.extend(values[:free])
+            if len(self._sample) == RESERVOIR_SIZE:
+                self._skip()
+
+        # later values are taken with decreasing probability, skips between
+        # them are drawn directly instead of a coin toss for each value
+        while self._next < start + len(values):
+            value = values[self._next - start]
+            self._sample[self._random.randrange(RESERVOIR_SIZE)] = value
+            self._skip()
+
+    def _skip(self) -> None:
+        # logarithms of uniform values from (0, 1]
+        u, v = (
+            math.log(1.0 - self._random.random()),
+            math.log(1.0 - self._random.random()),
+        )
+
+        self._weight *= math.exp(u / RESERVOIR_SIZE)
+        self._next += math.floor(v / math.log1p(-self._weight)) + 1
+
+    @staticmethod
+    def _quantile(sample: list[float], q: float) -> float:
+        # linear interpolation between closest ranks, as numpy does by default
+        if not sample:
+            return math.nan
+
+        position = q * (len(sample) - 1)
+        low = math.floor(position)
+        high = min(low + 1, len(sample) - 1)
+
+        return sample[low] + (sample[high] - sample[low]) * (position - low)
+
+
+async def aggregate(
+    chunks: AsyncIterable[bytes],
+    binary: bool,
+    detailed: bool = True,
+) -> Aggregate:
+    # raises `ValueError` if body is not array of finite numbers
+    parser = Float64Parser() if binary else JsonArrayParser()
+    result = Aggregate(detailed)
+
+    async for chunk in chunks:
+        result.add(parser.feed(chunk))
+
+    parser.close()
+
+    return result
@@ -0,0 +1,15 @@
+from .contracts import (
+    CartCreatedResponse,
+    CartEventResponse,
+    CartItemResponse,
+    CartResponse,
+)
+from .routes import router
+
+__all__ = [
+    "CartResponse",
+    "CartItemResponse",
+    "CartCreatedResponse",
+    "CartEventResponse",
+    "router",
+]
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from lecture_2.hw.shop_api.store.models import CartEntity, CartEvent
+
+
+class CartItemResponse(BaseModel):
+    id: int
+    name: str
+    quantity: int
+    available: bool
+
+
+class CartResponse(BaseModel):
+    id: int
+    items: list[CartItemResponse]
+    price: float
+
+    @staticmethod
+    def from_entity(entity: CartEntity) -> CartResponse:
+        return CartResponse(
+            id=entity.id,
+            items=[
+                CartItemResponse(
+                    id=item.id,
+                    name=item.name,
+                    quantity=item.quantity,
+                    available=item.available,
+                )
+                for item in entity.info.items
+            ],
+            price=entity.info.price,
+        )
+
+
+class CartCreatedResponse(BaseModel):
+    id: int
+
+
+class CartEventResponse(BaseModel):
+    time: datetime
+    item_id: int
+    quantity: int
+
+    @staticmethod
+    def from_event(event: CartEvent) -> CartEventResponse:
+        return CartEventResponse(
+            time=event.time,
+            item_id=event.item_id,
+            quantity=event.quantity,
+        )
@@ -0,0 +1,118 @@
+from datetime import datetime
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import NonNegativeFloat, NonNegativeInt, PositiveInt
+
+from lecture_2.hw.shop_api import store
+
+from .contracts import CartCreatedResponse, CartEventResponse, CartResponse
+
+router = APIRouter(prefix="/cart")
+
+
+@router.get("")
+async def get_cart_list(
+    offset: Annotated[NonNegativeInt, Query()] = 0,
+    limit: Annotated[PositiveInt, Query()] = 10,
+    min_price: Annotated[NonNegativeFloat | None, Query()] = None,
+    max_price: Annotated[NonNegativeFloat | None, Query()] = None,
+    min_quantity: Annotated[NonNegativeInt | None, Query()] = None,
+    max_quantity: Annotated[NonNegativeInt | None, Query()] = None,
+) -> list[CartResponse]:
+    filters = store.CartFilter(min_price, max_price, min_quantity, max_quantity)
+
+    return [
+        CartResponse.from_entity(e) for e in store.get_carts(offset, limit, filters)
+    ]
+
+
+@router.get(
+    "/{id}",
+    responses={
+        HTTPStatus.OK: {
+            "description": "Successfully returned requested cart",
+        },
+        HTTPStatus.NOT_FOUND: {
+            "description": "Failed to return requested cart as one was not found",
+        },
+    },
+)
+async def get_cart_by_id(
+    id: int,
+    at: Annotated[datetime | None, Query()] = None,
+) -> CartResponse:
+    # with `at` cart is returned as it was at that moment
+    entity = store.get_cart(id) if at is None else store.get_cart_at(id, at)
+
+    if entity is None:
+        raise HTTPException(
+            HTTPStatus.NOT_FOUND,
+            f"Request resource /cart/{id} was not found",
+        )
+
+    return CartResponse.from_entity(entity)
+
+
+@router.get(
+    "/{id}/events",
+    responses={
+        HTTPStatus.OK: {
+            "description": "Successfully returned changes of requested cart",
+        },
+        HTTPStatus.NOT_FOUND: {
+            "description": "Failed to return changes of cart as one was not found",
+        },
+    },
+)
+async def get_cart_events(
+    id: int,
+    offset: Annotated[NonNegativeInt, Query()] = 0,
+    limit: Annotated[PositiveInt, Query()] = 10,
+) -> list[CartEventResponse]:
+    events = store.get_cart_events(id, offset, limit)
+
+    if events is None:
+        raise HTTPException(
+            HTTPStatus.NOT_FOUND,
+            f"Request resource /cart/{id} was not found",
+        )
+
+    return [CartEventResponse.from_event(e) for e in events]
+
+
+@router.post(
+    "",
+    status_code=HTTPStatus.CREATED,
+)
+async def post_cart(response: Response) -> CartCreatedResponse:
+    entity = store.add_cart()
+
+    # as REST states one should provide uri to newly created resource in location header
+    response.headers["location"] = f"/cart/{entity.id}"
+
+    return CartCreatedResponse(id=entity.id)
+
+
+@router.post(
+    "/{cart_id}/add/{item_id}",
+    responses={
+        HTTPStatus.OK: {
+            "description": "Successfully added item to cart",
+        },
+        HTTPStatus.NOT_FOUND: {
+            "description": "Failed to add item as cart or item was not found",
+        },
+    },
+)
+async def add_item_to_cart(cart_id: int, item_id: int) -> CartResponse:
+    entity = store.add_to_cart(cart_id, item_id)
+
+    if entity is None:
+        raise HTTPException(
+            HTTPStatus.NOT_FOUND,
+            f"Requested resource /cart/{cart_id} or /item/{item_id} was not found",
+        )
+
+    return CartResponse.from_entity(entity)
@@ -0,0 +1,9 @@
+from .contracts import ItemRequest, ItemResponse, PatchItemRequest
+from .routes import router
+
+__all__ = [
+    "ItemResponse",
+    "ItemRequest",
+    "PatchItemRequest",
+    "router",
+]
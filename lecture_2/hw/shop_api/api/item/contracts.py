@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, ConfigDict, NonNegativeFloat
+
+from lecture_2.hw.shop_api.store.models import ItemEntity, ItemInfo, PatchItemInfo
+
+
+class ItemResponse(BaseModel):
+    id: int
+    name: str
+    price: float
+    deleted: bool
+
+    @staticmethod
+    def from_entity(entity: ItemEntity) -> ItemResponse:
+        return ItemResponse(
+            id=entity.id,
+            name=entity.info.name,
+            price=entity.info.price,
+            deleted=entity.info.deleted,
+        )
+
+
+class ItemRequest(BaseModel):
+    name: str
+    price: NonNegativeFloat
+
+    def as_item_info(self) -> ItemInfo:
+        return ItemInfo(name=self.name, price=self.price)
+
+
+class PatchItemRequest(BaseModel):
+    name: str | None = None
+    price: NonNegativeFloat | None = None
+
+    # `deleted` is changed only by DELETE
+    model_config = ConfigDict(extra="forbid")
+
+    def as_patch_item_info(self) -> PatchItemInfo:
+        return PatchItemInfo(name=self.name, price=self.price)
@@ -1,3 +1,43 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-app = FastAPI(title="Shop API")
+from lecture_2.hw.shop_api import store
+from lecture_2.hw.shop_api.api import cart, item
+
+# SHOP_CART_PROPAGATION_INTERVAL=0.1 makes item changes reach totals of carts
+# with it in background every given number of seconds instead of right away
+PROPAGATION_INTERVAL = float(os.environ.get("SHOP_CART_PROPAGATION_INTERVAL", "0"))
+# number of changed items applied to carts before yielding to other requests
+PROPAGATION_BATCH = 100
+
+
+async def propagate_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+
+        while store.flush_pending(PROPAGATION_BATCH):
+            await asyncio.sleep(0)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not PROPAGATION_INTERVAL:
+        yield
+        return
+
+    store.defer_propagation(True)
+    task = asyncio.create_task(propagate_periodically(PROPAGATION_INTERVAL))
+
+    yield
+
+    task.cancel()
+    store.defer_propagation(False)
+
+
+app = FastAPI(title="Shop API", lifespan=lifespan)
+
+app.include_router(item.router)
+app.include_router(cart.router)
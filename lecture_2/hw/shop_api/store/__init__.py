@@ -0,0 +1,53 @@
+from .models import (
+    CartEntity,
+    CartEvent,
+    CartFilter,
+    CartInfo,
+    CartItemInfo,
+    ItemEntity,
+    ItemFilter,
+    ItemInfo,
+    PatchItemInfo,
+)
+from .queries import (
+    add_cart,
+    add_item,
+    add_to_cart,
+    defer_propagation,
+    delete_item,
+    flush_pending,
+    get_cart,
+    get_cart_at,
+    get_cart_events,
+    get_carts,
+    get_item,
+    get_items,
+    patch_item,
+    replace_item,
+)
+
+__all__ = [
+    "ItemEntity",
+    "ItemInfo",
+    "PatchItemInfo",
+    "ItemFilter",
+    "CartEntity",
+    "CartInfo",
+    "CartItemInfo",
+    "CartEvent",
+    "CartFilter",
+    "add_item",
+    "get_item",
+    "get_items",
+    "replace_item",
+    "patch_item",
+    "delete_item",
+    "add_cart",
+    "get_cart",
+    "get_cart_at",
+    "get_cart_events",
+    "get_carts",
+    "add_to_cart",
+    "defer_propagation",
+    "flush_pending",
+]
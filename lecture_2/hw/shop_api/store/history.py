@@ -0,0 +1,159 @@
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Iterator
+
+# changes of carts are kept as append-only stream of events stored by columns
+# (time, item, quantity delta and position of previous event of the same
+# cart), 24 bytes per event without python object per event; every
+# `_SNAPSHOT_EVERY` events of a cart its content is snapshotted, so state of
+# a cart at any moment is rebuilt from the last snapshot before it and at most
+# `_SNAPSHOT_EVERY` events which follow it
+_SNAPSHOT_EVERY = 64
+
+_NO_EVENT = -1
+
+
+@dataclass(slots=True)
+class _Snapshot:
+    # position of the last event included into snapshot
+    position: int
+    items: array
+    quantities: array
+
+
+@dataclass(slots=True)
+class _CartLog:
+    last: int = _NO_EVENT
+    since_snapshot: int = 0
+    snapshot_times: array = field(default_factory=lambda: array("q"))
+    snapshots: list[_Snapshot] = field(default_factory=list)
+
+
+def _snapshot(position: int, quantities: dict[int, int]) -> _Snapshot:
+    return _Snapshot(
+        position, array("I", quantities.keys()), array("i", quantities.values())
+    )
+
+
+@dataclass(slots=True)
+class CartHistory:
+    _times: array = field(init=False, default_factory=lambda: array("q"))
+    _items: array = field(init=False, default_factory=lambda: array("I"))
+    _deltas: array = field(init=False, default_factory=lambda: array("i"))
+    _previous: array = field(init=False, default_factory=lambda: array("q"))
+    _logs: dict[int, _CartLog] = field(init=False, default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def create(self, cart_id: int, time: int) -> None:
+        # creation is the first snapshot of empty cart
+        log = _CartLog()
+        log.snapshot_times.append(time)
+        log.snapshots.append(_snapshot(_NO_EVENT, {}))
+        self._logs[cart_id] = log
+
+    def append(self, cart_id: int, item_id: int, delta: int, time: int) -> None:
+        log = self._logs[cart_id]
+        position = len(self._times)
+
+        self._times.append(time)
+        self._items.append(item_id)
+        self._deltas.append(delta)
+        self._previous.append(log.last)
+
+        log.last = position
+        log.since_snapshot += 1
+
+        if log.since_snapshot == _SNAPSHOT_EVERY:
+            quantities = self._replay(log, len(log.snapshots) - 1, position)
+            log.snapshot_times.append(time)
+            log.snapshots.append(_snapshot(position, quantities))
+            log.since_snapshot = 0
+
+    def quantities(self, cart_id: int) -> dict[int, int]:
+        # item id -> quantity of current cart content, in order items were
+        # first added to cart
+        log = self._logs[cart_id]
+        return self._replay(log, len(log.snapshots) - 1, log.last)
+
+    def quantities_at(self, cart_id: int, time: int) -> dict[int, int] | None:
+        # `None` if cart did not exist at that moment
+        log = self._logs.get(cart_id)
+        if log is None:
+            return None
+
+        i = bisect_right(log.snapshot_times, time) - 1
+        if i < 0:
+            return None
+
+        # events after the base snapshot are found walking back from the next
+        # snapshot (or the last event), so at most `_SNAPSHOT_EVERY` of them
+        # are visited
+        end = log.snapshots[i + 1].position if i + 1 < len(log.snapshots) else log.last
+        while end != log.snapshots[i].position and self._times[end] > time:
+            end = self._previous[end]
+
+        return self._replay(log, i, end)
+
+    def events(self, cart_id: int) -> Iterator[tuple[int, int, int]]:
+        # (time, item id, quantity delta) of cart events in order they happened
+        log = self._logs.get(cart_id)
+        positions = []
+
+        position = _NO_EVENT if log is None else log.last
+        while position != _NO_EVENT:
+            positions.append(position)
+            position = self._previous[position]
+
+        for position in reversed(positions):
+            yield self._times[position], self._items[position], self._deltas[position]
+
+    def _replay(self, log: _CartLog, snapshot: int, end: int) -> dict[int, int]:
+        # applies events after snapshot up to position `end` inclusive
+        base = log.snapshots[snapshot]
+        positions = []
+
+        while end != base.position:
+            positions.append(end)
+            end = self._previous[end]
+
+        quantities = dict(zip(base.items, base.quantities))
+        items, deltas = self._items, self._deltas
+
+        for position in reversed(positions):
+            item = items[position]
+            quantity = quantities.get(item, 0) + deltas[position]
+
+            if quantity:
+                quantities[item] = quantity
+            else:
+                quantities.pop(item, None)
+
+        return quantities
+
+
+@dataclass(slots=True)
+class _ItemLog:
+    times: array = field(default_factory=lambda: array("q"))
+    # states of item after every change, items change rarely compared to carts
+    states: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ItemHistory[TState]:
+    _logs: dict[int, _ItemLog] = field(init=False, default_factory=dict)
+
+    def append(self, item_id: int, state: TState, time: int) -> None:
+        log = self._logs.setdefault(item_id, _ItemLog())
+        log.times.append(time)
+        log.states.append(state)
+
+    def state_at(self, item_id: int, time: int) -> TState | None:
+        log = self._logs.get(item_id)
+        if log is None:
+            return None
+
+        i = bisect_right(log.times, time) - 1
+        return log.states[i] if i >= 0 else None
@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(slots=True)
+class ItemInfo:
+    name: str
+    price: float
+    deleted: bool = False
+
+
+@dataclass(slots=True)
+class ItemEntity:
+    id: int
+    info: ItemInfo
+
+
+@dataclass(slots=True)
+class PatchItemInfo:
+    name: str | None = None
+    price: float | None = None
+
+
+@dataclass(slots=True)
+class ItemFilter:
+    min_price: float | None = None
+    max_price: float | None = None
+    show_deleted: bool = False
+
+
+@dataclass(slots=True)
+class CartItemInfo:
+    id: int
+    name: str
+    quantity: int
+    available: bool
+
+
+@dataclass(slots=True)
+class CartInfo:
+    items: list[CartItemInfo]
+    # total price of available (not deleted) items
+    price: float
+    # total number of items, including unavailable ones
+    quantity: int
+
+
+@dataclass(slots=True)
+class CartEntity:
+    id: int
+    info: CartInfo
+
+
+@dataclass(slots=True)
+class CartEvent:
+    time: datetime
+    item_id: int
+    # change of item quantity in cart
+    quantity: int
+
+
+@dataclass(slots=True)
+class CartFilter:
+    min_price: float | None = None
+    max_price: float | None = None
+    min_quantity: int | None = None
+    max_quantity: int | None = None
+
+    def matches(self, price: float, quantity: int) -> bool:
+        return (
+            (self.min_price is None or price >= self.min_price)
+            and (self.max_price is None or price <= self.max_price)
+            and (self.min_quantity is None or quantity >= self.min_quantity)
+            and (self.max_quantity is None or quantity <= self.max_quantity)
+        )
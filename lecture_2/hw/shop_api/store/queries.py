@@ -0,0 +1,386 @@
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from fractions import Fraction
+from itertools import count, islice
+from math import inf
+from time import time_ns
+from typing import Iterable, Iterator
+
+from lecture_2.hw.shop_api.store.history import CartHistory, ItemHistory
+from lecture_2.hw.shop_api.store.models import (
+    CartEntity,
+    CartEvent,
+    CartFilter,
+    CartInfo,
+    CartItemInfo,
+    ItemEntity,
+    ItemFilter,
+    ItemInfo,
+    PatchItemInfo,
+)
+from lecture_2.rest_example.store.index import SortedIndex
+
+
+@dataclass(slots=True)
+class _Cart:
+    # items of cart are not kept here, they are rebuilt from cart history;
+    # totals are maintained on every change of cart or its items, so they are
+    # never recomputed on read; total price is kept exact, as float one would
+    # accumulate rounding error of every change, and `price` is it rounded
+    total: Fraction = Fraction()
+    price: float = 0.0
+    quantity: int = 0
+
+
+_items = dict[int, ItemInfo]()
+_carts = dict[int, _Cart]()
+
+# listings are read from sorted indexes: range of index matching filter is
+# found by bisect and page is read from it by position, so listing costs
+# O(log n + limit); items and carts are never removed, so their ids are
+# `range` of created ones
+#
+# (price, item id) of items including deleted ones (by `True`) or not
+_item_prices = {
+    True: SortedIndex[tuple[float, int]](),
+    False: SortedIndex[tuple[float, int]](),
+}
+_live_item_ids = SortedIndex[int]()
+# (total price, cart id) and (total quantity, cart id) of every cart
+_cart_prices = SortedIndex[tuple[float, int]]()
+_cart_quantities = SortedIndex[tuple[int, int]]()
+
+# item id -> cart id -> quantity of item in cart, so change of item touches
+# only carts it is in
+_item_carts = dict[int, dict[int, int]]()
+
+# changes of carts and items in order they happened, time is in microseconds
+# since epoch and grows with every change, so any change can be addressed by
+# its time
+_history = CartHistory()
+_item_history = ItemHistory[ItemInfo]()
+_time = 0
+
+# with deferred propagation item changes are applied to carts totals in
+# batches by `flush_pending` (e.g. from background task), so item writes do
+# not depend on number of carts with it, while carts totals lag behind;
+# item id -> item as carts totals see it
+_deferred = False
+_pending = dict[int, ItemInfo]()
+
+_item_ids = count()
+_cart_ids = count()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _now() -> int:
+    global _time
+
+    _time = max(time_ns() // 1_000, _time + 1)
+    return _time
+
+
+def _to_time(value: datetime) -> int:
+    # naive datetime is taken as utc one
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _from_time(time: int) -> datetime:
+    return _EPOCH + time * _MICROSECOND
+
+
+def _cart_entity(id: int, cart: _Cart) -> CartEntity:
+    items = [
+        CartItemInfo(
+            id=item_id,
+            name=_items[item_id].name,
+            quantity=quantity,
+            available=not _items[item_id].deleted,
+        )
+        for item_id, quantity in _history.quantities(id).items()
+    ]
+
+    return CartEntity(id, CartInfo(items, cart.price, cart.quantity))
+
+
+def _range(
+    index: SortedIndex[tuple[float, int]],
+    low: float | None,
+    high: float | None,
+) -> tuple[int, int]:
+    start = index.bisect_left((-inf if low is None else low,))
+    stop = index.bisect_right((inf if high is None else high, inf))
+    return start, stop
+
+
+def _index_item(id: int, info: ItemInfo) -> None:
+    _item_prices[True].add((info.price, id))
+
+    if not info.deleted:
+        _item_prices[False].add((info.price, id))
+        _live_item_ids.add(id)
+
+
+def _unindex_item(id: int, info: ItemInfo) -> None:
+    _item_prices[True].discard((info.price, id))
+    _item_prices[False].discard((info.price, id))
+    _live_item_ids.discard(id)
+
+
+def _set_cart_total(id: int, cart: _Cart, total: Fraction) -> None:
+    _cart_prices.discard((cart.price, id))
+    cart.total = total
+    cart.price = float(total)
+    _cart_prices.add((cart.price, id))
+
+
+def _change_item(id: int, old: ItemInfo, new: ItemInfo) -> None:
+    if _deferred:
+        # several changes of item before flush are applied as one
+        _pending.setdefault(id, old)
+        return
+
+    _propagate(id, old, new)
+
+
+def _propagate(id: int, old: ItemInfo, new: ItemInfo) -> None:
+    # carts keep totals of available items only, so deleted item has no price
+    old_price = 0.0 if old.deleted else old.price
+    new_price = 0.0 if new.deleted else new.price
+
+    if old_price == new_price:
+        return
+
+    delta = Fraction(new_price) - Fraction(old_price)
+
+    for cart_id, quantity in _item_carts.get(id, {}).items():
+        cart = _carts[cart_id]
+        _set_cart_total(cart_id, cart, cart.total + delta * quantity)
+
+
+def defer_propagation(enabled: bool) -> None:
+    global _deferred
+
+    if not enabled:
+        flush_pending()
+
+    _deferred = enabled
+
+
+def flush_pending(limit: int | None = None) -> int:
+    # applies changes of at most `limit` items, returns number of items which
+    # are still pending
+    for _ in range(len(_pending) if limit is None else min(limit, len(_pending))):
+        id, seen = _pending.popitem()
+        _propagate(id, seen, _items[id])
+
+    return len(_pending)
+
+
+def add_item(info: ItemInfo) -> ItemEntity:
+    id = next(_item_ids)
+    _items[id] = info
+    _index_item(id, info)
+    _item_history.append(id, info, _now())
+
+    return ItemEntity(id, info)
+
+
+def get_item(id: int) -> ItemEntity | None:
+    info = _items.get(id)
+
+    if info is None:
+        return None
+
+    return ItemEntity(id, info)
+
+
+def get_items(
+    offset: int = 0,
+    limit: int = 10,
+    filters: ItemFilter | None = None,
+) -> Iterator[ItemEntity]:
+    filters = filters or ItemFilter()
+
+    # items filtered by price are listed in order of price, others by id
+    if filters.min_price is not None or filters.max_price is not None:
+        index = _item_prices[filters.show_deleted]
+        start, stop = _range(index, filters.min_price, filters.max_price)
+        start += offset
+        keys = index.islice(start, min(stop, start + limit))
+        ids: Iterable[int] = (id for _, id in keys)
+    elif filters.show_deleted:
+        ids = range(len(_items))[offset : offset + limit]
+    else:
+        ids = _live_item_ids.islice(offset, offset + limit)
+
+    return (ItemEntity(id, _items[id]) for id in ids)
+
+
+def replace_item(id: int, info: ItemInfo) -> ItemEntity | None:
+    # deleted items can not be changed
+    old = _items.get(id)
+    if old is None or old.deleted:
+        return None
+
+    # items are never modified in place, so carts totals are changed by
+    # difference between old and new item
+    _unindex_item(id, old)
+    _items[id] = info
+    _index_item(id, info)
+    _item_history.append(id, info, _now())
+    _change_item(id, old, info)
+
+    return ItemEntity(id, info)
+
+
+def patch_item(id: int, patch_info: PatchItemInfo) -> ItemEntity | None:
+    old = _items.get(id)
+    if old is None or old.deleted:
+        return None
+
+    return replace_item(
+        id,
+        ItemInfo(
+            name=old.name if patch_info.name is None else patch_info.name,
+            price=old.price if patch_info.price is None else patch_info.price,
+        ),
+    )
+
+
+def delete_item(id: int) -> bool:
+    old = _items.get(id)
+    if old is None:
+        return False
+
+    if not old.deleted:
+        info = ItemInfo(old.name, old.price, deleted=True)
+        _unindex_item(id, old)
+        _items[id] = info
+        _index_item(id, info)
+        _item_history.append(id, info, _now())
+        _change_item(id, old, info)
+
+    return True
+
+
+def add_cart() -> CartEntity:
+    id = next(_cart_ids)
+    cart = _Cart()
+
+    _carts[id] = cart
+    _cart_prices.add((cart.price, id))
+    _cart_quantities.add((cart.quantity, id))
+    _history.create(id, _now())
+
+    return _cart_entity(id, cart)
+
+
+def get_cart(id: int) -> CartEntity | None:
+    cart = _carts.get(id)
+
+    if cart is None:
+        return None
+
+    return _cart_entity(id, cart)
+
+
+def get_cart_at(id: int, time: datetime) -> CartEntity | None:
+    # cart as it was at given moment, `None` if it did not exist yet; totals
+    # are computed from items as they were at that moment
+    at = _to_time(time)
+    quantities = _history.quantities_at(id, at)
+
+    if quantities is None:
+        return None
+
+    items = []
+    total = Fraction()
+
+    for item_id, quantity in quantities.items():
+        info = _item_history.state_at(item_id, at)
+        items.append(CartItemInfo(item_id, info.name, quantity, not info.deleted))
+
+        if not info.deleted:
+            total += Fraction(info.price) * quantity
+
+    return CartEntity(id, CartInfo(items, float(total), sum(quantities.values())))
+
+
+def get_cart_events(
+    id: int,
+    offset: int = 0,
+    limit: int = 10,
+) -> list[CartEvent] | None:
+    if id not in _carts:
+        return None
+
+    events = islice(_history.events(id), offset, offset + limit)
+    return [CartEvent(_from_time(time), item, delta) for time, item, delta in events]
+
+
+def get_carts(
+    offset: int = 0,
+    limit: int = 10,
+    filters: CartFilter | None = None,
+) -> Iterator[CartEntity]:
+    filters = filters or CartFilter()
+    by_price = filters.min_price is not None or filters.max_price is not None
+    by_quantity = filters.min_quantity is not None or filters.max_quantity is not None
+
+    # carts filtered by price are listed in order of price, filtered only by
+    # quantity - in order of quantity, others - in order of creation; when
+    # both filters are given quantity is checked for carts in price range
+    if by_price:
+        index = _cart_prices
+        start, stop = _range(index, filters.min_price, filters.max_price)
+    elif by_quantity:
+        index = _cart_quantities
+        start, stop = _range(index, filters.min_quantity, filters.max_quantity)
+    else:
+        ids = range(len(_carts))[offset : offset + limit]
+        return (_cart_entity(id, _carts[id]) for id in ids)
+
+    if not (by_price and by_quantity):
+        start += offset
+        stop = min(stop, start + limit)
+        offset = 0
+
+    matched = (
+        id
+        for _, id in index.islice(start, stop)
+        if filters.matches(_carts[id].price, _carts[id].quantity)
+    )
+
+    return (
+        _cart_entity(id, _carts[id]) for id in islice(matched, offset, offset + limit)
+    )
+
+
+def add_to_cart(cart_id: int, item_id: int) -> CartEntity | None:
+    cart = _carts.get(cart_id)
+    item = _items.get(item_id)
+
+    if cart is None or item is None or item.deleted:
+        return None
+
+    # totals of carts must have item at its current price before one more of
+    # it is added at this price
+    if (seen := _pending.pop(item_id, None)) is not None:
+        _propagate(item_id, seen, item)
+
+    carts = _item_carts.setdefault(item_id, {})
+    carts[cart_id] = carts.get(cart_id, 0) + 1
+    _history.append(cart_id, item_id, 1, _now())
+    _cart_quantities.discard((cart.quantity, cart_id))
+    cart.quantity += 1
+    _cart_quantities.add((cart.quantity, cart_id))
+    _set_cart_total(cart_id, cart, cart.total + Fraction(item.price))
+
+    return _cart_entity(cart_id, cart)
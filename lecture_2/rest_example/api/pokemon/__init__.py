@@ -1,9 +1,24 @@
-from .contracts import PatchPokemonRequest, PokemonRequest, PokemonResponse
+from . import cache, encoding
+from .contracts import (
+    BatchCreatedResponse,
+    BatchModifiedResponse,
+    CacheStatsResponse,
+    PatchPokemonBatchItem,
+    PatchPokemonRequest,
+    PokemonRequest,
+    PokemonResponse,
+)
 from .routes import router
 
 __all__ = [
     "PokemonResponse",
     "PokemonRequest",
     "PatchPokemonRequest",
+    "PatchPokemonBatchItem",
+    "BatchCreatedResponse",
+    "BatchModifiedResponse",
+    "CacheStatsResponse",
+    "cache",
+    "encoding",
     "router",
 ]
@@ -0,0 +1,211 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Awaitable, Callable, Hashable
+
+from lecture_2.rest_example import store
+
+# responses of pokemon routes are cached already encoded, so a hit costs a
+# dict lookup; entries are invalidated by store listener on every change of
+# the pokemon they were built from (pages - on any change, as any pokemon may
+# be added to or removed from them), ttl only bounds staleness for changes
+# which are not seen by this process (e.g. other workers sharing memory)
+
+# approximate size of entry bookkeeping besides body and headers
+_ENTRY_OVERHEAD = 256
+
+PAGES = "pages"
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    body: bytes
+    headers: dict[str, str]
+
+    @property
+    def size(self) -> int:
+        return (
+            len(self.body)
+            + sum(len(k) + len(v) for k, v in self.headers.items())
+            + _ENTRY_OVERHEAD
+        )
+
+
+@dataclass(slots=True)
+class _Entry:
+    response: CachedResponse
+    tag: Hashable
+    expires: float
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    expirations: int = 0
+
+
+@dataclass(slots=True)
+class ResponseCache:
+    max_bytes: int = 64 << 20
+    ttl: float = 60.0
+
+    stats: CacheStats = field(init=False, default_factory=CacheStats)
+    _entries: OrderedDict[Hashable, _Entry] = field(
+        init=False, default_factory=OrderedDict
+    )
+    _tags: dict[Hashable, set[Hashable]] = field(init=False, default_factory=dict)
+    _loading: dict[Hashable, asyncio.Future] = field(init=False, default_factory=dict)
+    _bytes: int = field(init=False, default=0)
+    # grows on every invalidation, response loaded while it has changed may
+    # be stale already and is not cached
+    _epoch: int = field(init=False, default=0)
+    # store listeners are called from threadpool workers as well
+    _lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry.expires <= monotonic():
+                self._drop(key)
+                self.stats.expirations += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return entry.response
+
+    def put(self, key: Hashable, tag: Hashable, response: CachedResponse) -> None:
+        size = response.size
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._drop(key)
+
+            while self._bytes + size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+            self._entries[key] = _Entry(response, tag, monotonic() + self.ttl)
+            self._tags.setdefault(tag, set()).add(key)
+            self._bytes += size
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        tag: Hashable,
+        load: Callable[[], Awaitable[CachedResponse | None]],
+    ) -> CachedResponse | None:
+        # concurrent misses of the same key wait for the first one to load
+        # response instead of loading it again (single-flight)
+        if (response := self.get(key)) is not None:
+            self.stats.hits += 1
+            return response
+
+        while (loading := self._loading.get(key)) is not None:
+            self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(loading)
+            except asyncio.CancelledError:
+                # request which was loading response is gone, so it is
+                # loaded again unless this request is cancelled itself
+                if not loading.cancelled():
+                    raise
+
+        self.stats.misses += 1
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[key] = loading
+        epoch = self._epoch
+
+        try:
+            response = await load()
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except Exception as e:
+            loading.set_exception(e)
+            # nobody might be waiting for this miss
+            loading.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+        if response is not None and epoch == self._epoch:
+            self.put(key, tag, response)
+
+        loading.set_result(response)
+        return response
+
+    def invalidate(self, tag: Hashable) -> None:
+        with self._lock:
+            self._epoch += 1
+
+            for key in self._tags.pop(tag, ()):
+                self._drop(key)
+                self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self.stats.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self._bytes -= entry.response.size
+
+        keys = self._tags.get(entry.tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[entry.tag]
+
+
+_cache = ResponseCache()
+
+
+def use(cache: ResponseCache) -> None:
+    global _cache
+
+    _cache = cache
+
+
+def current() -> ResponseCache:
+    return _cache
+
+
+def _on_change(id: int | None) -> None:
+    if id is None:
+        _cache.clear()
+        return
+
+    _cache.invalidate(id)
+    _cache.invalidate(PAGES)
+
+
+store.subscribe(_on_change)
@@ -0,0 +1,59 @@
+from datetime import UTC, datetime
+from email.utils import format_datetime
+from hashlib import blake2b
+from typing import Iterable
+
+from lecture_2.rest_example.store.models import PokemonEntity
+
+# pokemon version is a strong validator of its representation, while page of
+# pokemons gets weak one: it is a digest of ids and versions of pokemons on it
+
+
+def entity_etag(entity: PokemonEntity) -> str:
+    return f'"{entity.version}"'
+
+
+def page_etag(entities: Iterable[PokemonEntity]) -> str:
+    digest = blake2b(digest_size=16)
+
+    for entity in entities:
+        digest.update(f"{entity.id}:{entity.version};".encode())
+
+    return f'W/"{digest.hexdigest()}"'
+
+
+def last_modified(entity: PokemonEntity) -> str:
+    # version is a number of microseconds since epoch of the last change
+    modified = datetime.fromtimestamp(entity.version / 1_000_000, UTC)
+    return format_datetime(modified, usegmt=True)
+
+
+def _tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _opaque(tag: str) -> str:
+    return tag.removeprefix("W/")
+
+
+def none_match(header: str | None, etag: str) -> bool:
+    # If-None-Match uses weak comparison, i.e. `W/` prefix is ignored; true
+    # means that client already has current representation
+    if header is None:
+        return False
+
+    tags = _tags(header)
+    return "*" in tags or _opaque(etag) in map(_opaque, tags)
+
+
+def match(header: str | None, etag: str | None) -> bool:
+    # If-Match uses strong comparison and fails when there is no resource;
+    # missing header matches anything
+    if header is None:
+        return True
+
+    if etag is None or etag.startswith("W/"):
+        return False
+
+    tags = _tags(header)
+    return "*" in tags or etag in tags
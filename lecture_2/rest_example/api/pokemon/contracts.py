@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, ConfigDict
+from enum import StrEnum
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 
 from lecture_2.rest_example.store.models import (
     PatchPokemonInfo,
@@ -39,3 +41,48 @@ class PatchPokemonRequest(BaseModel):
 
     def as_patch_pokemon_info(self) -> PatchPokemonInfo:
         return PatchPokemonInfo(name=self.name, published=self.published)
+
+
+class PatchPokemonBatchItem(PatchPokemonRequest):
+    id: int
+
+
+class BatchCreatedResponse(BaseModel):
+    ids: list[int]
+
+
+class BatchModifiedResponse(BaseModel):
+    modified: list[int]
+    not_found: list[int]
+
+
+class CacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    invalidations: int
+    expirations: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+
+# json batches are validated with a single pass over the whole body, ndjson
+# ones - line by line, so that every line holds exactly one item
+PokemonRequestList = TypeAdapter(list[PokemonRequest])
+PatchPokemonBatch = TypeAdapter(list[PatchPokemonBatchItem])
+PokemonIdList = TypeAdapter(list[int])
+
+PokemonRequestLine = TypeAdapter(PokemonRequest)
+PatchPokemonBatchLine = TypeAdapter(PatchPokemonBatchItem)
+PokemonIdLine = TypeAdapter(int)
+
+
+class ExportFormat(StrEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    @property
+    def media_type(self) -> str:
+        return "application/x-ndjson" if self == ExportFormat.NDJSON else "text/csv"
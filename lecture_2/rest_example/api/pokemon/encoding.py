@@ -0,0 +1,61 @@
+from http import HTTPStatus
+from json.encoder import encode_basestring
+from typing import Iterable
+
+from fastapi import Response
+
+from lecture_2.rest_example.store.models import PokemonEntity
+
+# pokemons can be encoded to json right from store entities: schema of
+# `PokemonResponse` is fixed, so its encoding is a template with C-accelerated
+# string escaping, and there is no need to build and validate pydantic models
+# and dump them afterwards; output is byte-for-byte the same as pydantic one
+#
+# fast path is off by default and is enabled with `use_fast_path`
+
+JSON_MEDIA_TYPE = "application/json"
+
+_fast_path = False
+
+
+def use_fast_path(enabled: bool) -> None:
+    global _fast_path
+
+    _fast_path = enabled
+
+
+def fast_path_enabled() -> bool:
+    return _fast_path
+
+
+def _encode(entity: PokemonEntity) -> str:
+    info = entity.info
+
+    return (
+        f'{{"id":{entity.id:d},'
+        f'"name":{encode_basestring(info.name)},'
+        f'"published":{"true" if info.published else "false"}}}'
+    )
+
+
+def encode_entity(entity: PokemonEntity) -> bytes:
+    return _encode(entity).encode()
+
+
+def encode_entities(entities: Iterable[PokemonEntity]) -> bytes:
+    return f"[{','.join(map(_encode, entities))}]".encode()
+
+
+def json_response(
+    content: bytes,
+    response: Response,
+    status_code: int = HTTPStatus.OK,
+) -> Response:
+    # headers which route has set on injected `response` are lost when route
+    # returns its own response, so they are copied
+    return Response(
+        content,
+        status_code=status_code,
+        headers=dict(response.headers),
+        media_type=JSON_MEDIA_TYPE,
+    )
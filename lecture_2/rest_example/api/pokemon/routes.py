@@ -1,26 +1,268 @@
+import csv
+import io
+from dataclasses import asdict, astuple
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, AsyncIterator
 
-from fastapi import APIRouter, HTTPException, Query, Response
-from pydantic import NonNegativeInt, PositiveInt
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import NonNegativeInt, PositiveInt, TypeAdapter, ValidationError
 
 from lecture_2.rest_example import store
 
+from . import cache, conditional, encoding
 from .contracts import (
+    BatchCreatedResponse,
+    BatchModifiedResponse,
+    CacheStatsResponse,
+    ExportFormat,
+    PatchPokemonBatch,
+    PatchPokemonBatchLine,
     PatchPokemonRequest,
+    PokemonIdLine,
+    PokemonIdList,
     PokemonRequest,
+    PokemonRequestLine,
+    PokemonRequestList,
     PokemonResponse,
 )
 
 router = APIRouter(prefix="/pokemon")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _body_errors(e: ValidationError, *loc: int) -> list[dict]:
+    return [
+        {**error, "loc": ("body", *loc, *error["loc"])}
+        for error in e.errors(include_url=False)
+    ]
+
+
+async def _read_batch[T](
+    request: Request,
+    adapter: TypeAdapter[list[T]],
+    line_adapter: TypeAdapter[T],
+) -> list[T]:
+    # batch is either json array or ndjson (one json value per line), every
+    # line of the latter is validated as a single item
+    body = await request.body()
+
+    if not request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        try:
+            return adapter.validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(_body_errors(e))
+
+    items, errors = [], []
+    lines = (line for line in body.splitlines() if line.strip())
+
+    for i, line in enumerate(lines):
+        try:
+            items.append(line_adapter.validate_json(line))
+        except ValidationError as e:
+            errors += _body_errors(e, i)
+
+    if errors:
+        raise RequestValidationError(errors)
+
+    return items
+
+
+def _not_modified(headers: dict[str, str]) -> Response:
+    # client revalidated its cached copy, so only validators are sent back
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+
+
+def _validators(entity: store.PokemonEntity) -> dict[str, str]:
+    return {
+        "etag": conditional.entity_etag(entity),
+        "last-modified": conditional.last_modified(entity),
+    }
+
+
+def _expected_version(id: int, if_match: str | None) -> int | None:
+    # change is applied only if pokemon still has version which client
+    # has seen, it is checked again by store under write lock
+    if if_match is None:
+        return None
+
+    entity = store.get_one(id)
+    etag = None if entity is None else conditional.entity_etag(entity)
+
+    if not conditional.match(if_match, etag):
+        raise HTTPException(
+            HTTPStatus.PRECONDITION_FAILED,
+            f"Requested resource /pokemon/{id} does not match {if_match}",
+        )
+
+    return None if entity is None else entity.version
+
+
+def _render(
+    entity: store.PokemonEntity,
+    response: Response,
+    status_code: int = HTTPStatus.OK,
+) -> PokemonResponse | Response:
+    # raw response skips response model validation and encoding by fastapi
+    if encoding.fast_path_enabled():
+        content = encoding.encode_entity(entity)
+        return encoding.json_response(content, response, status_code)
+
+    return PokemonResponse.from_entity(entity)
+
+
+def _cached(
+    response: cache.CachedResponse,
+    if_none_match: str | None,
+) -> Response:
+    if conditional.none_match(if_none_match, response.headers["etag"]):
+        return _not_modified(response.headers)
+
+    return Response(
+        response.body,
+        headers=response.headers,
+        media_type=encoding.JSON_MEDIA_TYPE,
+    )
+
+
+def _modified(ids: list[int], found: list[bool]) -> BatchModifiedResponse:
+    return BatchModifiedResponse(
+        modified=[id for id, ok in zip(ids, found) if ok],
+        not_found=[id for id, ok in zip(ids, found) if not ok],
+    )
+
 
 @router.get("/")
 async def get_pokemon_list(
+    response: Response,
     offset: Annotated[NonNegativeInt, Query()] = 0,
     limit: Annotated[PositiveInt, Query()] = 10,
+    after_id: Annotated[int | None, Query()] = None,
+    published: Annotated[bool | None, Query()] = None,
+    name_prefix: Annotated[str | None, Query()] = None,
+    name_contains: Annotated[str | None, Query()] = None,
+    sort: Annotated[store.PokemonSort, Query()] = store.PokemonSort.ID,
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> list[PokemonResponse]:
-    return [PokemonResponse.from_entity(e) for e in store.get_many(offset, limit)]
+    filters = store.PokemonFilter(published, name_prefix, name_contains)
+
+    if (responses := cache.current()).enabled:
+
+        async def load() -> cache.CachedResponse:
+            entities = list(store.get_many(offset, limit, after_id, filters, sort))
+            etag = conditional.page_etag(entities)
+            return cache.CachedResponse(
+                encoding.encode_entities(entities), {"etag": etag}
+            )
+
+        key = (cache.PAGES, offset, limit, after_id, *astuple(filters), sort)
+        page = await responses.get_or_load(key, cache.PAGES, load)
+        return _cached(page, if_none_match)
+
+    entities = list(store.get_many(offset, limit, after_id, filters, sort))
+
+    etag = conditional.page_etag(entities)
+    if conditional.none_match(if_none_match, etag):
+        return _not_modified({"etag": etag})
+
+    response.headers["etag"] = etag
+
+    if encoding.fast_path_enabled():
+        return encoding.json_response(encoding.encode_entities(entities), response)
+
+    return [PokemonResponse.from_entity(e) for e in entities]
+
+
+@router.post(
+    "/batch",
+    status_code=HTTPStatus.CREATED,
+)
+async def post_pokemon_batch(request: Request) -> BatchCreatedResponse:
+    infos = await _read_batch(request, PokemonRequestList, PokemonRequestLine)
+    entities = store.add_many(info.as_pokemon_info() for info in infos)
+
+    return BatchCreatedResponse(ids=[entity.id for entity in entities])
+
+
+@router.patch("/batch")
+async def patch_pokemon_batch(request: Request) -> BatchModifiedResponse:
+    items = await _read_batch(request, PatchPokemonBatch, PatchPokemonBatchLine)
+    entities = store.patch_many(
+        (item.id, item.as_patch_pokemon_info()) for item in items
+    )
+
+    return _modified(
+        [item.id for item in items],
+        [entity is not None for entity in entities],
+    )
+
+
+@router.delete("/batch")
+async def delete_pokemon_batch(request: Request) -> BatchModifiedResponse:
+    ids = await _read_batch(request, PokemonIdList, PokemonIdLine)
+
+    return _modified(ids, store.delete_many(ids))
+
+
+@router.get("/cache/stats")
+async def get_cache_stats() -> CacheStatsResponse:
+    responses = cache.current()
+
+    return CacheStatsResponse(
+        **asdict(responses.stats),
+        entries=len(responses),
+        bytes=responses.bytes,
+        max_bytes=responses.max_bytes,
+    )
+
+
+async def _export_chunks(
+    format: ExportFormat,
+    chunk_size: int,
+) -> AsyncIterator[str | bytes]:
+    # collection is read page by page with keyset pagination, so only one
+    # chunk is held in memory; next chunk is read only after previous one is
+    # sent to client (StreamingResponse awaits every send)
+    if format == ExportFormat.CSV:
+        yield "id,name,published\r\n"
+
+    after_id = None
+
+    while entities := list(store.get_many(0, chunk_size, after_id)):
+        if format == ExportFormat.CSV:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                # booleans are written as json ones, as in ndjson export
+                (e.id, e.info.name, "true" if e.info.published else "false")
+                for e in entities
+            )
+            yield buffer.getvalue()
+        else:
+            yield b"".join(encoding.encode_entity(e) + b"\n" for e in entities)
+
+        after_id = entities[-1].id
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK: {
+            "description": "Whole collection as ndjson or csv stream",
+            "content": {format.media_type: {} for format in ExportFormat},
+        },
+    },
+)
+async def export_pokemons(
+    format: Annotated[ExportFormat, Query()] = ExportFormat.NDJSON,
+    chunk_size: Annotated[PositiveInt, Query(le=10_000)] = 1_000,
+) -> StreamingResponse:
+    return StreamingResponse(
+        _export_chunks(format, chunk_size),
+        media_type=format.media_type,
+    )
 
 
 @router.get(
@@ -34,7 +276,25 @@ async def get_pokemon_list(
         },
     },
 )
-async def get_pokemon_by_id(id: int) -> PokemonResponse:
+async def get_pokemon_by_id(
+    id: int,
+    response: Response,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> PokemonResponse:
+    if (responses := cache.current()).enabled:
+
+        async def load() -> cache.CachedResponse | None:
+            entity = store.get_one(id)
+            if entity is None:
+                return None
+
+            return cache.CachedResponse(
+                encoding.encode_entity(entity), _validators(entity)
+            )
+
+        if (pokemon := await responses.get_or_load(id, id, load)) is not None:
+            return _cached(pokemon, if_none_match)
+
     entity = store.get_one(id)
 
     if not entity:
@@ -43,7 +303,13 @@ async def get_pokemon_by_id(id: int) -> PokemonResponse:
             f"Request resource /pokemon/{id} was not found",
         )
 
-    return PokemonResponse.from_entity(entity)
+    validators = _validators(entity)
+    if conditional.none_match(if_none_match, validators["etag"]):
+        return _not_modified(validators)
+
+    response.headers.update(validators)
+
+    return _render(entity, response)
 
 
 @router.post(
@@ -55,8 +321,9 @@ async def post_pokemon(info: PokemonRequest, response: Response) -> PokemonRespo
 
     # as REST states one should provide uri to newly created resource in location header
     response.headers["location"] = f"/pokemon/{entity.id}"
+    response.headers.update(_validators(entity))
 
-    return PokemonResponse.from_entity(entity)
+    return _render(entity, response, HTTPStatus.CREATED)
 
 
 @router.patch(
@@ -68,10 +335,23 @@ async def post_pokemon(info: PokemonRequest, response: Response) -> PokemonRespo
         HTTPStatus.NOT_MODIFIED: {
             "description": "Failed to modify pokemon as one was not found",
         },
+        HTTPStatus.PRECONDITION_FAILED: {
+            "description": "Failed to modify pokemon as one was changed",
+        },
     },
 )
-async def patch_pokemon(id: int, info: PatchPokemonRequest) -> PokemonResponse:
-    entity = store.patch(id, info.as_patch_pokemon_info())
+async def patch_pokemon(
+    id: int,
+    info: PatchPokemonRequest,
+    response: Response,
+    if_match: Annotated[str | None, Header()] = None,
+) -> PokemonResponse:
+    expected_version = _expected_version(id, if_match)
+
+    try:
+        entity = store.patch(id, info.as_patch_pokemon_info(), expected_version)
+    except store.VersionMismatchError as e:
+        raise HTTPException(HTTPStatus.PRECONDITION_FAILED, str(e))
 
     if entity is None:
         raise HTTPException(
@@ -79,7 +359,9 @@ async def patch_pokemon(id: int, info: PatchPokemonRequest) -> PokemonResponse:
             f"Requested resource /pokemon/{id} was not found",
         )
 
-    return PokemonResponse.from_entity(entity)
+    response.headers.update(_validators(entity))
+
+    return _render(entity, response)
 
 
 @router.put(
@@ -91,18 +373,28 @@ async def patch_pokemon(id: int, info: PatchPokemonRequest) -> PokemonResponse:
         HTTPStatus.NOT_MODIFIED: {
             "description": "Failed to modify pokemon as one was not found",
         },
-    }
+        HTTPStatus.PRECONDITION_FAILED: {
+            "description": "Failed to modify pokemon as one was changed",
+        },
+    },
 )
 async def put_pokemon(
     id: int,
     info: PokemonRequest,
+    response: Response,
     upsert: Annotated[bool, Query()] = False,
+    if_match: Annotated[str | None, Header()] = None,
 ) -> PokemonResponse:
-    entity = (
-        store.upsert(id, info.as_pokemon_info())
-        if upsert
-        else store.update(id, info.as_pokemon_info())
-    )
+    expected_version = _expected_version(id, if_match)
+
+    try:
+        entity = (
+            store.upsert(id, info.as_pokemon_info(), expected_version)
+            if upsert
+            else store.update(id, info.as_pokemon_info(), expected_version)
+        )
+    except store.VersionMismatchError as e:
+        raise HTTPException(HTTPStatus.PRECONDITION_FAILED, str(e))
 
     if entity is None:
         raise HTTPException(
@@ -110,7 +402,9 @@ async def put_pokemon(
             f"Requested resource /pokemon/{id} was not found",
         )
 
-    return PokemonResponse.from_entity(entity)
+    response.headers.update(_validators(entity))
+
+    return _render(entity, response)
 
 
 @router.delete("/{id}")
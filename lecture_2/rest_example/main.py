@@ -1,7 +1,81 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from http import HTTPStatus
 
-from lecture_2.rest_example.api.pokemon import router
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 
-app = FastAPI(title="Pokemon REST API Example")
+from lecture_2.rest_example import store
+from lecture_2.rest_example.api.pokemon import cache, encoding, router
 
+# data is kept in memory of the process unless configured otherwise:
+#
+# - POKEMON_STORE_COLUMNAR=1 - compact columnar representation in memory
+# - POKEMON_STORE_PATH=./data - durable storage in given directory (single
+#   worker only)
+# - POKEMON_STORE_SHM=pokemons - shared memory segment which is served by all
+#   workers, e.g. `uvicorn lecture_2.rest_example.main:app --workers 8`,
+#   number of pokemons is limited by POKEMON_STORE_SHM_CAPACITY
+if os.environ.get("POKEMON_STORE_COLUMNAR"):
+    store.use(store.ColumnarEngine())
+elif path := os.environ.get("POKEMON_STORE_PATH"):
+    store.use(store.LogEngine(path))
+elif name := os.environ.get("POKEMON_STORE_SHM"):
+    store.use(
+        store.SharedMemoryEngine(
+            name,
+            capacity=int(os.environ.get("POKEMON_STORE_SHM_CAPACITY", "1000000")),
+        )
+    )
+
+# POKEMON_FAST_JSON=1 makes routes encode pokemons to json themselves instead
+# of building pydantic response models
+encoding.use_fast_path(bool(os.environ.get("POKEMON_FAST_JSON")))
+
+# responses of pokemon reads are cached in memory of the process, cache size
+# is limited by POKEMON_CACHE_BYTES (0 disables it) and age of responses by
+# POKEMON_CACHE_TTL seconds; changes made by other workers are not seen by
+# cache, so it is off with shared memory storage unless size is given
+cache.use(
+    cache.ResponseCache(
+        max_bytes=int(
+            os.environ.get(
+                "POKEMON_CACHE_BYTES",
+                "0" if os.environ.get("POKEMON_STORE_SHM") else str(64 << 20),
+            )
+        ),
+        ttl=float(os.environ.get("POKEMON_CACHE_TTL", "60")),
+    )
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+
+    store.close()
+
+
+async def store_request_error_handler(
+    request: Request, exc: store.StoreRequestError
+) -> JSONResponse:
+    return JSONResponse(
+        content={"detail": str(exc)},
+        status_code=HTTPStatus.BAD_REQUEST,
+    )
+
+
+async def store_full_error_handler(
+    request: Request, exc: store.StoreFullError
+) -> JSONResponse:
+    return JSONResponse(
+        content={"detail": str(exc)},
+        status_code=HTTPStatus.INSUFFICIENT_STORAGE,
+    )
+
+
+app = FastAPI(title="Pokemon REST API Example", lifespan=lifespan)
+
+app.add_exception_handler(store.StoreRequestError, store_request_error_handler)
+app.add_exception_handler(store.StoreFullError, store_full_error_handler)
 app.include_router(router)
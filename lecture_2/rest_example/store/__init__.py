@@ -1,15 +1,65 @@
-from .models import PatchPokemonInfo, PokemonEntity, PokemonInfo
-from .queries import add, delete, get_many, get_one, patch, update, upsert
+from .engines import (
+    ColumnarEngine,
+    InMemoryEngine,
+    LogEngine,
+    SharedMemoryEngine,
+    StorageEngine,
+    StoreFullError,
+    StoreRequestError,
+)
+from .models import (
+    PatchPokemonInfo,
+    PokemonEntity,
+    PokemonFilter,
+    PokemonInfo,
+    PokemonSort,
+)
+from .queries import (
+    VersionMismatchError,
+    add,
+    add_many,
+    close,
+    delete,
+    delete_many,
+    get_many,
+    get_one,
+    next_version,
+    patch,
+    patch_many,
+    subscribe,
+    unsubscribe,
+    update,
+    upsert,
+    use,
+)
 
 __all__ = [
     "PokemonEntity",
     "PokemonInfo",
     "PatchPokemonInfo",
+    "PokemonFilter",
+    "PokemonSort",
+    "StorageEngine",
+    "InMemoryEngine",
+    "ColumnarEngine",
+    "LogEngine",
+    "SharedMemoryEngine",
+    "StoreRequestError",
+    "StoreFullError",
+    "VersionMismatchError",
     "add",
+    "add_many",
     "delete",
+    "delete_many",
     "get_many",
     "get_one",
     "update",
     "upsert",
     "patch",
+    "patch_many",
+    "next_version",
+    "use",
+    "close",
+    "subscribe",
+    "unsubscribe",
 ]
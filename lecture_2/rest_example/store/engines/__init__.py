@@ -0,0 +1,15 @@
+from .base import StorageEngine, StoreFullError, StoreRequestError
+from .columnar import ColumnarEngine
+from .log import LogEngine
+from .memory import InMemoryEngine
+from .shared import SharedMemoryEngine
+
+__all__ = [
+    "StorageEngine",
+    "StoreRequestError",
+    "StoreFullError",
+    "InMemoryEngine",
+    "ColumnarEngine",
+    "LogEngine",
+    "SharedMemoryEngine",
+]
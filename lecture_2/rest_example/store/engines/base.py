@@ -0,0 +1,91 @@
+from itertools import islice
+from typing import Any, Iterable, Protocol
+
+from lecture_2.rest_example.store.models import (
+    PokemonEntity,
+    PokemonFilter,
+    PokemonSort,
+)
+
+
+class StoreRequestError(ValueError):
+    # request which store can not serve as it is, e.g. id it can not keep
+    pass
+
+
+class StoreFullError(Exception):
+    pass
+
+
+# record is put only if stored one has expected version (`None` if there must
+# be no record), unless it is `ANY_VERSION`; engine checks it along with write
+# under its own lock, so check is atomic even if engine is shared by processes
+ANY_VERSION = -1
+
+
+def version_matches(entity: PokemonEntity | None, expected_version: int | None) -> bool:
+    if expected_version == ANY_VERSION:
+        return True
+
+    return (None if entity is None else entity.version) == expected_version
+
+
+class StorageEngine(Protocol):
+    # the first of `count` consecutive ids which are reserved at once
+    def next_id(self, count: int = 1) -> int: ...
+    def get(self, id: int) -> PokemonEntity | None: ...
+    def put(
+        self, entity: PokemonEntity, expected_version: int | None = ANY_VERSION
+    ) -> bool: ...
+    def remove(self, id: int) -> bool: ...
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        after_id: int | None = None,
+        filters: PokemonFilter | None = None,
+        sort: PokemonSort = PokemonSort.ID,
+    ) -> Iterable[PokemonEntity]: ...
+    def __len__(self) -> int: ...
+    def close(self) -> None: ...
+
+
+def sort_key(sort: PokemonSort, entity: PokemonEntity) -> Any:
+    return (entity.info.name, entity.id) if sort.by_name else entity.id
+
+
+def cursor_key(engine: StorageEngine, sort: PokemonSort, after_id: int) -> Any:
+    # with sorting by name page starts right after the pokemon with given id,
+    # so it must exist to know where it is placed
+    if not sort.by_name:
+        return after_id
+
+    entity = engine.get(after_id)
+    if entity is None:
+        raise StoreRequestError(f"pokemon {after_id} to list after was not found")
+
+    return sort_key(sort, entity)
+
+
+def scan_page(
+    engine: StorageEngine,
+    entities: Iterable[PokemonEntity],
+    offset: int,
+    limit: int,
+    after_id: int | None,
+    filters: PokemonFilter,
+    sort: PokemonSort,
+) -> list[PokemonEntity]:
+    # fallback for engines without secondary indexes - checks every record
+    matched = [entity for entity in entities if filters.matches(entity.info)]
+    matched.sort(key=lambda entity: sort_key(sort, entity), reverse=sort.descending)
+
+    if after_id is not None:
+        cursor = cursor_key(engine, sort, after_id)
+
+        if sort.descending:
+            matched = [e for e in matched if sort_key(sort, e) < cursor]
+        else:
+            matched = [e for e in matched if sort_key(sort, e) > cursor]
+
+    return list(islice(matched, offset, offset + limit))
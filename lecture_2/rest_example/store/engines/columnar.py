@@ -0,0 +1,169 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from lecture_2.rest_example.store.engines.base import (
+    ANY_VERSION,
+    StoreRequestError,
+    scan_page,
+)
+from lecture_2.rest_example.store.index import iter_marked
+from lecture_2.rest_example.store.models import (
+    PokemonEntity,
+    PokemonFilter,
+    PokemonInfo,
+    PokemonSort,
+)
+
+_ENCODING = "utf-8"
+_ERRORS = "surrogatepass"
+
+# columns grow up to the largest id, so far-away ids are rejected instead of
+# allocating gigabytes for the gap
+_MAX_ID_GAP = 1 << 20
+_MIN_GARBAGE_TO_COMPACT = 1 << 20
+
+
+@dataclass(slots=True)
+class ColumnarEngine:
+    # pokemons are stored by columns without any python object per record:
+    # row number is pokemon id, names are utf-8 encoded into single arena and
+    # referenced by offset and length, `published` is packed into bitmap and
+    # one byte per row marks live rows (so listing scans them at C speed);
+    # `PokemonEntity` is materialized only for records which are read
+    _live: bytearray = field(init=False, default_factory=bytearray)
+    _published: bytearray = field(init=False, default_factory=bytearray)
+    _offsets: array = field(init=False, default_factory=lambda: array("Q"))
+    _lengths: array = field(init=False, default_factory=lambda: array("I"))
+    _versions: array = field(init=False, default_factory=lambda: array("q"))
+    _arena: bytearray = field(init=False, default_factory=bytearray)
+    _garbage: int = field(init=False, default=0)
+    _count: int = field(init=False, default=0)
+    _next_id: int = field(init=False, default=0)
+
+    def next_id(self, count: int = 1) -> int:
+        id = self._next_id
+        self._next_id += count
+        return id
+
+    def get(self, id: int) -> PokemonEntity | None:
+        if not 0 <= id < len(self._live) or not self._live[id]:
+            return None
+
+        start = self._offsets[id]
+        name = self._arena[start : start + self._lengths[id]]
+
+        info = PokemonInfo(
+            name=name.decode(_ENCODING, _ERRORS),
+            published=bool(self._published[id >> 3] & (1 << (id & 7))),
+        )
+
+        return PokemonEntity(id, info, self._versions[id])
+
+    def put(
+        self, entity: PokemonEntity, expected_version: int | None = ANY_VERSION
+    ) -> bool:
+        id, info = entity.id, entity.info
+
+        if not 0 <= id < len(self._live) + _MAX_ID_GAP:
+            raise StoreRequestError(
+                f"pokemon id must be in range [0, {len(self._live) + _MAX_ID_GAP})"
+            )
+
+        if expected_version != ANY_VERSION:
+            live = id < len(self._live) and self._live[id]
+            if (self._versions[id] if live else None) != expected_version:
+                return False
+
+        self._grow(id + 1)
+
+        if self._live[id]:
+            self._garbage += self._lengths[id]
+        else:
+            self._live[id] = 1
+            self._count += 1
+
+        name = info.name.encode(_ENCODING, _ERRORS)
+        self._offsets[id] = len(self._arena)
+        self._lengths[id] = len(name)
+        self._versions[id] = entity.version
+        self._arena += name
+
+        if info.published:
+            self._published[id >> 3] |= 1 << (id & 7)
+        else:
+            self._published[id >> 3] &= ~(1 << (id & 7)) & 0xFF
+
+        self._next_id = max(self._next_id, id + 1)
+        self._maybe_compact()
+
+        return True
+
+    def remove(self, id: int) -> bool:
+        if not 0 <= id < len(self._live) or not self._live[id]:
+            return False
+
+        self._live[id] = 0
+        self._count -= 1
+        self._garbage += self._lengths[id]
+        self._maybe_compact()
+
+        return True
+
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        after_id: int | None = None,
+        filters: PokemonFilter | None = None,
+        sort: PokemonSort = PokemonSort.ID,
+    ) -> Iterable[PokemonEntity]:
+        filters = filters or PokemonFilter()
+
+        if filters != PokemonFilter() or sort != PokemonSort.ID:
+            # there are no secondary indexes, so every record is checked
+            entities = (self.get(id) for id in iter_marked(self._live, 1))
+            return scan_page(self, entities, offset, limit, after_id, filters, sort)
+
+        start = 0 if after_id is None else after_id + 1
+        result = []
+
+        for id in iter_marked(self._live, 1, start, offset):
+            result.append(self.get(id))
+
+            if len(result) == limit:
+                break
+
+        return result
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        pass
+
+    def _grow(self, size: int) -> None:
+        missing = size - len(self._live)
+        if missing <= 0:
+            return
+
+        self._live.extend(bytes(missing))
+        self._offsets.frombytes(bytes(missing * self._offsets.itemsize))
+        self._lengths.frombytes(bytes(missing * self._lengths.itemsize))
+        self._versions.frombytes(bytes(missing * self._versions.itemsize))
+        self._published.extend(bytes((size + 7) // 8 - len(self._published)))
+
+    def _maybe_compact(self) -> None:
+        # names which were overwritten or deleted are left in arena until they
+        # take more than a half of it
+        if self._garbage < max(_MIN_GARBAGE_TO_COMPACT, len(self._arena) // 2):
+            return
+
+        arena = bytearray()
+        for id in iter_marked(self._live, 1):
+            start = self._offsets[id]
+            self._offsets[id] = len(arena)
+            arena += self._arena[start : start + self._lengths[id]]
+
+        self._arena = arena
+        self._garbage = 0
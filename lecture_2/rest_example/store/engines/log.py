@@ -0,0 +1,265 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from array import array
+from dataclasses import dataclass, field
+from itertools import accumulate
+from pathlib import Path
+
+from lecture_2.rest_example.store.engines.base import ANY_VERSION, version_matches
+from lecture_2.rest_example.store.engines.memory import InMemoryEngine
+from lecture_2.rest_example.store.models import PokemonEntity, PokemonInfo
+
+SNAPSHOT_FILE = "snapshot.bin"
+LOG_FILE = "log.bin"
+LOCK_FILE = "lock"
+
+# log record: operation, id, published flag, size of utf-8 name that follows
+# and version of the record
+_RECORD = struct.Struct("<BqBIq")
+_PUT = 1
+_REMOVE = 2
+
+# snapshot is stored by columns so that it is loaded with a few bulk copies:
+# header, ids (int64), versions (int64), published (byte each), name lengths
+# in code points (uint32) and all names concatenated into one utf-8 blob
+_SNAPSHOT_HEADER = struct.Struct("<8sqQQ")
+_SNAPSHOT_MAGIC = b"PKMNSNP2"
+
+_ENCODING = "utf-8"
+_ERRORS = "surrogatepass"
+
+
+@dataclass(slots=True)
+class LogEngine(InMemoryEngine):
+    # all data is still served from memory, every change is also appended to
+    # the log on disk which is fsync-ed in batches: at most `sync_every`
+    # records or `sync_interval` seconds of changes can be lost on crash;
+    # log is compacted into snapshot after `snapshot_every` records
+    path: Path
+    sync_every: int = 1024
+    sync_interval: float = 0.05
+    snapshot_every: int = 1_000_000
+
+    _lock_fd: int = field(init=False, default=-1)
+    _log_fd: int = field(init=False, default=-1)
+    _log_records: int = field(init=False, default=0)
+    _buffer: bytearray = field(init=False, default_factory=bytearray)
+    _buffered: int = field(init=False, default=0)
+    _buffer_lock: threading.Lock = field(init=False, default_factory=threading.Lock)
+    _closed: threading.Event = field(init=False, default_factory=threading.Event)
+    _flusher: threading.Thread | None = field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._lock_fd = os.open(self.path / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._lock_fd)
+            raise RuntimeError(f"storage {self.path} is used by another process")
+
+        self._recover()
+
+        self._log_fd = os.open(
+            self.path / LOG_FILE,
+            os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+            0o644,
+        )
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def put(
+        self, entity: PokemonEntity, expected_version: int | None = ANY_VERSION
+    ) -> bool:
+        if not version_matches(self._data.get(entity.id), expected_version):
+            return False
+
+        info = entity.info
+        name = info.name.encode(_ENCODING, _ERRORS)
+        self._append(
+            _RECORD.pack(_PUT, entity.id, info.published, len(name), entity.version)
+            + name
+        )
+
+        InMemoryEngine.put(self, entity)
+        self._maybe_snapshot()
+
+        return True
+
+    def remove(self, id: int) -> bool:
+        if id not in self._data:
+            return False
+
+        self._append(_RECORD.pack(_REMOVE, id, False, 0, 0))
+
+        InMemoryEngine.remove(self, id)
+        self._maybe_snapshot()
+
+        return True
+
+    def flush(self) -> None:
+        with self._buffer_lock:
+            if not self._buffer:
+                return
+
+            view = memoryview(self._buffer)
+            while view:
+                view = view[os.write(self._log_fd, view) :]
+            view.release()
+
+            os.fsync(self._log_fd)
+            self._buffer.clear()
+            self._buffered = 0
+
+    def snapshot(self) -> None:
+        self.flush()
+
+        ids = array("q", self._ids)
+        entities = [self._data[id] for id in ids]
+        versions = array("q", (entity.version for entity in entities))
+        names = [entity.info.name for entity in entities]
+        lengths = array("I", map(len, names))
+        blob = "".join(names).encode(_ENCODING, _ERRORS)
+
+        tmp = self.path / f"{SNAPSHOT_FILE}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(
+                _SNAPSHOT_HEADER.pack(
+                    _SNAPSHOT_MAGIC, self._next_id, len(ids), len(blob)
+                )
+            )
+            f.write(ids.tobytes())
+            f.write(versions.tobytes())
+            f.write(bytes(entity.info.published for entity in entities))
+            f.write(lengths.tobytes())
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, self.path / SNAPSHOT_FILE)
+        self._fsync_dir()
+
+        # crash before truncation only makes recovery replay records which are
+        # already in the snapshot, this is harmless as replay is idempotent
+        os.ftruncate(self._log_fd, 0)
+        os.fsync(self._log_fd)
+        self._log_records = 0
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+
+        self.flush()
+        os.close(self._log_fd)
+        os.close(self._lock_fd)
+
+    def _append(self, record: bytes) -> None:
+        with self._buffer_lock:
+            self._buffer += record
+            self._buffered += 1
+            self._log_records += 1
+            full = self._buffered >= self.sync_every
+
+        if full:
+            self.flush()
+
+    def _maybe_snapshot(self) -> None:
+        if self._log_records >= self.snapshot_every:
+            self.snapshot()
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.sync_interval):
+            self.flush()
+
+    def _fsync_dir(self) -> None:
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _recover(self) -> None:
+        snapshot = self.path / SNAPSHOT_FILE
+        if snapshot.exists() and snapshot.stat().st_size > 0:
+            with (
+                open(snapshot, "rb") as f,
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+            ):
+                self._load_snapshot(mm)
+
+        log = self.path / LOG_FILE
+        if log.exists() and (size := log.stat().st_size) > 0:
+            with open(log, "r+b") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    end = self._replay(mm)
+
+                # drop partially written tail left by crash during write
+                if end < size:
+                    f.truncate(end)
+
+    def _load_snapshot(self, mm: mmap.mmap) -> None:
+        magic, next_id, count, blob_size = _SNAPSHOT_HEADER.unpack_from(mm, 0)
+        if magic != _SNAPSHOT_MAGIC:
+            raise ValueError(f"{self.path / SNAPSHOT_FILE} is not a snapshot")
+
+        pos = _SNAPSHOT_HEADER.size
+
+        ids = array("q")
+        ids.frombytes(mm[pos : pos + ids.itemsize * count])
+        pos += ids.itemsize * count
+
+        versions = array("q")
+        versions.frombytes(mm[pos : pos + versions.itemsize * count])
+        pos += versions.itemsize * count
+
+        published = map(bool, mm[pos : pos + count])
+        pos += count
+
+        lengths = array("I")
+        lengths.frombytes(mm[pos : pos + lengths.itemsize * count])
+        pos += lengths.itemsize * count
+
+        blob = str(mm[pos : pos + blob_size], _ENCODING, _ERRORS)
+        offsets = list(accumulate(lengths, initial=0))
+        names = map(blob.__getitem__, map(slice, offsets, offsets[1:]))
+
+        infos = map(PokemonInfo, names, published)
+        self._data = dict(zip(ids, map(PokemonEntity, ids, infos, versions)))
+        self._reindex()
+        self._next_id = next_id
+
+    def _replay(self, mm: mmap.mmap) -> int:
+        pos, size, records = 0, len(mm), 0
+        unpack_from, header_size = _RECORD.unpack_from, _RECORD.size
+
+        while pos + header_size <= size:
+            op, id, published, length, version = unpack_from(mm, pos)
+            end = pos + header_size + length
+
+            if end > size:
+                break
+
+            if op == _PUT:
+                name = str(mm[pos + header_size : end], _ENCODING, _ERRORS)
+                info = PokemonInfo(name, bool(published))
+                InMemoryEngine.put(self, PokemonEntity(id, info, version))
+            elif op == _REMOVE:
+                InMemoryEngine.remove(self, id)
+                self._next_id = max(self._next_id, id + 1)
+            else:
+                break
+
+            pos = end
+            records += 1
+
+        self._log_records = records
+        return pos
@@ -0,0 +1,187 @@
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterable, Iterator
+
+from lecture_2.rest_example.store.engines.base import (
+    ANY_VERSION,
+    cursor_key,
+    scan_page,
+    version_matches,
+)
+from lecture_2.rest_example.store.index import SortedIndex
+from lecture_2.rest_example.store.models import (
+    PokemonEntity,
+    PokemonFilter,
+    PokemonInfo,
+    PokemonSort,
+)
+
+
+def _published_index() -> dict[bool, SortedIndex[int]]:
+    return {True: SortedIndex(), False: SortedIndex()}
+
+
+@dataclass(slots=True)
+class InMemoryEngine:
+    # besides records by id engine keeps secondary indexes which are updated on
+    # every change: ids split by `published` flag and (name, id) pairs sorted
+    # by name, so filtered and sorted pages are read without full scan
+    _data: dict[int, PokemonEntity] = field(init=False, default_factory=dict)
+    _ids: SortedIndex[int] = field(init=False, default_factory=SortedIndex)
+    _published: dict[bool, SortedIndex[int]] = field(
+        init=False, default_factory=_published_index
+    )
+    _names: SortedIndex[tuple[str, int]] = field(
+        init=False, default_factory=SortedIndex
+    )
+    _next_id: int = field(init=False, default=0)
+
+    def next_id(self, count: int = 1) -> int:
+        id = self._next_id
+        self._next_id += count
+        return id
+
+    def get(self, id: int) -> PokemonEntity | None:
+        return self._data.get(id)
+
+    def put(
+        self, entity: PokemonEntity, expected_version: int | None = ANY_VERSION
+    ) -> bool:
+        id = entity.id
+        old = self._data.get(id)
+
+        if not version_matches(old, expected_version):
+            return False
+
+        if old is None:
+            self._ids.add(id)
+        else:
+            self._unindex(id, old.info)
+
+        self._data[id] = entity
+        self._index(id, entity.info)
+        # upserted ids are never handed out by `next_id` afterwards
+        self._next_id = max(self._next_id, id + 1)
+
+        return True
+
+    def remove(self, id: int) -> bool:
+        entity = self._data.pop(id, None)
+        if entity is None:
+            return False
+
+        self._ids.discard(id)
+        self._unindex(id, entity.info)
+        return True
+
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        after_id: int | None = None,
+        filters: PokemonFilter | None = None,
+        sort: PokemonSort = PokemonSort.ID,
+    ) -> Iterable[PokemonEntity]:
+        filters = filters or PokemonFilter()
+
+        if sort.by_name:
+            index = self._names
+            start, stop = self._name_range(filters.name_prefix)
+            residual = PokemonFilter(
+                published=filters.published,
+                name_contains=filters.name_contains,
+            )
+        elif filters.name_prefix is not None:
+            # pokemons with given prefix are found by name index, ordering
+            # them by id costs O(m log m) for m matching pokemons
+            start, stop = self._name_range(filters.name_prefix)
+            return scan_page(
+                self,
+                self._lookup(id for _, id in self._names.islice(start, stop)),
+                offset,
+                limit,
+                after_id,
+                filters,
+                sort,
+            )
+        else:
+            index = (
+                self._ids
+                if filters.published is None
+                else self._published[filters.published]
+            )
+            start, stop = 0, len(index)
+            residual = PokemonFilter(name_contains=filters.name_contains)
+
+        # `after_id` (keyset pagination) makes page start right after the
+        # given pokemon without skipping rows before it
+        if after_id is not None:
+            cursor = cursor_key(self, sort, after_id)
+
+            if sort.descending:
+                stop = min(stop, index.bisect_left(cursor))
+            else:
+                start = max(start, index.bisect_right(cursor))
+
+        if sort.descending:
+            start, stop = len(index) - stop, len(index) - start
+
+        # offset is skipped by position in index unless some records in range
+        # still have to be checked
+        if residual == PokemonFilter():
+            start += offset
+            stop = min(stop, start + limit)
+            offset = 0
+
+        keys = index.islice(start, stop, reverse=sort.descending)
+        ids = (key[1] for key in keys) if sort.by_name else keys
+        matched = (e for e in self._lookup(ids) if residual.matches(e.info))
+
+        return list(islice(matched, offset, offset + limit))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def close(self) -> None:
+        pass
+
+    def _lookup(self, ids: Iterable[int]) -> Iterator[PokemonEntity]:
+        # pokemon might be removed by concurrent writer after its id was read
+        # from index, readers do not lock
+        for id in ids:
+            if (entity := self._data.get(id)) is not None:
+                yield entity
+
+    def _index(self, id: int, info: PokemonInfo) -> None:
+        self._published[info.published].add(id)
+        self._names.add((info.name, id))
+
+    def _unindex(self, id: int, info: PokemonInfo) -> None:
+        self._published[info.published].discard(id)
+        self._names.discard((info.name, id))
+
+    def _reindex(self) -> None:
+        data = self._data
+
+        self._ids = SortedIndex(data)
+        self._published = {
+            flag: SortedIndex(id for id, e in data.items() if e.info.published == flag)
+            for flag in (True, False)
+        }
+        self._names = SortedIndex((e.info.name, id) for id, e in data.items())
+
+    def _name_range(self, prefix: str | None) -> tuple[int, int]:
+        if prefix is None:
+            return 0, len(self._names)
+
+        start = self._names.bisect_left((prefix,))
+
+        # the least string which is greater than any string with this prefix
+        while prefix and prefix[-1] == chr(0x10FFFF):
+            prefix = prefix[:-1]
+
+        if not prefix:
+            return start, len(self._names)
+
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return start, self._names.bisect_left((end,))
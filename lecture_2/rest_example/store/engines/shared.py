@@ -0,0 +1,263 @@
+import fcntl
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable, Iterator
+
+from lecture_2.rest_example.store.engines.base import (
+    ANY_VERSION,
+    StoreFullError,
+    StoreRequestError,
+    scan_page,
+)
+from lecture_2.rest_example.store.index import iter_marked
+from lecture_2.rest_example.store.models import (
+    PokemonEntity,
+    PokemonFilter,
+    PokemonInfo,
+    PokemonSort,
+)
+
+# segment layout: header, then one state byte per slot (so listing can search
+# for live slots with a plain byte scan), then fixed-width records; slot index
+# is pokemon id, so ids are limited by `capacity`
+_HEADER = struct.Struct("<8sQIq")  # magic, capacity, name size, next id
+_MAGIC = b"PKMNSHM2"
+_NEXT_ID_OFFSET = 20
+_NEXT_ID = struct.Struct("<q")
+
+# record: sequence number (odd while record is being written), published flag,
+# size of utf-8 encoded name, version and the name padded to `name_size` bytes
+_RECORD = struct.Struct("<IBxHq")
+_FIELDS = struct.Struct("<BxHq")
+_SEQ = struct.Struct("<I")
+_READ_ATTEMPTS = 100
+
+_EMPTY = 0
+_LIVE = 1
+
+_ENCODING = "utf-8"
+_ERRORS = "surrogatepass"
+
+
+@dataclass(slots=True)
+class SharedMemoryEngine:
+    # data lives in named shared memory segment, so all uvicorn workers which
+    # open engine with the same `name` serve the same pokemons; writers are
+    # serialized with file lock, readers never lock and retry if they observe
+    # record in the middle of a write (seqlock)
+    name: str
+    capacity: int = 1_000_000
+    name_size: int = 64
+
+    _shm: SharedMemory = field(init=False)
+    _lock_fd: int = field(init=False, default=-1)
+    _states: int = field(init=False, default=_HEADER.size)
+    _records: int = field(init=False, default=0)
+    _record_size: int = field(init=False, default=0)
+
+    def __post_init__(self) -> None:
+        lock_path = os.path.join(tempfile.gettempdir(), f"{self.name}.lock")
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        with self._locked():
+            try:
+                self._shm = SharedMemory(self.name, create=True, size=self._size())
+                _HEADER.pack_into(
+                    self._shm.buf, 0, _MAGIC, self.capacity, self.name_size, 0
+                )
+            except FileExistsError:
+                self._shm = SharedMemory(self.name)
+                magic, self.capacity, self.name_size, _ = _HEADER.unpack_from(
+                    self._shm.buf, 0
+                )
+                if magic != _MAGIC:
+                    raise ValueError(f"shared memory {self.name} is not a store")
+
+        # segment outlives worker processes, it is removed only by `unlink`
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        self._record_size = _RECORD.size + self.name_size
+        self._records = self._states + self.capacity
+
+    def next_id(self, count: int = 1) -> int:
+        with self._locked():
+            (id,) = _NEXT_ID.unpack_from(self._shm.buf, _NEXT_ID_OFFSET)
+            if id + count > self.capacity:
+                raise StoreFullError("pokemon store is full")
+
+            _NEXT_ID.pack_into(self._shm.buf, _NEXT_ID_OFFSET, id + count)
+
+        return id
+
+    def get(self, id: int) -> PokemonEntity | None:
+        if not 0 <= id < self.capacity:
+            return None
+
+        for _ in range(_READ_ATTEMPTS):
+            if (record := self._read(id)) is not None:
+                break
+        else:
+            # writer keeps record busy for too long (or died in the middle of
+            # write), lock guarantees there is no one writing it right now
+            with self._locked():
+                record = self._read(id, consistent=True)
+
+        state, published, version, name = record
+
+        if state != _LIVE:
+            return None
+
+        info = PokemonInfo(name.decode(_ENCODING, _ERRORS), bool(published))
+        return PokemonEntity(id, info, version)
+
+    def put(
+        self, entity: PokemonEntity, expected_version: int | None = ANY_VERSION
+    ) -> bool:
+        id, info = entity.id, entity.info
+
+        if not 0 <= id < self.capacity:
+            raise StoreRequestError(f"pokemon id must be in range [0, {self.capacity})")
+
+        name = info.name.encode(_ENCODING, _ERRORS)
+        if len(name) > self.name_size:
+            raise StoreRequestError(
+                f"pokemon name must be at most {self.name_size} bytes"
+            )
+
+        with self._locked():
+            # version is checked under the same lock as write, so changes of
+            # other processes are not lost between read and write
+            if expected_version != ANY_VERSION:
+                state, _, version, _ = self._read(id, consistent=True)
+                if (version if state == _LIVE else None) != expected_version:
+                    return False
+
+            with self._writing(id) as pos:
+                buf = self._shm.buf
+                buf[pos + _RECORD.size : pos + _RECORD.size + len(name)] = name
+                _FIELDS.pack_into(
+                    buf, pos + _SEQ.size, info.published, len(name), entity.version
+                )
+                buf[self._states + id] = _LIVE
+
+                (next_id,) = _NEXT_ID.unpack_from(buf, _NEXT_ID_OFFSET)
+                _NEXT_ID.pack_into(buf, _NEXT_ID_OFFSET, max(next_id, id + 1))
+
+        return True
+
+    def remove(self, id: int) -> bool:
+        if not 0 <= id < self.capacity:
+            return False
+
+        with self._locked():
+            if self._shm.buf[self._states + id] != _LIVE:
+                return False
+
+            with self._writing(id):
+                self._shm.buf[self._states + id] = _EMPTY
+
+        return True
+
+    def page(
+        self,
+        offset: int,
+        limit: int,
+        after_id: int | None = None,
+        filters: PokemonFilter | None = None,
+        sort: PokemonSort = PokemonSort.ID,
+    ) -> Iterable[PokemonEntity]:
+        filters = filters or PokemonFilter()
+
+        if filters != PokemonFilter() or sort != PokemonSort.ID:
+            # there are no secondary indexes, so every record is checked
+            return scan_page(self, self._scan(), offset, limit, after_id, filters, sort)
+
+        start = 0 if after_id is None else max(after_id + 1, 0)
+        result = []
+
+        states = self._shm.buf[self._states : self._records]
+        try:
+            for id in iter_marked(states, _LIVE, start, offset):
+                if (entity := self.get(id)) is not None:
+                    result.append(entity)
+
+                if len(result) == limit:
+                    break
+        finally:
+            states.release()
+
+        return result
+
+    def __len__(self) -> int:
+        states = self._shm.buf[self._states : self._records]
+        try:
+            return bytes(states).count(_LIVE)
+        finally:
+            states.release()
+
+    def close(self) -> None:
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        # `SharedMemory.unlink` unregisters segment from resource tracker
+        resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+    def _scan(self) -> Iterator[PokemonEntity]:
+        states = self._shm.buf[self._states : self._records]
+        try:
+            for id in iter_marked(states, _LIVE):
+                if (entity := self.get(id)) is not None:
+                    yield entity
+        finally:
+            states.release()
+
+    def _read(
+        self,
+        id: int,
+        consistent: bool = False,
+    ) -> tuple[int, bool, int, bytes] | None:
+        buf = self._shm.buf
+        pos = self._records + id * self._record_size
+
+        seq, published, size, version = _RECORD.unpack_from(buf, pos)
+        if seq & 1 and not consistent:
+            return None
+
+        state = buf[self._states + id]
+        name = bytes(buf[pos + _RECORD.size : pos + _RECORD.size + size])
+
+        if _RECORD.unpack_from(buf, pos)[0] != seq and not consistent:
+            return None
+
+        return state, published, version, name
+
+    def _size(self) -> int:
+        return _HEADER.size + self.capacity * (1 + _RECORD.size + self.name_size)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _writing(self, id: int) -> Iterator[int]:
+        buf = self._shm.buf
+        pos = self._records + id * self._record_size
+        # sequence number may be left odd by writer that died during write
+        seq = _SEQ.unpack_from(buf, pos)[0] | 1
+
+        _SEQ.pack_into(buf, pos, seq)
+        try:
+            yield pos
+        finally:
+            _SEQ.pack_into(buf, pos, (seq + 1) & 0xFFFFFFFF)
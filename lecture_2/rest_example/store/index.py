@@ -0,0 +1,224 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator
+
+
+# sorted set of keys with positional access: keys live in sorted buckets of
+# bounded size and fenwick tree over bucket sizes resolves "n-th key" lookups,
+# so `islice` and `bisect_*` are O(log n) and reading a page is O(limit)
+class SortedIndex[TKey]:
+    __slots__ = ("_buckets", "_maxes", "_tree", "_len")
+
+    _LOAD = 512
+
+    def __init__(self, keys: Iterable[TKey] = ()) -> None:
+        ordered = sorted(set(keys))
+        load = self._LOAD
+
+        self._buckets = [ordered[i : i + load] for i in range(0, len(ordered), load)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(ordered)
+        self._rebuild_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, key: TKey) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+
+        bucket = self._buckets[i]
+        return bucket[bisect_left(bucket, key)] == key
+
+    def __iter__(self) -> Iterator[TKey]:
+        for bucket in self._buckets:
+            yield from bucket
+
+    def add(self, key: TKey) -> None:
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._rebuild_tree()
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            # the most common case - monotonically growing ids
+            i -= 1
+            self._buckets[i].append(key)
+            self._maxes[i] = key
+        else:
+            bucket = self._buckets[i]
+            j = bisect_left(bucket, key)
+            if bucket[j] == key:
+                return
+            bucket.insert(j, key)
+
+        self._len += 1
+        bucket = self._buckets[i]
+
+        if len(bucket) > 2 * self._LOAD:
+            half = len(bucket) // 2
+            self._buckets[i : i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i : i + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def discard(self, key: TKey) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if bucket[j] != key:
+            return False
+
+        del bucket[j]
+        self._len -= 1
+
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_tree()
+
+        return True
+
+    def bisect_left(self, key: TKey) -> int:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+
+        return self._prefix(i) + bisect_left(self._buckets[i], key)
+
+    def bisect_right(self, key: TKey) -> int:
+        i = bisect_right(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+
+        return self._prefix(i) + bisect_right(self._buckets[i], key)
+
+    def islice(
+        self,
+        start: int = 0,
+        stop: int | None = None,
+        reverse: bool = False,
+    ) -> Iterator[TKey]:
+        # positions are counted from the largest key when `reverse` is set
+        start = max(start, 0)
+        stop = self._len if stop is None else min(stop, self._len)
+
+        if start >= stop:
+            return iter(())
+
+        if reverse:
+            i, j = self._locate(self._len - 1 - start)
+            return self._iter_reverse(i, j, stop - start)
+
+        i, j = self._locate(start)
+        return self._iter_forward(i, j, stop - start)
+
+    def _iter_forward(self, i: int, j: int, count: int) -> Iterator[TKey]:
+        buckets = self._buckets
+
+        while count > 0 and i < len(buckets):
+            chunk = buckets[i][j : j + count]
+            yield from chunk
+            count -= len(chunk)
+            i, j = i + 1, 0
+
+    def _iter_reverse(self, i: int, j: int, count: int) -> Iterator[TKey]:
+        buckets = self._buckets
+
+        while count > 0 and i >= 0:
+            lo = max(j - count + 1, 0)
+            chunk = buckets[i][lo : j + 1]
+            chunk.reverse()
+            yield from chunk
+            count -= len(chunk)
+            i -= 1
+            j = len(buckets[i]) - 1 if i >= 0 else 0
+
+    def _rebuild_tree(self) -> None:
+        tree = [0]
+        tree.extend(len(bucket) for bucket in self._buckets)
+
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+
+        self._tree = tree
+
+    def _tree_add(self, i: int, delta: int) -> None:
+        tree = self._tree
+        i += 1
+
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i: int) -> int:
+        tree = self._tree
+        total = 0
+
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+
+        return total
+
+    def _locate(self, pos: int) -> tuple[int, int]:
+        # finds bucket holding key at position `pos` and its offset in it
+        tree = self._tree
+        i = 0
+        step = 1 << (len(tree) - 1).bit_length()
+
+        while step:
+            nxt = i + step
+            if nxt < len(tree) and tree[nxt] <= pos:
+                i = nxt
+                pos -= tree[nxt]
+            step >>= 1
+
+        return i, pos
+
+
+def iter_marked(
+    column: bytes | bytearray | memoryview,
+    marker: int,
+    start: int = 0,
+    skip: int = 0,
+    chunk_size: int = 1 << 16,
+) -> Iterator[int]:
+    # yields positions of bytes equal to `marker` in column starting from
+    # `start` and omitting first `skip` of them; search and counting of skipped
+    # positions is done by chunks with bytes methods, so it runs at C speed
+    pos = max(start, 0)
+    size = len(column)
+
+    while pos < size:
+        end = min(pos + chunk_size, size)
+        chunk = bytes(column[pos:end])
+
+        if skip:
+            marked = chunk.count(marker)
+            if marked <= skip:
+                skip -= marked
+                pos = end
+                continue
+
+        i = chunk.find(marker)
+        while i != -1:
+            if skip:
+                skip -= 1
+            else:
+                yield pos + i
+            i = chunk.find(marker, i + 1)
+
+        pos = end
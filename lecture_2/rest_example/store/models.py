@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from enum import StrEnum
 
 
 @dataclass(slots=True)
@@ -11,9 +12,40 @@ class PokemonInfo:
 class PokemonEntity:
     id: int
     info: PokemonInfo
+    # grows on every change of the pokemon, see `queries.next_version`
+    version: int = 0
 
 
 @dataclass(slots=True)
 class PatchPokemonInfo:
     name: str | None = None
     published: bool | None = None
+
+
+class PokemonSort(StrEnum):
+    ID = "id"
+    ID_DESC = "-id"
+    NAME = "name"
+    NAME_DESC = "-name"
+
+    @property
+    def descending(self) -> bool:
+        return self.startswith("-")
+
+    @property
+    def by_name(self) -> bool:
+        return self in (PokemonSort.NAME, PokemonSort.NAME_DESC)
+
+
+@dataclass(slots=True)
+class PokemonFilter:
+    published: bool | None = None
+    name_prefix: str | None = None
+    name_contains: str | None = None
+
+    def matches(self, info: PokemonInfo) -> bool:
+        return (
+            (self.published is None or info.published == self.published)
+            and (self.name_prefix is None or info.name.startswith(self.name_prefix))
+            and (self.name_contains is None or self.name_contains in info.name)
+        )
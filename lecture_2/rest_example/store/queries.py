@@ -1,75 +1,259 @@
-from typing import Iterable
+from contextlib import ExitStack, contextmanager
+from threading import RLock
+from time import time_ns
+from typing import Callable, Iterable, Iterator
 
+from lecture_2.rest_example.store.engines import InMemoryEngine, StorageEngine
+from lecture_2.rest_example.store.engines.base import ANY_VERSION
 from lecture_2.rest_example.store.models import (
     PatchPokemonInfo,
     PokemonEntity,
+    PokemonFilter,
     PokemonInfo,
+    PokemonSort,
 )
 
-_data = dict[int, PokemonInfo]()
+_engine: StorageEngine = InMemoryEngine()
 
+# every change of a pokemon is read-modify-write done under lock of its
+# stripe, so concurrent changes of the same pokemon never lose each other while
+# changes of different pokemons do not wait for each other; engines are not
+# thread-safe, so the change itself is applied under short `_engine_lock`;
+# stripes only guard threads of one process, so the change is written only if
+# pokemon still has version it was read with (which engine shared by worker
+# processes checks under its own lock) and is retried otherwise;
+# batches take all stripes to be applied as a whole; reads never lock as
+# records are never modified in place (sync routes are run in threadpool)
+_STRIPES = 64
 
-def int_id_generator() -> Iterable[int]:
-    i = 0
-    while True:
-        yield i
-        i += 1
+_stripes = tuple(RLock() for _ in range(_STRIPES))
+_engine_lock = RLock()
 
+# listeners are notified about every change with id of changed pokemon (or
+# `None` if all of them might change), they are called under engine lock, so
+# they observe changes in the order they are applied
+type Listener = Callable[[int | None], None]
 
-_id_generator = int_id_generator()
+_listeners: list[Listener] = []
+
+
+def use(engine: StorageEngine) -> None:
+    global _engine
+
+    with _all_locked(), _engine_lock:
+        _engine.close()
+        _engine = engine
+        _notify(None)
+
+
+def close() -> None:
+    _engine.close()
+
+
+def subscribe(listener: Listener) -> None:
+    _listeners.append(listener)
+
+
+def unsubscribe(listener: Listener) -> None:
+    _listeners.remove(listener)
+
+
+def _notify(id: int | None) -> None:
+    for listener in _listeners:
+        listener(id)
+
+
+def _locked(id: int) -> RLock:
+    return _stripes[id % _STRIPES]
+
+
+@contextmanager
+def _all_locked() -> Iterator[None]:
+    # stripes are always taken in the same order, so batches do not deadlock
+    with ExitStack() as stack:
+        for lock in _stripes:
+            stack.enter_context(lock)
+
+        yield
+
+
+def _commit(entity: PokemonEntity, expected_version: int | None = ANY_VERSION) -> bool:
+    with _engine_lock:
+        if not _engine.put(entity, expected_version):
+            return False
+
+        _notify(entity.id)
+
+    return True
+
+
+class VersionMismatchError(Exception):
+    def __init__(self, id: int, expected: int, actual: int | None) -> None:
+        super().__init__(
+            f"pokemon {id} has version {actual}, but {expected} was expected"
+        )
+        self.id = id
+        self.expected = expected
+        self.actual = actual
+
+
+def next_version(previous: PokemonEntity | None = None) -> int:
+    # versions are microseconds since epoch, so they double as modification
+    # time, and still grow strictly if clock goes back or changes are too fast
+    version = time_ns() // 1000
+
+    if previous is not None:
+        version = max(version, previous.version + 1)
+
+    return version
+
+
+def _check_version(
+    id: int,
+    entity: PokemonEntity | None,
+    expected_version: int | None,
+) -> None:
+    if expected_version is None:
+        return
+
+    actual = None if entity is None else entity.version
+    if actual != expected_version:
+        raise VersionMismatchError(id, expected_version, actual)
 
 
 def add(info: PokemonInfo) -> PokemonEntity:
-    _id = next(_id_generator)
-    _data[_id] = info
+    with _engine_lock:
+        id = _engine.next_id()
+
+    return _add(id, info)
+
+
+def _add(id: int, info: PokemonInfo) -> PokemonEntity:
+    # pokemon may be upserted with this id meanwhile
+    with _locked(id):
+        entity = PokemonEntity(id, info, next_version(_engine.get(id)))
+        _commit(entity)
+
+    return entity
 
-    return PokemonEntity(_id, info)
 
+def add_many(infos: Iterable[PokemonInfo]) -> list[PokemonEntity]:
+    # batch is added as a whole: ids for all of it are reserved at once, so
+    # nothing is added if store has no room for it, and if some pokemon is
+    # rejected by engine, the ones added before it are removed again
+    infos = list(infos)
+    added = []
 
-def delete(id: int) -> None:
-    if id in _data:
-        del _data[id]
+    with _all_locked():
+        if not infos:
+            return added
+
+        with _engine_lock:
+            first = _engine.next_id(len(infos))
+
+        try:
+            for id, info in enumerate(infos, first):
+                added.append(_add(id, info))
+        except Exception:
+            for entity in added:
+                delete(entity.id)
+            raise
+
+    return added
+
+
+def delete(id: int) -> bool:
+    with _locked(id), _engine_lock:
+        if not _engine.remove(id):
+            return False
+
+        _notify(id)
+
+    return True
+
+
+def delete_many(ids: Iterable[int]) -> list[bool]:
+    with _all_locked():
+        return [delete(id) for id in ids]
 
 
 def get_one(id: int) -> PokemonEntity | None:
-    if id not in _data:
-        return None
+    return _engine.get(id)
+
 
-    return PokemonEntity(id=id, info=_data[id])
+def get_many(
+    offset: int = 0,
+    limit: int = 10,
+    after_id: int | None = None,
+    filters: PokemonFilter | None = None,
+    sort: PokemonSort = PokemonSort.ID,
+) -> Iterable[PokemonEntity]:
+    return _engine.page(offset, limit, after_id, filters, sort)
 
 
-def get_many(offset: int = 0, limit: int = 10) -> Iterable[PokemonEntity]:
-    curr = 0
-    for id, info in _data.items():
-        if offset <= curr < offset + limit:
-            yield PokemonEntity(id, info)
+def _change(
+    id: int,
+    expected_version: int | None,
+    change: Callable[[PokemonEntity | None], PokemonInfo | None],
+) -> PokemonEntity | None:
+    # `change` gives new info of pokemon by the old one, or `None` to leave it
+    with _locked(id):
+        while True:
+            old = _engine.get(id)
 
-        curr += 1
+            if (info := change(old)) is None:
+                return None
 
+            _check_version(id, old, expected_version)
 
-def update(id: int, info: PokemonInfo) -> PokemonEntity | None:
-    if id not in _data:
-        return None
+            entity = PokemonEntity(id, info, next_version(old))
+            if _commit(entity, None if old is None else old.version):
+                return entity
 
-    _data[id] = info
 
-    return PokemonEntity(id=id, info=info)
+# `expected_version` makes change conditional: it is applied only if pokemon
+# still has this version, otherwise `VersionMismatchError` is raised
+def update(
+    id: int,
+    info: PokemonInfo,
+    expected_version: int | None = None,
+) -> PokemonEntity | None:
+    return _change(id, expected_version, lambda old: None if old is None else info)
 
 
-def upsert(id: int, info: PokemonInfo) -> PokemonEntity:
-    _data[id] = info
+def upsert(
+    id: int,
+    info: PokemonInfo,
+    expected_version: int | None = None,
+) -> PokemonEntity:
+    return _change(id, expected_version, lambda old: info)
 
-    return PokemonEntity(id=id, info=info)
 
+def patch(
+    id: int,
+    patch_info: PatchPokemonInfo,
+    expected_version: int | None = None,
+) -> PokemonEntity | None:
+    def change(old: PokemonEntity | None) -> PokemonInfo | None:
+        if old is None:
+            return None
 
-def patch(id: int, patch_info: PatchPokemonInfo) -> PokemonEntity | None:
-    if id not in _data:
-        return None
+        # records are never modified in place, so engines are free to persist
+        # them and readers never see half-applied patch
+        return PokemonInfo(
+            name=old.info.name if patch_info.name is None else patch_info.name,
+            published=(
+                old.info.published
+                if patch_info.published is None
+                else patch_info.published
+            ),
+        )
 
-    if patch_info.name is not None:
-        _data[id].name = patch_info.name
+    return _change(id, expected_version, change)
 
-    if patch_info.published is not None:
-        _data[id].published = patch_info.published
 
-    return PokemonEntity(id=id, info=_data[id])
+def patch_many(
+    patches: Iterable[tuple[int, PatchPokemonInfo]],
+) -> list[PokemonEntity | None]:
+    with _all_locked():
+        return [patch(id, patch_info) for id, patch_info in patches]
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import struct
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any, Callable, Iterable
+from uuid import uuid4
+
+from fastapi import WebSocket
+
+from lecture_2.ws_example.history import History, HistoryEntry
+from lecture_2.ws_example.topics import ALL, TopicIndex, check_pattern
+
+# publishing does not wait for subscribers: message is sent to subscriber by
+# writer task, which is started eagerly, so send which completes right away
+# (as it does unless socket buffer is full) costs no task switch; while
+# writer waits for socket, later messages are kept in bounded backlog and
+# sent by the same writer, and once backlog is full, overflow policy decides
+# what is lost. So slow subscriber holds back neither others nor publisher
+#
+# message is published to topic and reaches only subscribers of patterns
+# matching it (see `topics`)
+#
+# asgi event sending message is built once and shared by all subscribers,
+# so publishing does not copy payload per subscriber; text or binary frame
+# is sent for `str` or `bytes` payload
+#
+# messages published here are passed to `relay` as well, which delivers them
+# to broadcasters of other worker processes (see `bus`)
+#
+# every message gets sequence number and is kept in history for a while;
+# subscriber which passes sequence number of the last message it got is
+# sequenced: it gets messages it missed since then (if they are still kept)
+# before live ones, and every message with its sequence number and topic:
+#
+# - text as json `{"seq": ..., "topic": ..., "text": ...}`
+# - binary as sequence number (8 bytes) and topic length (2 bytes), both
+#   big-endian, followed by utf-8 topic and payload
+#
+# it gets control message first, `{"action": "resumed", ...}` if it missed
+# nothing or missed messages follow, or `{"action": "reset", ...}` if they
+# are not kept any longer, e.g. broadcaster of other epoch (process) has
+# them; both have epoch and sequence number messages after which follow
+
+
+class Overflow(StrEnum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    # slow subscriber is disconnected
+    DISCONNECT = "disconnect"
+
+
+DEFAULT_TOPIC = "general"
+
+# policy violation, as subscriber does not read messages fast enough
+SLOW_CONSUMER_CLOSE_CODE = 1008
+# stalled socket may never take close frame
+CLOSE_TIMEOUT = 1.0
+
+
+type Payload = str | bytes
+type _Event = dict[str, Any]
+
+
+_SEQUENCED_HEADER = struct.Struct("!QH")
+
+
+def _event(payload: Payload) -> _Event:
+    if isinstance(payload, str):
+        return {"type": "websocket.send", "text": payload}
+
+    return {"type": "websocket.send", "bytes": payload}
+
+
+def _sequenced_event(entry: HistoryEntry) -> _Event:
+    seq, topic, message = entry.seq, entry.topic, entry.message
+
+    if isinstance(message, str):
+        return _event(json.dumps({"seq": seq, "topic": topic, "text": message}))
+
+    topic_bytes = topic.encode()
+    header = _SEQUENCED_HEADER.pack(seq, len(topic_bytes))
+
+    return _event(b"".join([header, topic_bytes, message]))
+
+
+@dataclass(slots=True)
+class BroadcastStats:
+    published: int = 0
+    # messages lost by subscribers which were not disconnected
+    dropped: int = 0
+    disconnected: int = 0
+
+
+@dataclass(slots=True, eq=False)
+class _Subscriber:
+    ws: WebSocket
+    sequenced: bool = False
+    patterns: set[str] = field(default_factory=set)
+    # messages waiting for writer; missed messages replayed to subscriber
+    # which resumes are sent before backlog and are not limited by its size
+    replay: deque[_Event] = field(default_factory=deque)
+    backlog: deque[_Event] = field(default_factory=deque)
+    writer: asyncio.Task[None] | None = None
+
+    def writing(self) -> bool:
+        return self.writer is not None and not self.writer.done()
+
+
+@dataclass(slots=True)
+class Broadcaster:
+    # messages subscriber may fall behind by
+    queue_size: int = 1024
+    overflow: Overflow = Overflow.DROP_OLDEST
+    relay: Callable[[Payload, str], None] | None = None
+    history: History = field(default_factory=History)
+
+    # sequence numbers of broadcaster created later start over
+    epoch: str = field(init=False, default_factory=lambda: uuid4().hex)
+    stats: BroadcastStats = field(init=False, default_factory=BroadcastStats)
+    subscribers: dict[WebSocket, _Subscriber] = field(init=False, default_factory=dict)
+    _topics: TopicIndex[_Subscriber] = field(init=False, default_factory=TopicIndex)
+    # sockets of disconnected subscribers which are being closed
+    _closing: set[asyncio.Task[None]] = field(init=False, default_factory=set)
+
+    async def subscribe(
+        self,
+        ws: WebSocket,
+        patterns: Iterable[str] = (ALL,),
+        last_seq: int | None = None,
+        epoch: str | None = None,
+    ) -> None:
+        # raises `InvalidTopicError` before socket is accepted; subscriber is
+        # sequenced if `last_seq` is passed
+        patterns = set(patterns)
+        for pattern in patterns:
+            check_pattern(pattern)
+
+        await ws.accept()
+
+        subscriber = _Subscriber(ws, sequenced=last_seq is not None)
+        self.subscribers[ws] = subscriber
+        for pattern in patterns:
+            self.add_topic(ws, pattern)
+
+        if last_seq is not None:
+            self._resume(subscriber, last_seq, epoch)
+
+    async def unsubscribe(self, ws: WebSocket) -> None:
+        subscriber = self.subscribers.get(ws)
+
+        if subscriber is not None:
+            self._remove(subscriber)
+
+            if subscriber.writer is not None:
+                subscriber.writer.cancel()
+
+    # sockets which are not subscribed (any longer) are ignored by methods
+    # below, as subscriber may be disconnected while its endpoint runs
+
+    def add_topic(self, ws: WebSocket, pattern: str) -> None:
+        # raises `InvalidTopicError`
+        if (subscriber := self.subscribers.get(ws)) is not None:
+            self._topics.add(pattern, subscriber)
+            subscriber.patterns.add(pattern)
+
+    def remove_topic(self, ws: WebSocket, pattern: str) -> None:
+        if (subscriber := self.subscribers.get(ws)) is not None:
+            self._topics.remove(pattern, subscriber)
+            subscriber.patterns.discard(pattern)
+
+    def topics(self, ws: WebSocket) -> set[str]:
+        subscriber = self.subscribers.get(ws)
+        return set(subscriber.patterns) if subscriber is not None else set()
+
+    def publish(self, message: Payload, topic: str = DEFAULT_TOPIC) -> None:
+        # raises `InvalidTopicError` for topic with wildcards
+        self.publish_local(message, topic)
+
+        if self.relay is not None:
+            self.relay(message, topic)
+
+    def publish_local(self, message: Payload, topic: str = DEFAULT_TOPIC) -> None:
+        # to subscribers of this process only
+        subscribers = self._topics.match(topic)
+        self.stats.published += 1
+
+        entry = self.history.append(topic, message)
+
+        self._deliver(subscribers, _event(message), entry)
+
+    def send(self, ws: WebSocket, message: Payload) -> None:
+        # to one subscriber, in order with messages published to it
+        if (subscriber := self.subscribers.get(ws)) is not None:
+            self._deliver([subscriber], _event(message))
+
+    async def wait_closed(self) -> None:
+        # waits for sockets of disconnected subscribers to be closed
+        if self._closing:
+            await asyncio.wait(self._closing)
+
+    def _resume(
+        self, subscriber: _Subscriber, last_seq: int, epoch: str | None
+    ) -> None:
+        missed = self.history.since(last_seq) if epoch in (None, self.epoch) else None
+        action = "resumed" if missed is not None else "reset"
+        control = {
+            "action": action,
+            "epoch": self.epoch,
+            "seq": last_seq if missed is not None else self.history.last_seq,
+        }
+
+        events = [_event(json.dumps(control))]
+
+        if missed:
+            index = TopicIndex[bool]()
+            for pattern in subscriber.patterns:
+                index.add(pattern, True)
+
+            matches = dict[str, bool]()
+            for entry in missed:
+                if (match := matches.get(entry.topic)) is None:
+                    match = matches[entry.topic] = bool(index.match(entry.topic))
+                if match:
+                    events.append(_sequenced_event(entry))
+
+        subscriber.replay.extend(events[1:])
+        subscriber.writer = asyncio.Task(
+            self._write(subscriber, events[0]),
+            loop=asyncio.get_running_loop(),
+            eager_start=True,
+        )
+
+    def _deliver(
+        self,
+        subscribers: Iterable[_Subscriber],
+        event: _Event,
+        entry: HistoryEntry | None = None,
+    ) -> None:
+        # sequenced subscribers get `entry` instead, if it is passed; its
+        # event is built only once some of them match
+        loop = asyncio.get_running_loop()
+        slow = []
+        sequenced = None
+
+        for subscriber in subscribers:
+            if entry is not None and subscriber.sequenced:
+                if sequenced is None:
+                    sequenced = _sequenced_event(entry)
+                self._enqueue(subscriber, sequenced, loop, slow)
+            else:
+                self._enqueue(subscriber, event, loop, slow)
+
+        for subscriber in slow:
+            self._disconnect(subscriber)
+
+    def _enqueue(
+        self,
+        subscriber: _Subscriber,
+        event: _Event,
+        loop: asyncio.AbstractEventLoop,
+        slow: list[_Subscriber],
+    ) -> None:
+        if not subscriber.writing():
+            subscriber.writer = asyncio.Task(
+                self._write(subscriber, event), loop=loop, eager_start=True
+            )
+            return
+
+        if len(subscriber.backlog) < self.queue_size:
+            subscriber.backlog.append(event)
+            return
+
+        match self.overflow:
+            case Overflow.DROP_OLDEST:
+                subscriber.backlog.popleft()
+                subscriber.backlog.append(event)
+                self.stats.dropped += 1
+            case Overflow.DROP_NEWEST:
+                self.stats.dropped += 1
+            case Overflow.DISCONNECT:
+                slow.append(subscriber)
+
+    def _remove(self, subscriber: _Subscriber) -> None:
+        if self.subscribers.pop(subscriber.ws, None) is None:
+            return
+
+        for pattern in subscriber.patterns:
+            self._topics.remove(pattern, subscriber)
+
+    def _disconnect(self, subscriber: _Subscriber) -> None:
+        self._remove(subscriber)
+        subscriber.writer.cancel()
+        self.stats.disconnected += 1
+
+        closing = asyncio.create_task(self._close(subscriber))
+        self._closing.add(closing)
+        closing.add_done_callback(self._closing.discard)
+
+    async def _close(self, subscriber: _Subscriber) -> None:
+        await asyncio.wait([subscriber.writer])
+
+        # socket may be gone already
+        with suppress(Exception):
+            async with asyncio.timeout(CLOSE_TIMEOUT):
+                await subscriber.ws.close(SLOW_CONSUMER_CLOSE_CODE)
+
+    async def _write(self, subscriber: _Subscriber, event: _Event) -> None:
+        # the only writer of subscriber until its backlog is sent
+        try:
+            await subscriber.ws.send(event)
+
+            while subscriber.replay:
+                await subscriber.ws.send(subscriber.replay.popleft())
+
+            while subscriber.backlog:
+                await subscriber.ws.send(subscriber.backlog.popleft())
+        except Exception:
+            # socket is closed, its endpoint unsubscribes it as well once
+            # disconnect is received
+            self._remove(subscriber)
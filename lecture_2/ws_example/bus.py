@@ -0,0 +1,258 @@
+import asyncio
+import fcntl
+import os
+import struct
+from contextlib import suppress
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import AsyncIterator, Callable, Iterator
+
+from lecture_2.ws_example.broadcaster import Payload
+
+# relays messages published in one worker process to broadcasters of the
+# others through unix domain socket, without external broker:
+#
+# - one of workers runs hub, the one which takes lock next to socket first;
+#   every worker (hub's own as well) connects to hub as client
+# - message published in worker is sent to hub as frame, and hub forwards it
+#   to every other worker as is; frames of one worker are forwarded in order
+#   they were sent, so messages of one publisher keep their order
+# - once hub is gone, workers take lock again and reconnect to a new one;
+#   messages published while worker is not connected are not relayed
+#
+# frame is header (whether payload is binary, topic length, payload length)
+# followed by utf-8 topic and payload; frames sent during one iteration of
+# event loop are written to socket at once, and runs of complete frames are
+# read and forwarded at once as well, rather than frame by frame
+
+_HEADER = struct.Struct("!?HI")
+
+logger = getLogger(__name__)
+
+# hub disconnects worker which falls behind by that much (it reconnects
+# then), and worker does not send to hub which falls behind by that much
+HUB_MAX_BUFFER = 64 << 20
+RECONNECT_DELAY = 0.1
+READ_SIZE = 256 << 10
+
+
+@dataclass(slots=True)
+class BusStats:
+    sent: int = 0
+    received: int = 0
+    # published while hub was not connected or fell behind
+    lost: int = 0
+    reconnects: int = 0
+
+
+@dataclass(slots=True)
+class Bus:
+    path: str
+    # delivers message relayed from other worker to local subscribers
+    deliver: Callable[[Payload, str], None]
+
+    stats: BusStats = field(init=False, default_factory=BusStats)
+    _writer: asyncio.StreamWriter | None = field(init=False, default=None)
+    # frames to be written once event loop iteration ends
+    _pending: list[bytes] = field(init=False, default_factory=list)
+    _pending_frames: int = field(init=False, default=0)
+    _connected: asyncio.Event = field(init=False, default_factory=asyncio.Event)
+    _task: asyncio.Task[None] | None = field(init=False, default=None)
+    # hub, if it runs in this worker
+    _lock_fd: int | None = field(init=False, default=None)
+    _hub: asyncio.Server | None = field(init=False, default=None)
+    _peers: set[asyncio.StreamWriter] = field(init=False, default_factory=set)
+
+    @property
+    def is_hub(self) -> bool:
+        return self._hub is not None
+
+    async def start(self) -> None:
+        # returns once connected to hub
+        self._task = asyncio.create_task(self._run())
+        await self.wait_connected()
+
+    async def wait_connected(self) -> None:
+        await self._connected.wait()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait([self._task])
+            self._task = None
+
+        self._disconnect()
+        await self._stop_hub()
+
+    def send(self, message: Payload, topic: str) -> None:
+        if (
+            self._writer is None
+            or self._writer.transport.get_write_buffer_size() > HUB_MAX_BUFFER
+        ):
+            self.stats.lost += 1
+            return
+
+        binary = isinstance(message, bytes)
+        payload = message if binary else message.encode()
+        topic_bytes = topic.encode()
+
+        if not self._pending:
+            asyncio.get_running_loop().call_soon(self._flush)
+
+        self._pending += [
+            _HEADER.pack(binary, len(topic_bytes), len(payload)),
+            topic_bytes,
+            payload,
+        ]
+        self._pending_frames += 1
+
+    def _flush(self) -> None:
+        if self._writer is not None:
+            self._writer.write(b"".join(self._pending))
+            self.stats.sent += self._pending_frames
+        else:
+            self.stats.lost += self._pending_frames
+
+        self._pending.clear()
+        self._pending_frames = 0
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self._lock_fd is None:
+                    await self._try_start_hub()
+
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            self._connected.set()
+
+            try:
+                async for run in _read_frames(reader):
+                    for binary, topic, payload in _frames(run):
+                        self.stats.received += 1
+                        self._deliver(binary, topic, payload)
+            except OSError:
+                pass
+
+            self._disconnect()
+            self.stats.reconnects += 1
+
+    def _deliver(self, binary: bool, topic: str, payload: bytes) -> None:
+        # failure to deliver one message must not stop relaying of the others,
+        # as worker would stay connected to hub without reading from it
+        try:
+            self.deliver(payload if binary else payload.decode(), topic)
+        except Exception:
+            logger.exception("Failed to deliver message of topic %s", topic)
+
+    def _disconnect(self) -> None:
+        self._connected.clear()
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _try_start_hub(self) -> None:
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # hub is run by other worker
+            os.close(fd)
+            return
+
+        try:
+            # socket may be left by hub which died
+            with suppress(FileNotFoundError):
+                os.unlink(self.path)
+
+            self._hub = await asyncio.start_unix_server(self._serve, self.path)
+        except OSError:
+            os.close(fd)
+            raise
+
+        self._lock_fd = fd
+
+    async def _stop_hub(self) -> None:
+        if self._hub is not None:
+            self._hub.close()
+            for peer in self._peers:
+                peer.close()
+            await self._hub.wait_closed()
+            self._hub = None
+
+            with suppress(FileNotFoundError):
+                os.unlink(self.path)
+
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._peers.add(writer)
+
+        try:
+            async for run in _read_frames(reader):
+                for peer in list(self._peers):
+                    if peer is writer:
+                        continue
+
+                    if peer.transport.get_write_buffer_size() > HUB_MAX_BUFFER:
+                        self._peers.discard(peer)
+                        peer.close()
+                        continue
+
+                    peer.write(run)
+        except OSError:
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+
+def _complete(buffer: bytearray) -> int:
+    # length of complete frames at start of buffer
+    end = 0
+
+    while end + _HEADER.size <= len(buffer):
+        _, topic_length, payload_length = _HEADER.unpack_from(buffer, end)
+        frame_end = end + _HEADER.size + topic_length + payload_length
+        if frame_end > len(buffer):
+            break
+        end = frame_end
+
+    return end
+
+
+async def _read_frames(reader: asyncio.StreamReader) -> AsyncIterator[bytes]:
+    # runs of complete frames, as they are received; incomplete frame is
+    # dropped once connection is closed
+    buffer = bytearray()
+
+    while chunk := await reader.read(READ_SIZE):
+        buffer += chunk
+
+        if end := _complete(buffer):
+            yield bytes(buffer[:end])
+            del buffer[:end]
+
+
+def _frames(run: bytes) -> Iterator[tuple[bool, str, bytes]]:
+    position = 0
+
+    while position < len(run):
+        binary, topic_length, payload_length = _HEADER.unpack_from(run, position)
+        topic_start = position + _HEADER.size
+        payload_start = topic_start + topic_length
+        position = payload_start + payload_length
+
+        yield (
+            binary,
+            run[topic_start:payload_start].decode(),
+            run[payload_start:position],
+        )
@@ -0,0 +1,66 @@
+from collections import deque
+from dataclasses import dataclass, field
+
+# recent messages of broadcaster by their sequence numbers, so subscriber
+# which reconnects gets messages it missed; the oldest ones are evicted once
+# total size of kept messages is over budget
+
+# approximate size of entry bookkeeping besides message
+_ENTRY_OVERHEAD = 128
+
+
+@dataclass(slots=True)
+class HistoryEntry:
+    seq: int
+    topic: str
+    message: str | bytes
+    size: int
+
+
+@dataclass(slots=True)
+class History:
+    max_bytes: int = 16 << 20
+
+    # sequence number of the latest message, they start from 1
+    last_seq: int = field(init=False, default=0)
+    _entries: deque[HistoryEntry] = field(init=False, default_factory=deque)
+    _bytes: int = field(init=False, default=0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        # bytes taken by kept messages
+        return self._bytes
+
+    def append(self, topic: str, message: str | bytes) -> HistoryEntry:
+        self.last_seq += 1
+        size = len(topic) + len(message) + _ENTRY_OVERHEAD
+
+        entry = HistoryEntry(self.last_seq, topic, message, size)
+        self._entries.append(entry)
+        self._bytes += size
+
+        while self._bytes > self.max_bytes:
+            self._bytes -= self._entries.popleft().size
+
+        return entry
+
+    def since(self, seq: int) -> list[HistoryEntry] | None:
+        # messages after `seq`, or None if some of them are not kept (or
+        # `seq` is ahead of history)
+        first = self._entries[0].seq if self._entries else self.last_seq + 1
+
+        if not first - 1 <= seq <= self.last_seq:
+            return None
+
+        # reconnecting subscriber usually missed a few of the latest messages
+        result = []
+        for entry in reversed(self._entries):
+            if entry.seq <= seq:
+                break
+            result.append(entry)
+
+        result.reverse()
+        return result
@@ -1,46 +1,158 @@
-from dataclasses import dataclass, field
+import json
+import os
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+from typing import Annotated, Any
 from uuid import uuid4
 
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 
-app = FastAPI()
+from lecture_2.ws_example.broadcaster import DEFAULT_TOPIC, Broadcaster, Overflow
+from lecture_2.ws_example.bus import Bus
+from lecture_2.ws_example.history import History
+from lecture_2.ws_example.topics import ALL, InvalidTopicError, check_pattern
 
+broadcaster = Broadcaster(
+    queue_size=int(os.environ.get("WS_QUEUE_SIZE", "1024")),
+    overflow=Overflow(os.environ.get("WS_OVERFLOW", Overflow.DROP_OLDEST)),
+    history=History(int(os.environ.get("WS_HISTORY_BYTES", str(16 << 20)))),
+)
 
-@dataclass(slots=True)
-class Broadcaster:
-    subscribers: list[WebSocket] = field(init=False, default_factory=list)
+# workers started with the same `WS_BUS_PATH` (e.g. `uvicorn --workers 4`)
+# relay published messages to each other by bus on that unix socket
 
-    async def subscribe(self, ws: WebSocket) -> None:
-        await ws.accept()
-        self.subscribers.append(ws)
 
-    async def unsubscribe(self, ws: WebSocket) -> None:
-        self.subscribers.remove(ws)
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if (path := os.environ.get("WS_BUS_PATH")) is None:
+        yield
+        return
 
-    async def publish(self, message: str) -> None:
-        for ws in self.subscribers:
-            await ws.send_text(message)
+    bus = Bus(path, broadcaster.publish_local)
+    await bus.start()
+    broadcaster.relay = bus.send
 
+    yield
 
-broadcaster = Broadcaster()
+    broadcaster.relay = None
+    await bus.close()
 
 
-@app.post("/publish")
-async def post_publish(request: Request):
-    message = (await request.body()).decode()
-    await broadcaster.publish(message)
+app = FastAPI(lifespan=lifespan)
+
+# text received by socket is published to default topic unless it is control
+# message, json object like `{"action": "subscribe", "topic": "news.*"}`
+# (or "unsubscribe"), which is answered with `{"action": "subscribed", ...}`
+# or `{"error": ...}`; binary messages are published as they are
+#
+# body posted to `/publish` is published as binary message if it has
+# `BINARY_MEDIA_TYPE` and as text otherwise
+#
+# client which reconnects passes `last_seq` and `epoch` of the last message
+# it got to `/subscribe` to get messages it missed (see `broadcaster`); with
+# bus, sequence numbers are kept by every worker separately, so client which
+# reconnects to other worker is reset
+
+BINARY_MEDIA_TYPE = "application/octet-stream"
+
+
+@app.post(
+    "/publish",
+    responses={
+        HTTPStatus.UNPROCESSABLE_ENTITY: {
+            "description": "Failed to publish message to topic with wildcards "
+            "or text which is not utf-8",
+        },
+    },
+)
+async def post_publish(request: Request, topic: str = DEFAULT_TOPIC):
+    message: bytes | str = await request.body()
+    media_type = request.headers.get("content-type", "").partition(";")[0].strip()
+
+    try:
+        if media_type != BINARY_MEDIA_TYPE:
+            message = message.decode()
+
+        broadcaster.publish(message, topic)
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            HTTPStatus.UNPROCESSABLE_ENTITY, "Text message must be utf-8"
+        ) from e
+    except InvalidTopicError as e:
+        raise HTTPException(HTTPStatus.UNPROCESSABLE_ENTITY, str(e)) from e
+
+
+def _control(text: str) -> dict[str, Any] | None:
+    if not text.startswith("{"):
+        return None
+
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+
+    return data if isinstance(data, dict) and "action" in data else None
+
+
+def _handle(ws: WebSocket, control: dict[str, Any]) -> str:
+    action, pattern = control["action"], control.get("topic")
+
+    if action not in ("subscribe", "unsubscribe") or not isinstance(pattern, str):
+        return json.dumps(
+            {**control, "error": "Control message must have action and topic"}
+        )
+
+    try:
+        check_pattern(pattern)
+    except InvalidTopicError as e:
+        return json.dumps({**control, "error": str(e)})
+
+    if action == "subscribe":
+        broadcaster.add_topic(ws, pattern)
+    else:
+        broadcaster.remove_topic(ws, pattern)
+
+    return json.dumps({"action": f"{action}d", "topic": pattern})
 
 
 @app.websocket("/subscribe")
-async def ws_subscribe(ws: WebSocket):
+async def ws_subscribe(
+    ws: WebSocket,
+    topic: Annotated[list[str] | None, Query()] = None,
+    last_seq: Annotated[int | None, Query(ge=0)] = None,
+    epoch: str | None = None,
+):
     client_id = uuid4()
-    await broadcaster.subscribe(ws)
-    await broadcaster.publish(f"client {client_id} subscribed")
+
+    try:
+        await broadcaster.subscribe(ws, topic or [ALL], last_seq, epoch)
+    except InvalidTopicError:
+        await ws.close(status.WS_1008_POLICY_VIOLATION)
+        return
+
+    broadcaster.publish(f"client {client_id} subscribed")
 
     try:
         while True:
-            text = await ws.receive_text()
-            await broadcaster.publish(text)
+            message = await ws.receive()
+
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if (text := message.get("text")) is None:
+                broadcaster.publish(message["bytes"])
+            elif (control := _control(text)) is not None:
+                broadcaster.send(ws, _handle(ws, control))
+            else:
+                broadcaster.publish(text)
     except WebSocketDisconnect:
-        broadcaster.unsubscribe(ws)
-        await broadcaster.publish(f"client {client_id} unsubscribed")
+        await broadcaster.unsubscribe(ws)
+        broadcaster.publish(f"client {client_id} unsubscribed")
@@ -0,0 +1,135 @@
+from dataclasses import dataclass, field
+
+# topics are dot-separated words, e.g. `news.sport.football`; subscription
+# patterns may have wildcard words, as amqp topic exchanges do:
+#
+# - `*` matches exactly one word
+# - `#` matches zero or more words
+#
+# patterns without wildcards are kept in dict, the rest - in trie by words,
+# so publishing touches only subscribers with matching patterns; `#.#` is the
+# same as `#`, so consecutive `#` words are rejected, and matching visits
+# every trie node at most once per word of topic
+
+ONE = "*"
+ANY = "#"
+# pattern matching every topic
+ALL = ANY
+
+MAX_WORDS = 16
+MAX_LENGTH = 256
+
+
+class InvalidTopicError(ValueError):
+    pass
+
+
+def _words(topic: str, wildcards: bool) -> list[str]:
+    words = topic.split(".")
+
+    if len(topic) > MAX_LENGTH or len(words) > MAX_WORDS:
+        raise InvalidTopicError(
+            f"Topic must be at most {MAX_LENGTH} characters and {MAX_WORDS} words"
+        )
+
+    for i, word in enumerate(words):
+        if not word:
+            raise InvalidTopicError(f"Topic {topic!r} has empty word")
+
+        if (ONE in word or ANY in word) and (not wildcards or len(word) > 1):
+            raise InvalidTopicError(
+                f"Topic {topic!r} has wildcard which is not a whole word"
+                if wildcards
+                else f"Topic {topic!r} must not have wildcards"
+            )
+
+        if word == ANY and i and words[i - 1] == ANY:
+            raise InvalidTopicError(f"Topic {topic!r} has consecutive {ANY!r} words")
+
+    return words
+
+
+def check_pattern(pattern: str) -> None:
+    _words(pattern, wildcards=True)
+
+
+@dataclass(slots=True)
+class _Node[T]:
+    children: dict[str, "_Node[T]"] = field(default_factory=dict)
+    subscribers: set[T] = field(default_factory=set)
+
+
+@dataclass(slots=True)
+class TopicIndex[T]:
+    _exact: dict[str, set[T]] = field(init=False, default_factory=dict)
+    _root: _Node[T] = field(init=False, default_factory=_Node)
+
+    def add(self, pattern: str, subscriber: T) -> None:
+        words = _words(pattern, wildcards=True)
+
+        if ONE not in words and ANY not in words:
+            self._exact.setdefault(pattern, set()).add(subscriber)
+            return
+
+        node = self._root
+        for word in words:
+            node = node.children.setdefault(word, _Node())
+
+        node.subscribers.add(subscriber)
+
+    def remove(self, pattern: str, subscriber: T) -> None:
+        if (subscribers := self._exact.get(pattern)) is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._exact[pattern]
+            return
+
+        # nodes left without subscribers and children are pruned
+        path = [self._root]
+        for word in pattern.split("."):
+            if (node := path[-1].children.get(word)) is None:
+                return
+            path.append(node)
+
+        path[-1].subscribers.discard(subscriber)
+
+        for word, parent, node in zip(
+            reversed(pattern.split(".")), reversed(path[:-1]), reversed(path[1:])
+        ):
+            if node.subscribers or node.children:
+                break
+            del parent.children[word]
+
+    def match(self, topic: str) -> set[T]:
+        words = _words(topic, wildcards=False)
+        result = set(self._exact.get(topic, ()))
+
+        if self._root.children:
+            self._match(self._root, words, 0, result, set())
+
+        return result
+
+    def _match(
+        self,
+        node: _Node[T],
+        words: list[str],
+        i: int,
+        result: set[T],
+        visited: set[tuple[int, int]],
+    ) -> None:
+        # the same node may be reached at the same word by several paths
+        if (key := (id(node), i)) in visited:
+            return
+        visited.add(key)
+
+        if (rest := node.children.get(ANY)) is not None:
+            for j in range(i, len(words) + 1):
+                self._match(rest, words, j, result, visited)
+
+        if i == len(words):
+            result.update(node.subscribers)
+            return
+
+        for word in (words[i], ONE):
+            if (child := node.children.get(word)) is not None:
+                self._match(child, words, i + 1, result, visited)
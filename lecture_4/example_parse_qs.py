@@ -1,9 +1,127 @@
+from string import hexdigits
 from sys import argv
+from typing import Iterator, Mapping
 
+# query string parser for raw asgi apps: parameters are split in one pass,
+# `+` and percent escapes are decoded (as utf-8, invalid escapes are kept as
+# they are), repeated keys give list of values; query strings which are too
+# long or have too many parameters are rejected before they are split
 
-def parse_qs(query_string):
-    # это код который я взял из реализации 1-го ДЗ одного из студентов
-    return dict(param.split("=") for param in query_string.split("&") if "=" in param)
+MAX_LENGTH = 64 << 10
+MAX_PARAMS = 1_000
+
+_HEX_TO_BYTE = {
+    (a + b).encode(): bytes([int(a + b, 16)]) for a in hexdigits for b in hexdigits
+}
+
+type Value = str | list[str]
+
+
+class QueryStringError(ValueError):
+    pass
+
+
+def _unquote(raw: bytes) -> str:
+    # `+` is replaced by space in whole query string beforehand
+    if b"%" in raw:
+        pieces = raw.split(b"%")
+        raw = pieces[0] + b"".join(
+            [(_HEX_TO_BYTE.get(p[:2]) or b"%" + p[:2]) + p[2:] for p in pieces[1:]]
+        )
+
+    return raw.decode("utf-8", "replace")
+
+
+def _checked(query_string: str | bytes, max_length: int, max_params: int) -> bytes:
+    raw = query_string.encode() if isinstance(query_string, str) else query_string
+
+    if len(raw) > max_length:
+        raise QueryStringError(f"Query string is longer than {max_length} bytes")
+
+    if raw.count(b"&") >= max_params:
+        raise QueryStringError(f"Query string has more than {max_params} parameters")
+
+    return raw.replace(b"+", b" ") if b"+" in raw else raw
+
+
+class QueryView(Mapping[str, Value]):
+    # keys are decoded right away, values - only once they are read
+    __slots__ = ("_values",)
+
+    def __init__(self, values: dict[str, list[bytes]]) -> None:
+        self._values = values
+
+    def __getitem__(self, key: str) -> Value:
+        values = self.getlist(key)
+
+        if not values:
+            raise KeyError(key)
+
+        return values[0] if len(values) == 1 else values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def getlist(self, key: str) -> list[str]:
+        return [_unquote(value) for value in self._values.get(key, ())]
+
+
+def _parse_view(raw: bytes) -> QueryView:
+    values: dict[str, list[bytes]] = {}
+
+    for pair in raw.split(b"&"):
+        if pair:
+            key, _, value = pair.partition(b"=")
+            values.setdefault(_unquote(key), []).append(value)
+
+    return QueryView(values)
+
+
+def parse_qs(
+    query_string: str | bytes,
+    *,
+    max_length: int = MAX_LENGTH,
+    max_params: int = MAX_PARAMS,
+    lazy: bool = False,
+) -> Mapping[str, Value]:
+    # raises `QueryStringError` if query string is over limits
+    raw = _checked(query_string, max_length, max_params)
+
+    if lazy:
+        return _parse_view(raw)
+
+    if b"%" in raw:
+        pairs = [
+            (_unquote(key), _unquote(value))
+            for key, sep, value in (pair.partition(b"=") for pair in raw.split(b"&"))
+            if key or sep
+        ]
+    else:
+        # nothing to unquote, so text is decoded at once; "&" and "=" are
+        # never part of multibyte utf-8 characters
+        pairs = [
+            (key, value)
+            for key, sep, value in (
+                pair.partition("=")
+                for pair in raw.decode("utf-8", "replace").split("&")
+            )
+            if key or sep
+        ]
+
+    result: dict[str, Value] = {}
+
+    for key, value in pairs:
+        if (previous := result.get(key)) is None:
+            result[key] = value
+        elif type(previous) is list:
+            previous.append(value)
+        else:
+            result[key] = [previous, value]
+
+    return result
 
 
 if __name__ == "__main__":
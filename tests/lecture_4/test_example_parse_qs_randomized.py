@@ -0,0 +1,103 @@
+import random
+import urllib.parse
+from typing import Any
+
+import pytest
+
+from lecture_4.example_parse_qs import QueryStringError, parse_qs
+
+# properties are checked on random query strings, generated with fixed seeds
+
+_TEXT = "ab=&+%/ 2Fé€😀"
+_GARBAGE = "ab=&+%2F0zé"
+
+
+def _text(rng: random.Random, alphabet: str) -> str:
+    return "".join(rng.choices(alphabet, k=rng.randrange(6)))
+
+
+def _grouped(pairs: list[tuple[str, str]]) -> dict[str, Any]:
+    result: dict[str, Any] = {}
+
+    for key, value in pairs:
+        result.setdefault(key, []).append(value)
+
+    return {
+        key: values[0] if len(values) == 1 else values for key, values in result.items()
+    }
+
+
+@pytest.mark.parametrize("seed", range(50))
+@pytest.mark.parametrize("quote_via", [urllib.parse.quote_plus, urllib.parse.quote])
+def test_encoded_params_are_parsed_back(seed: int, quote_via) -> None:
+    rng = random.Random(seed)
+    keys = [_text(rng, _TEXT) for _ in range(rng.randrange(1, 5))]
+    pairs = [(rng.choice(keys), _text(rng, _TEXT)) for _ in range(rng.randrange(8))]
+    query_string = urllib.parse.urlencode(pairs, quote_via=quote_via)
+
+    assert parse_qs(query_string) == _grouped(pairs)
+    assert parse_qs(query_string.encode()) == parse_qs(query_string)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_same_as_urllib(seed: int) -> None:
+    rng = random.Random(seed)
+    query_string = "".join(rng.choices(_GARBAGE, k=rng.randrange(30)))
+
+    expected = urllib.parse.parse_qs(query_string, keep_blank_values=True)
+
+    assert parse_qs(query_string) == {
+        key: values[0] if len(values) == 1 else values
+        for key, values in expected.items()
+    }
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_lazy_view_is_same(seed: int) -> None:
+    rng = random.Random(seed)
+    query_string = "".join(rng.choices(_GARBAGE, k=rng.randrange(30)))
+
+    view = parse_qs(query_string, lazy=True)
+
+    assert dict(view) == parse_qs(query_string)
+    for key, value in view.items():
+        assert view.getlist(key) == (value if isinstance(value, list) else [value])
+
+
+def test_lazy_view_missing_key() -> None:
+    view = parse_qs(b"a=1", lazy=True)
+
+    assert view.get("b") is None
+    assert view.getlist("b") == []
+    with pytest.raises(KeyError):
+        view["b"]
+
+
+@pytest.mark.parametrize(
+    ("query_string", "expected_result"),
+    [
+        ("a=b=c", {"a": "b=c"}),
+        ("a", {"a": ""}),
+        ("a+b=c+d", {"a b": "c d"}),
+        ("a=%2", {"a": "%2"}),
+        ("a=%zz%41", {"a": "%zzA"}),
+        ("a=%FF", {"a": "�"}),
+        ("&&a=1&&", {"a": "1"}),
+        ("", {}),
+    ],
+)
+def test_edge_cases(query_string: str, expected_result: dict[str, Any]) -> None:
+    assert parse_qs(query_string) == expected_result
+    assert dict(parse_qs(query_string, lazy=True)) == expected_result
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_limits(lazy: bool) -> None:
+    assert parse_qs("a=1&b=2", max_params=2, lazy=lazy) == {"a": "1", "b": "2"}
+    assert parse_qs("a=1234", max_length=6, lazy=lazy) == {"a": "1234"}
+
+    with pytest.raises(QueryStringError):
+        parse_qs("a=1&b=2&c=3", max_params=2, lazy=lazy)
+
+    with pytest.raises(QueryStringError):
+        parse_qs("a=12345", max_length=6, lazy=lazy)
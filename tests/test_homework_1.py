@@ -1,13 +1,20 @@
+import asyncio
+import json
+import math
+import random
+import statistics
+import struct
 from http import HTTPStatus
 from typing import Any
 
 import pytest
 from async_asgi_testclient import TestClient
+from fastapi.testclient import TestClient as FastAPITestClient
 
+from lecture_1 import compute, math_example, stats
 from lecture_1.hw.math_plain_asgi import app
 
 
-@pytest.mark.xfail()
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     ("method", "path"),
@@ -27,7 +34,6 @@ async def test_not_found(method: str, path: str):
         assert response.status_code == HTTPStatus.NOT_FOUND
 
 
-@pytest.mark.xfail()
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     ("query", "status_code"),
@@ -51,7 +57,6 @@ async def test_factorial(query: dict[str, Any], status_code: int):
         assert "result" in response.json()
 
 
-@pytest.mark.xfail()
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     ("params", "status_code"),
@@ -72,7 +77,6 @@ async def test_fibonacci(params: str, status_code: int):
         assert "result" in response.json()
 
 
-@pytest.mark.xfail()
 @pytest.mark.asyncio()
 @pytest.mark.parametrize(
     ("json", "status_code"),
@@ -91,3 +95,233 @@ async def test_mean(json: dict[str, Any] | None, status_code: int):
     assert response.status_code == status_code
     if status_code == HTTPStatus.OK:
         assert "result" in response.json()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("method", "path", "kwargs", "result"),
+    [
+        ("GET", "/factorial", {"query_string": {"n": 5}}, 120),
+        ("GET", "/factorial", {"query_string": [("n", 1), ("n", "+4")]}, 24),
+        ("GET", "/fibonacci/10", {}, 55),
+        ("GET", "/mean", {"data": b" [1, 2.5e0 ,-0.5] "}, 1.0),
+    ],
+)
+async def test_result(method: str, path: str, kwargs: dict[str, Any], result: Any):
+    async with TestClient(app) as client:
+        response = await client.open(path, method=method, **kwargs)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"result": result}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body",
+    [b"", b"[1,]", b"[1 2]", b"[NaN]", b"[1e999]", b"[01]", b'["1"]', b"{}"],
+)
+async def test_mean_invalid_body(body: bytes):
+    async with TestClient(app) as client:
+        response = await client.get("/mean", data=body)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_fibonacci_fast_doubling():
+    a, b = 0, 1
+
+    for n in range(3_000):
+        assert compute.fibonacci(n) == a
+        a, b = b, a + b
+
+
+@pytest.fixture()
+def small_limits():
+    limits, cache = compute.limits(), compute.cache()
+    compute.use(
+        compute.Limits(
+            max_fibonacci_n=30_000,
+            inline_fibonacci_n=100,
+            max_factorial_n=30_000,
+            inline_factorial_n=100,
+        )
+    )
+    compute.use_cache(compute.ResultCache())
+    yield
+    compute.shutdown()
+    compute.use(limits)
+    compute.use_cache(cache)
+
+
+@pytest.mark.usefixtures("small_limits")
+@pytest.mark.asyncio
+async def test_fibonacci_limits():
+    async with TestClient(app) as client:
+        # computed by process pool, far above decimal conversion limit
+        response = await client.get("/fibonacci/30000")
+        too_large = await client.get("/fibonacci/30001")
+
+    assert response.status_code == HTTPStatus.OK
+
+    # F(30000) has 6270 digits
+    digits = response.content.removeprefix(b'{"result":').removesuffix(b"}")
+    last = compute.fibonacci(30_000) % 10**100
+
+    assert len(digits) == 6270
+    assert digits[-100:] == str(last).zfill(100).encode()
+    assert too_large.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.usefixtures("small_limits")
+@pytest.mark.asyncio
+async def test_factorial_is_chunked():
+    async with TestClient(app) as client:
+        response = await client.get("/factorial", query_string={"n": 30_000})
+        too_large = await client.get("/factorial", query_string={"n": 30_001})
+
+    assert response.status_code == HTTPStatus.OK
+
+    # 30000! has 121288 digits, more than one chunk
+    digits = response.content.removeprefix(b'{"result":').removesuffix(b"}")
+    first = math.factorial(30_000) // 10 ** (121_288 - 50)
+
+    assert len(digits) == 121_288
+    assert digits[:50] == str(first).encode()
+    assert too_large.status_code == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.usefixtures("small_limits")
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced():
+    results = await asyncio.gather(*(compute.factorial_text(5_000) for _ in range(4)))
+    cached = await compute.factorial_text(5_000)
+
+    assert len(set(results)) == 1
+    assert cached is results[0]
+    assert compute.cache().stats == compute.CacheStats(hits=1, misses=1, coalesced=3)
+
+
+def test_result_cache_is_bounded():
+    cache = compute.ResultCache(max_bytes=1_000)
+
+    for n in range(10):
+        cache.put(n, b"1" * 200)
+    cache.get(7)
+    cache.put(10, b"1" * 200)
+
+    assert cache.size <= 1_000
+    assert cache.get(7) is not None
+    assert cache.get(0) is None
+    assert cache.stats.evictions == 8
+
+
+async def chunked(data: bytes, rng: random.Random):
+    while data:
+        size = rng.randint(1, 64)
+        yield data[:size]
+        data = data[size:]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("binary", [False, True])
+@pytest.mark.asyncio
+async def test_aggregate_chunked_body(seed: int, binary: bool):
+    rng = random.Random(seed)
+    numbers = [rng.uniform(-1e3, 1e3) for _ in range(rng.randint(1, 500))]
+    body = (
+        struct.pack(f"<{len(numbers)}d", *numbers)
+        if binary
+        else json.dumps(numbers, indent=rng.choice([None, 1])).encode()
+    )
+
+    result = await stats.aggregate(chunked(body, rng), binary)
+
+    assert result.count == len(numbers)
+    assert result.mean == pytest.approx(statistics.fmean(numbers))
+    assert result.m2 / result.count == pytest.approx(statistics.pvariance(numbers))
+    assert (result.min, result.max) == (min(numbers), max(numbers))
+
+
+@pytest.mark.parametrize(
+    ("body", "binary"),
+    [
+        (b"[1, 2", False),
+        (b"[1, 2]]", False),
+        (b"[1, [2]]", False),
+        (b"[1" + b" " * 2_000 + b"2]", False),
+        (b"\x00" * 12, True),
+        (struct.pack("<d", math.nan), True),
+    ],
+)
+@pytest.mark.asyncio
+async def test_aggregate_invalid_body(body: bytes, binary: bool):
+    with pytest.raises(ValueError):
+        await stats.aggregate(chunked(body, random.Random(0)), binary)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"[" + b" " * 2_000 + b"1]",
+        b"[1," + b" " * 2_000 + b"2]",
+        b"[1" + b" " * 2_000 + b", 2]",
+    ],
+)
+@pytest.mark.parametrize("split", [None, 1, 1_500])
+@pytest.mark.asyncio
+async def test_aggregate_whitespace(body: bytes, split: int | None):
+    # whitespace does not count toward length of number, however body is split
+    async def chunks():
+        yield body[:split]
+        yield body[split:] if split is not None else b""
+
+    result = await stats.aggregate(chunks(), binary=False)
+
+    assert result.count == body.count(b",") + 1
+
+
+def test_sample_quantiles():
+    result = stats.Aggregate()
+    for start in range(0, 100_000, 1_000):
+        result.add([float(x) for x in range(start, start + 1_000)])
+
+    summary = result.summary()
+
+    assert summary.quantiles[0.5] == pytest.approx(50_000, rel=0.03)
+    assert summary.quantiles[0.99] == pytest.approx(99_000, rel=0.01)
+
+
+@pytest.mark.asyncio
+async def test_stats():
+    numbers = [1.0, 2.0, 4.0, 8.0, 16.0]
+    expected = {
+        "count": 5,
+        "mean": 6.2,
+        "variance": statistics.pvariance(numbers),
+        "min": 1.0,
+        "max": 16.0,
+    }
+    quantiles = {"0.01": 1.04, "0.25": 2.0, "0.5": 4.0, "0.75": 8.0, "0.99": 15.68}
+
+    async with TestClient(app) as client:
+        response = await client.get(
+            "/stats",
+            data=struct.pack("<5d", *numbers),
+            headers={"content-type": stats.FLOAT64_MEDIA_TYPE},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+    result = response.json()["result"]
+    assert result.pop("quantiles") == pytest.approx(quantiles)
+    assert result == pytest.approx(expected)
+
+    response = FastAPITestClient(math_example.app).request(
+        "GET", "/stats", json=numbers
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+    result = response.json()["result"]
+    assert result.pop("quantiles") == pytest.approx(quantiles)
+    assert result == pytest.approx(expected)
@@ -76,7 +76,6 @@ def deleted_item(existing_item: dict[str, Any]) -> dict[str, Any]:
     return existing_item
 
 
-@pytest.mark.xfail()
 def test_post_cart() -> None:
     response = client.post("/cart")
 
@@ -85,7 +84,6 @@ def test_post_cart() -> None:
     assert "id" in response.json()
 
 
-@pytest.mark.xfail()
 @pytest.mark.parametrize(
     ("cart", "not_empty"),
     [
@@ -116,7 +114,6 @@ def test_get_cart(request, cart: int, not_empty: bool) -> None:
         assert response_json["price"] == 0.0
 
 
-@pytest.mark.xfail()
 @pytest.mark.parametrize(
     ("query", "status_code"),
     [
@@ -160,7 +157,6 @@ def test_get_cart_list(query: dict[str, Any], status_code: int):
             assert quantity <= query["max_quantity"]
 
 
-@pytest.mark.xfail()
 def test_post_item() -> None:
     item = {"name": "test item", "price": 9.99}
     response = client.post("/item", json=item)
@@ -172,7 +168,6 @@ def test_post_item() -> None:
     assert item["name"] == data["name"]
 
 
-@pytest.mark.xfail()
 def test_get_item(existing_item: dict[str, Any]) -> None:
     item_id = existing_item["id"]
 
@@ -182,7 +177,6 @@ def test_get_item(existing_item: dict[str, Any]) -> None:
     assert response.json() == existing_item
 
 
-@pytest.mark.xfail()
 @pytest.mark.parametrize(
     ("query", "status_code"),
     [
@@ -217,7 +211,6 @@ def test_get_item_list(query: dict[str, Any], status_code: int) -> None:
             assert all(item["deleted"] is False for item in data)
 
 
-@pytest.mark.xfail()
 @pytest.mark.parametrize(
     ("body", "status_code"),
     [
@@ -242,7 +235,6 @@ def test_put_item(
         assert response.json() == new_item
 
 
-@pytest.mark.xfail()
 @pytest.mark.parametrize(
     ("item", "body", "status_code"),
     [
@@ -280,7 +272,6 @@ def test_patch_item(request, item: str, body: dict[str, Any], status_code: int)
         assert patched_item == patch_response_body
 
 
-@pytest.mark.xfail()
 def test_delete_item(existing_item: dict[str, Any]) -> None:
     item_id = existing_item["id"]
 
@@ -292,3 +283,69 @@ def test_delete_item(existing_item: dict[str, Any]) -> None:
 
     response = client.delete(f"/item/{item_id}")
     assert response.status_code == HTTPStatus.OK
+
+
+def test_cart_price_follows_items() -> None:
+    first = client.post("/item", json={"name": "first", "price": 10.0}).json()
+    second = client.post("/item", json={"name": "second", "price": 2.5}).json()
+    cart_id = client.post("/cart").json()["id"]
+
+    for item in [first, first, second]:
+        client.post(f"/cart/{cart_id}/add/{item['id']}")
+
+    assert client.get(f"/cart/{cart_id}").json()["price"] == pytest.approx(22.5)
+
+    client.patch(f"/item/{first['id']}", json={"price": 20.0})
+    client.delete(f"/item/{second['id']}")
+
+    cart = client.get(f"/cart/{cart_id}").json()
+
+    assert cart["price"] == pytest.approx(40.0)
+    assert [
+        (item["id"], item["quantity"], item["available"]) for item in cart["items"]
+    ] == [
+        (first["id"], 2, True),
+        (second["id"], 1, False),
+    ]
+
+    carts = client.get(
+        "/cart", params={"min_price": 39.0, "max_price": 41.0, "limit": 1000}
+    ).json()
+
+    assert cart_id in [cart["id"] for cart in carts]
+    assert all(39.0 <= cart["price"] <= 41.0 for cart in carts)
+
+    client.delete(f"/item/{first['id']}")
+
+    assert client.get(f"/cart/{cart_id}").json()["price"] == 0.0
+    assert client.post(f"/cart/{cart_id}/add/{first['id']}").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+
+def test_cart_history() -> None:
+    item = client.post("/item", json={"name": "history", "price": 4.0}).json()
+    cart_id = client.post("/cart").json()["id"]
+
+    for _ in range(2):
+        client.post(f"/cart/{cart_id}/add/{item['id']}")
+
+    client.delete(f"/item/{item['id']}")
+
+    events = client.get(f"/cart/{cart_id}/events").json()
+
+    assert [(e["item_id"], e["quantity"]) for e in events] == [(item["id"], 1)] * 2
+
+    cart = client.get(f"/cart/{cart_id}", params={"at": events[0]["time"]}).json()
+
+    assert cart["price"] == pytest.approx(4.0)
+    assert cart["items"] == [
+        {"id": item["id"], "name": "history", "quantity": 1, "available": True}
+    ]
+    assert client.get(f"/cart/{cart_id}").json()["price"] == 0.0
+
+    response = client.get(f"/cart/{cart_id}", params={"at": "2000-01-01T00:00:00Z"})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    response = client.get("/cart/1000000000/events")
+    assert response.status_code == HTTPStatus.NOT_FOUND
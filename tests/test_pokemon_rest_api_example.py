@@ -1,12 +1,20 @@
+import asyncio
+import csv
+import io
+import json
 from dataclasses import asdict
 from http import HTTPStatus
+from uuid import uuid4
 
 import pytest
 from faker import Faker
 from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
 
 from lecture_2.rest_example import store
+from lecture_2.rest_example.api.pokemon import PokemonResponse, cache, encoding
 from lecture_2.rest_example.main import app
+from lecture_2.rest_example.store import queries
 from lecture_2.rest_example.store.models import PokemonEntity, PokemonInfo
 
 faker = Faker()
@@ -223,3 +231,503 @@ def test_patch_pokemon(request, pokemon: str, data: dict, status_code: int) -> N
         for key in ["name", "published"]:
             if key in data:
                 assert response_data[key] == data[key]
+
+
+def test_get_pokemon_list_after_id(existing_pokemons: list[PokemonEntity]) -> None:
+    ids = [p.id for p in existing_pokemons]
+
+    response = client.get("/pokemon", params={"after_id": ids[4], "limit": 5})
+
+    assert response.status_code == HTTPStatus.OK
+    assert [item["id"] for item in response.json()] == ids[5:10]
+
+    response = client.get(
+        "/pokemon",
+        params={"after_id": ids[4], "offset": 5, "limit": 5},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [item["id"] for item in response.json()] == ids[10:15]
+
+
+@pytest.fixture()
+def named_pokemons():
+    prefix = uuid4().hex
+    pokemons = [
+        store.add(PokemonInfo(f"{prefix}-{name}", published))
+        for name, published in [("c", True), ("a", False), ("b", True), ("d", False)]
+    ]
+
+    yield prefix, pokemons
+
+    for pokemon in pokemons:
+        store.delete(pokemon.id)
+
+
+@pytest.mark.parametrize(
+    ("params", "expected_names"),
+    [
+        ({}, ["c", "a", "b", "d"]),
+        ({"sort": "name"}, ["a", "b", "c", "d"]),
+        ({"sort": "-name"}, ["d", "c", "b", "a"]),
+        ({"sort": "-id"}, ["d", "b", "a", "c"]),
+        ({"published": True}, ["c", "b"]),
+        ({"published": False, "sort": "-name"}, ["d", "a"]),
+        ({"sort": "name", "offset": 1, "limit": 2}, ["b", "c"]),
+    ],
+)
+def test_get_pokemon_list_filtered(
+    named_pokemons: tuple[str, list[PokemonEntity]],
+    params: dict,
+    expected_names: list[str],
+) -> None:
+    prefix, _ = named_pokemons
+
+    response = client.get("/pokemon", params={"name_prefix": prefix, **params})
+
+    assert response.status_code == HTTPStatus.OK
+    assert [item["name"] for item in response.json()] == [
+        f"{prefix}-{name}" for name in expected_names
+    ]
+
+
+def test_get_pokemon_list_after_id_sorted_by_name(
+    named_pokemons: tuple[str, list[PokemonEntity]],
+) -> None:
+    prefix, pokemons = named_pokemons
+
+    response = client.get(
+        "/pokemon",
+        params={"name_contains": prefix, "sort": "name", "after_id": pokemons[2].id},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [item["id"] for item in response.json()] == [
+        pokemons[0].id,
+        pokemons[3].id,
+    ]
+
+    response = client.get("/pokemon", params={"sort": "name", "after_id": -1})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_store_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine = store.SharedMemoryEngine(f"pokemon-test-{uuid4().hex[:8]}", capacity=4)
+    monkeypatch.setattr(queries, "_engine", engine)
+    body = {"name": "pokemon", "published": True}
+
+    try:
+        # batch which does not fit is not added at all
+        response = client.post("/pokemon/batch", json=[body] * 5)
+        assert response.status_code == HTTPStatus.INSUFFICIENT_STORAGE
+        assert len(engine) == 0
+
+        # as well as batch which is rejected partway, though it takes ids
+        response = client.post(
+            "/pokemon/batch", json=[body, {"name": "x" * 100, "published": True}]
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert len(engine) == 0
+
+        for _ in range(2):
+            response = client.post("/pokemon", json=body)
+            assert response.status_code == HTTPStatus.CREATED
+
+        response = client.post("/pokemon", json=body)
+        assert response.status_code == HTTPStatus.INSUFFICIENT_STORAGE
+
+        response = client.put("/pokemon/5", params={"upsert": True}, json=body)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        response = client.patch("/pokemon/2", json={"name": "x" * 100})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        # other errors are bugs rather than bad requests
+        monkeypatch.setattr(store, "get_one", lambda id: int("not a number"))
+        with pytest.raises(ValueError):
+            client.get("/pokemon/2")
+    finally:
+        engine.close()
+        engine.unlink()
+
+
+@pytest.mark.parametrize("ndjson", [False, True])
+def test_post_pokemon_batch(ndjson: bool) -> None:
+    pokemons = [{"name": faker.name(), "published": faker.boolean()} for _ in range(5)]
+
+    if ndjson:
+        response = client.post(
+            "/pokemon/batch",
+            content="\n".join(json.dumps(pokemon) for pokemon in pokemons),
+            headers={"content-type": "application/x-ndjson"},
+        )
+    else:
+        response = client.post("/pokemon/batch", json=pokemons)
+
+    assert response.status_code == HTTPStatus.CREATED
+    ids = response.json()["ids"]
+
+    for id, pokemon in zip(ids, pokemons, strict=True):
+        assert client.get(f"/pokemon/{id}").json() == {"id": id, **pokemon}
+
+    response = client.request("DELETE", "/pokemon/batch", json=[*ids, -1])
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"modified": ids, "not_found": [-1]}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [{"name": "name"}],
+        [{"name": "name", "published": True}, {"published": "yes"}],
+        {"name": "name", "published": True},
+    ],
+)
+def test_post_pokemon_batch_invalid(body: list | dict) -> None:
+    response = client.post("/pokemon/batch", json=body)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize(
+    ("body", "line"),
+    [
+        (
+            (
+                '{"name": "a", "published": true}\n'
+                '{"name": "b", "published": true},{"name": "c", "published": true}'
+            ),
+            1,
+        ),
+        ('{"name": "a", "published": true}\n[]', 1),
+        ('{"name": "a", "published": true', 0),
+        ("[]", 0),
+    ],
+)
+def test_post_pokemon_batch_invalid_ndjson(body: str, line: int) -> None:
+    # every line must hold exactly one pokemon
+    response = client.post(
+        "/pokemon/batch",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()["detail"][0]["loc"][:2] == ["body", line]
+
+
+def test_delete_pokemon_batch_invalid_ndjson() -> None:
+    response = client.request(
+        "DELETE",
+        "/pokemon/batch",
+        content="1,2\n3",
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()["detail"][0]["loc"][:2] == ["body", 0]
+
+
+def test_patch_pokemon_batch(
+    existing_pokemons: list[PokemonEntity],
+    not_existing_pokemon: PokemonEntity,
+) -> None:
+    response = client.patch(
+        "/pokemon/batch",
+        json=[
+            {"id": existing_pokemons[0].id, "name": "new_name"},
+            {"id": existing_pokemons[1].id, "published": True},
+            {"id": not_existing_pokemon.id, "published": True},
+        ],
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        "modified": [existing_pokemons[0].id, existing_pokemons[1].id],
+        "not_found": [not_existing_pokemon.id],
+    }
+    assert store.get_one(existing_pokemons[0].id).info.name == "new_name"
+    assert store.get_one(existing_pokemons[1].id).info.published is True
+
+    response = client.patch(
+        "/pokemon/batch",
+        json=[{"id": existing_pokemons[0].id, "some": False}],
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_export_pokemons_ndjson(existing_pokemons: list[PokemonEntity]) -> None:
+    response = client.get("/pokemon/export", params={"chunk_size": 7})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    ids = [item["id"] for item in exported]
+
+    assert ids == sorted(set(ids))
+    for pokemon in existing_pokemons:
+        assert {"id": pokemon.id, **asdict(pokemon.info)} in exported
+
+
+def test_export_pokemons_csv(existing_pokemons: list[PokemonEntity]) -> None:
+    response = client.get("/pokemon/export", params={"format": "csv"})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    exported = {int(row["id"]): row for row in rows}
+
+    for pokemon in existing_pokemons:
+        assert exported[pokemon.id]["name"] == pokemon.info.name
+        assert exported[pokemon.id]["published"] == (
+            "true" if pokemon.info.published else "false"
+        )
+
+
+def test_get_pokemon_not_modified(existing_pokemon: PokemonEntity) -> None:
+    response = client.get(f"/pokemon/{existing_pokemon.id}")
+    etag = response.headers["etag"]
+
+    assert "last-modified" in response.headers
+
+    response = client.get(
+        f"/pokemon/{existing_pokemon.id}",
+        headers={"if-none-match": f'"0", W/{etag}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    store.patch(existing_pokemon.id, store.PatchPokemonInfo(name="changed"))
+    response = client.get(
+        f"/pokemon/{existing_pokemon.id}",
+        headers={"if-none-match": etag},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["etag"] != etag
+
+
+def test_get_pokemon_list_not_modified(existing_pokemons: list[PokemonEntity]) -> None:
+    first_id = existing_pokemons[0].id
+    params = {"after_id": first_id - 1, "limit": 5}
+
+    etag = client.get("/pokemon/", params=params).headers["etag"]
+    response = client.get("/pokemon/", params=params, headers={"if-none-match": etag})
+
+    assert etag.startswith("W/")
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    store.patch(first_id, store.PatchPokemonInfo(published=True))
+    response = client.get("/pokemon/", params=params, headers={"if-none-match": etag})
+
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize("method", ["put", "patch"])
+def test_modify_pokemon_if_match(method: str, existing_pokemon: PokemonEntity) -> None:
+    url = f"/pokemon/{existing_pokemon.id}"
+    body = {"name": "changed", "published": True}
+    etag = client.get(url).headers["etag"]
+
+    response = client.request(method, url, json=body, headers={"if-match": etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["etag"] != etag
+
+    # the second change with the same validator is a lost update
+    response = client.request(method, url, json=body, headers={"if-match": etag})
+
+    assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+
+    response = client.request(method, url, json=body, headers={"if-match": "*"})
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_store_rejects_stale_version(existing_pokemon: PokemonEntity) -> None:
+    current = store.get_one(existing_pokemon.id)
+    updated = store.update(current.id, PokemonInfo("changed", True), current.version)
+
+    assert updated.version > current.version
+
+    with pytest.raises(store.VersionMismatchError):
+        store.patch(current.id, store.PatchPokemonInfo(), current.version)
+
+    with pytest.raises(store.VersionMismatchError):
+        store.upsert(10**9, PokemonInfo("missing", True), current.version)
+
+
+@pytest.fixture(params=[False, True], ids=["pydantic", "fast"])
+def fast_path(request, monkeypatch: pytest.MonkeyPatch) -> bool:
+    monkeypatch.setattr(encoding, "_fast_path", request.param)
+    return request.param
+
+
+def test_fast_path_responses(
+    fast_path: bool,
+    existing_pokemons: list[PokemonEntity],
+) -> None:
+    pokemon = existing_pokemons[0]
+    body = {"name": 'Mr. "Mime" 🎭\n', "published": True}
+
+    response = client.get("/pokemon/", params={"after_id": pokemon.id - 1})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"] == "application/json"
+    assert [p["id"] for p in response.json()] == [p.id for p in existing_pokemons[:10]]
+
+    response = client.post("/pokemon/", json=body)
+    created = response.json()
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.headers["location"] == f"/pokemon/{created['id']}"
+    assert "etag" in response.headers
+    assert created == {"id": created["id"], **body}
+
+    response = client.get(f"/pokemon/{created['id']}")
+
+    assert response.json() == created
+    assert "last-modified" in response.headers
+
+    response = client.put(f"/pokemon/{pokemon.id}", json=body)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"id": pokemon.id, **body}
+
+    store.delete(created["id"])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fast_encoding_matches_pydantic(seed: int) -> None:
+    fake = Faker()
+    fake.seed_instance(seed)
+    alphabet = '"\\/\b\f\n\r\t\x00\x1f\x7f\u2028é✨🎭 aZ'
+
+    entities = [
+        PokemonEntity(
+            fake.pyint(max_value=10**12),
+            PokemonInfo(
+                fake.name() + "".join(fake.random_elements(alphabet, length=8)),
+                fake.boolean(),
+            ),
+        )
+        for _ in range(20)
+    ]
+    models = [PokemonResponse.from_entity(entity) for entity in entities]
+
+    assert encoding.encode_entity(entities[0]) == models[0].model_dump_json().encode()
+    assert encoding.encode_entities(entities) == TypeAdapter(
+        list[PokemonResponse]
+    ).dump_json(models)
+    assert encoding.encode_entities([]) == b"[]"
+
+
+def test_cached_pokemon_is_invalidated(existing_pokemon: PokemonEntity) -> None:
+    stats = cache.current().stats
+    url = f"/pokemon/{existing_pokemon.id}"
+
+    first = client.get(url)
+    hits = stats.hits
+    second = client.get(url)
+
+    assert stats.hits == hits + 1
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+
+    store.patch(existing_pokemon.id, store.PatchPokemonInfo(name="changed"))
+
+    assert client.get(url).json()["name"] == "changed"
+    assert client.get("/pokemon/cache/stats").json()["invalidations"] > 0
+
+    store.delete(existing_pokemon.id)
+
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_cached_page_is_invalidated(existing_pokemons: list[PokemonEntity]) -> None:
+    params = {"after_id": existing_pokemons[-1].id}
+
+    assert client.get("/pokemon/", params=params).json() == []
+
+    entity = store.add(PokemonInfo("newcomer", True))
+
+    assert client.get("/pokemon/", params=params).json() == [
+        {"id": entity.id, "name": "newcomer", "published": True}
+    ]
+
+    store.delete(entity.id)
+
+
+def cached(body: bytes) -> cache.CachedResponse:
+    return cache.CachedResponse(body, {"etag": '"1"'})
+
+
+def test_response_cache_evicts_least_recently_used() -> None:
+    size = cached(b"x").size
+    responses = cache.ResponseCache(max_bytes=3 * size)
+
+    for key in range(3):
+        responses.put(key, key, cached(b"x"))
+
+    responses.get(0)
+    responses.put(3, 3, cached(b"x"))
+
+    assert responses.get(1) is None
+    assert responses.get(0) is not None
+    assert responses.stats.evictions == 1
+    assert responses.bytes == 3 * size
+
+    responses.invalidate(0)
+
+    assert responses.get(0) is None
+    assert responses.bytes == 2 * size
+
+
+def test_response_cache_expires_entries() -> None:
+    responses = cache.ResponseCache(ttl=0)
+    responses.put("key", "tag", cached(b"x"))
+
+    assert responses.get("key") is None
+    assert responses.stats.expirations == 1
+    assert len(responses) == 0
+
+
+@pytest.mark.asyncio
+async def test_response_cache_loads_once() -> None:
+    responses = cache.ResponseCache()
+    loads = 0
+
+    async def load() -> cache.CachedResponse:
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return cached(b"x")
+
+    results = await asyncio.gather(
+        *(responses.get_or_load("key", "tag", load) for _ in range(10))
+    )
+
+    assert loads == 1
+    assert all(result is results[0] for result in results)
+    assert responses.stats.misses == 1
+    assert responses.stats.coalesced == 9
+
+
+@pytest.mark.asyncio
+async def test_response_cache_skips_stale_load() -> None:
+    responses = cache.ResponseCache()
+
+    async def load() -> cache.CachedResponse:
+        # pokemon is changed while its response is built
+        responses.invalidate("tag")
+        return cached(b"x")
+
+    assert await responses.get_or_load("key", "tag", load) is not None
+    assert responses.get("key") is None
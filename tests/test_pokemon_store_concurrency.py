@@ -0,0 +1,129 @@
+import multiprocessing
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+import pytest
+
+from lecture_2.rest_example import store
+from lecture_2.rest_example.store.engines import SharedMemoryEngine
+from lecture_2.rest_example.store.models import (
+    PatchPokemonInfo,
+    PokemonEntity,
+    PokemonInfo,
+)
+
+THREADS = 8
+PROCESSES = 4
+CHANGES = 250
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    # threads are switched much more often than by default, so that races
+    # show up within a few hundreds of changes
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    yield
+
+    sys.setswitchinterval(interval)
+
+
+def increment(id: int) -> int:
+    # optimistic read-modify-write: counter is kept in the name of pokemon
+    attempts = 0
+
+    while True:
+        attempts += 1
+        entity = store.get_one(id)
+        counter = int(entity.info.name)
+
+        try:
+            store.update(id, PokemonInfo(str(counter + 1), True), entity.version)
+        except store.VersionMismatchError:
+            continue
+
+        return attempts
+
+
+def test_concurrent_updates_are_not_lost() -> None:
+    entity = store.add(PokemonInfo("0", True))
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(increment, [entity.id] * THREADS * CHANGES))
+
+    assert store.get_one(entity.id).info.name == str(THREADS * CHANGES)
+
+    store.delete(entity.id)
+
+
+def increment_in_worker(name: str, id: int, count: int) -> None:
+    # worker process of its own, as uvicorn runs them
+    store.use(SharedMemoryEngine(name))
+
+    for _ in range(count):
+        increment(id)
+
+    store.close()
+
+
+def test_concurrent_updates_of_processes_are_not_lost() -> None:
+    engine = SharedMemoryEngine(f"pokemon-test-{uuid4().hex[:8]}", capacity=100)
+    engine.put(PokemonEntity(0, PokemonInfo("0", True), version=1))
+
+    processes = [
+        multiprocessing.Process(
+            target=increment_in_worker, args=(engine.name, 0, CHANGES)
+        )
+        for _ in range(PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    try:
+        assert all(process.exitcode == 0 for process in processes)
+        assert engine.get(0).info.name == str(PROCESSES * CHANGES)
+    finally:
+        engine.close()
+        engine.unlink()
+
+
+def test_concurrent_patches_keep_both_fields() -> None:
+    entity = store.add(PokemonInfo("initial", False))
+
+    def rename(i: int) -> None:
+        store.patch(entity.id, PatchPokemonInfo(name=f"name-{i}"))
+
+    def publish(i: int) -> None:
+        store.patch(entity.id, PatchPokemonInfo(published=True))
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        for i in range(CHANGES):
+            executor.submit(rename, i)
+            executor.submit(publish, i)
+
+    patched = store.get_one(entity.id)
+
+    assert patched.info.published
+    assert patched.info.name.startswith("name-")
+
+    store.delete(entity.id)
+
+
+def test_concurrent_adds_get_unique_ids() -> None:
+    def add(i: int) -> list[int]:
+        return [
+            store.add(PokemonInfo(f"pokemon-{i}-{j}", j % 2 == 0)).id
+            for j in range(CHANGES)
+        ]
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        ids = [id for batch in executor.map(add, range(THREADS)) for id in batch]
+
+    assert len(set(ids)) == THREADS * CHANGES
+    assert all(store.get_one(id) is not None for id in ids)
+
+    assert all(store.delete_many(ids))
@@ -0,0 +1,241 @@
+import multiprocessing
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+
+from lecture_2.rest_example.store.engines import (
+    ColumnarEngine,
+    InMemoryEngine,
+    LogEngine,
+    SharedMemoryEngine,
+    columnar,
+)
+from lecture_2.rest_example.store.engines.base import scan_page
+from lecture_2.rest_example.store.engines.log import LOG_FILE
+from lecture_2.rest_example.store.models import (
+    PokemonEntity,
+    PokemonFilter,
+    PokemonInfo,
+    PokemonSort,
+)
+
+type Engine = InMemoryEngine | ColumnarEngine | SharedMemoryEngine
+
+
+def fill(engine: Engine, size: int) -> dict[int, PokemonEntity]:
+    expected = {}
+
+    for i in range(size):
+        id = engine.next_id()
+        info = PokemonInfo(f"pokemon-{i} ✨", i % 3 == 0)
+        expected[id] = PokemonEntity(id, info, version=1_000 + i)
+        engine.put(expected[id])
+
+    for id in list(expected)[::4]:
+        engine.remove(id)
+        del expected[id]
+
+    return expected
+
+
+def dump(engine: Engine) -> dict[int, PokemonEntity]:
+    return {entity.id: entity for entity in engine.page(0, len(engine))}
+
+
+@pytest.mark.parametrize("engine", [InMemoryEngine(), ColumnarEngine()])
+def test_engine_page(engine: Engine) -> None:
+    expected = fill(engine, 50)
+
+    assert dump(engine) == expected
+    assert len(engine) == len(expected)
+    assert [e.id for e in engine.page(3, 2, after_id=10)] == [15, 17]
+    assert list(engine.page(0, 10, after_id=49)) == []
+    assert engine.get(0) is None
+
+    renamed = PokemonEntity(1, PokemonInfo("renamed", False), version=2_000)
+    upserted = PokemonEntity(60, PokemonInfo("upserted", True), version=2_001)
+    engine.put(renamed)
+    engine.put(upserted)
+
+    assert engine.get(1) == renamed
+    assert engine.get(60) == upserted
+    assert engine.next_id() == 61
+
+
+def test_columnar_engine_compacts_names(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(columnar, "_MIN_GARBAGE_TO_COMPACT", 0)
+    engine = ColumnarEngine()
+    expected = fill(engine, 50)
+
+    for id, entity in expected.items():
+        info = PokemonInfo(entity.info.name.upper(), entity.info.published)
+        engine.put(PokemonEntity(id, info, entity.version + 1))
+        expected[id] = engine.get(id)
+
+    assert dump(engine) == expected
+    assert len(engine._arena) < 2 * sum(
+        len(entity.info.name.encode()) for entity in expected.values()
+    )
+
+    with pytest.raises(ValueError):
+        engine.put(PokemonEntity(-1, PokemonInfo("negative", False)))
+
+
+@pytest.mark.parametrize("snapshot_every", [1_000_000, 7])
+def test_log_engine_recovers_state(tmp_path: Path, snapshot_every: int) -> None:
+    engine = LogEngine(tmp_path, snapshot_every=snapshot_every)
+    expected = fill(engine, 50)
+    engine.close()
+
+    engine = LogEngine(tmp_path)
+
+    assert dump(engine) == expected
+    assert engine.next_id() == 50
+
+    engine.close()
+
+
+def test_log_engine_drops_torn_tail(tmp_path: Path) -> None:
+    engine = LogEngine(tmp_path)
+    expected = fill(engine, 10)
+    engine.close()
+
+    with open(tmp_path / LOG_FILE, "ab") as f:
+        f.write(b"\x01\x00\x00")
+
+    engine = LogEngine(tmp_path)
+
+    assert dump(engine) == expected
+
+    new = PokemonEntity(100, PokemonInfo("new", True), version=7)
+    engine.put(new)
+    engine.close()
+
+    engine = LogEngine(tmp_path)
+
+    assert engine.get(100) == new
+
+    engine.close()
+
+
+def test_log_engine_is_locked(tmp_path: Path) -> None:
+    engine = LogEngine(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        LogEngine(tmp_path)
+
+    engine.close()
+
+
+@pytest.fixture()
+def shm_name():
+    name = f"pokemon-test-{uuid4().hex[:8]}"
+
+    yield name
+
+    engine = SharedMemoryEngine(name)
+    engine.close()
+    engine.unlink()
+
+
+@pytest.mark.parametrize("kind", ["memory", "columnar", "log", "shared"])
+def test_engine_put_checks_version(kind: str, tmp_path: Path, shm_name: str) -> None:
+    engine = {
+        "memory": InMemoryEngine,
+        "columnar": ColumnarEngine,
+        "log": lambda: LogEngine(tmp_path),
+        "shared": lambda: SharedMemoryEngine(shm_name, capacity=100),
+    }[kind]()
+    first = PokemonEntity(1, PokemonInfo("first", True), version=10)
+    second = PokemonEntity(1, PokemonInfo("second", False), version=11)
+
+    assert not engine.put(first, expected_version=5)
+    assert engine.get(1) is None
+    assert engine.put(first, expected_version=None)
+    assert not engine.put(second, expected_version=None)
+    assert not engine.put(second, expected_version=9)
+    assert engine.get(1) == first
+    assert engine.put(second, expected_version=10)
+    assert engine.get(1) == second
+
+    engine.remove(1)
+    assert engine.put(first, expected_version=None)
+    assert engine.put(second)
+
+    assert engine.get(1) == second
+
+    engine.close()
+
+
+def add_pokemons(name: str, count: int) -> None:
+    engine = SharedMemoryEngine(name)
+
+    for i in range(count):
+        engine.put(PokemonEntity(engine.next_id(), PokemonInfo(f"pokemon-{i}", True)))
+
+    engine.close()
+
+
+def test_shared_memory_engine_is_shared_between_processes(shm_name: str) -> None:
+    engine = SharedMemoryEngine(shm_name, capacity=1_000)
+
+    processes = [
+        multiprocessing.Process(target=add_pokemons, args=(shm_name, 100))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert len(engine) == 400
+    assert [e.id for e in engine.page(0, 1_000)] == list(range(400))
+    assert engine.next_id() == 400
+
+    engine.close()
+
+
+def test_shared_memory_engine_page(shm_name: str) -> None:
+    engine = SharedMemoryEngine(shm_name, capacity=100)
+    expected = fill(engine, 50)
+
+    assert dump(engine) == expected
+    assert [e.id for e in engine.page(3, 2, after_id=10)] == [15, 17]
+    assert engine.get(0) is None
+    assert engine.get(1_000) is None
+
+    with pytest.raises(ValueError):
+        engine.put(PokemonEntity(100, PokemonInfo("out of range", False)))
+
+    with pytest.raises(ValueError):
+        engine.put(PokemonEntity(1, PokemonInfo("x" * 100, False)))
+
+    engine.close()
+
+
+@pytest.mark.parametrize("sort", list(PokemonSort))
+@pytest.mark.parametrize(
+    "filters",
+    [
+        PokemonFilter(),
+        PokemonFilter(published=True),
+        PokemonFilter(name_prefix="pokemon-1"),
+        PokemonFilter(published=False, name_prefix="pokemon-2"),
+        PokemonFilter(name_contains="3 "),
+    ],
+)
+@pytest.mark.parametrize("after_id", [None, 13])
+def test_in_memory_engine_indexes(
+    sort: PokemonSort,
+    filters: PokemonFilter,
+    after_id: int | None,
+) -> None:
+    engine = InMemoryEngine()
+    fill(engine, 50)
+    engine.put(PokemonEntity(21, PokemonInfo("pokemon-13 ✨", True)))
+
+    # reference result is computed by checking every record
+    expected = scan_page(engine, dump(engine).values(), 2, 5, after_id, filters, sort)
+
+    assert engine.page(2, 5, after_id, filters, sort) == expected
@@ -0,0 +1,198 @@
+import random
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from lecture_2.hw.shop_api import store
+from lecture_2.hw.shop_api.store import queries
+from lecture_2.hw.shop_api.store.history import CartHistory
+
+
+def all_items() -> list[store.ItemEntity]:
+    return [store.get_item(id) for id in range(len(queries._items))]
+
+
+def all_carts() -> list[store.CartEntity]:
+    return [store.get_cart(id) for id in range(len(queries._carts))]
+
+
+def expected_items(filters: store.ItemFilter) -> list[store.ItemEntity]:
+    items = [
+        e
+        for e in all_items()
+        if (filters.show_deleted or not e.info.deleted)
+        and (filters.min_price is None or e.info.price >= filters.min_price)
+        and (filters.max_price is None or e.info.price <= filters.max_price)
+    ]
+
+    if filters.min_price is not None or filters.max_price is not None:
+        items.sort(key=lambda e: (e.info.price, e.id))
+
+    return items
+
+
+def expected_carts(filters: store.CartFilter) -> list[store.CartEntity]:
+    carts = [e for e in all_carts() if filters.matches(e.info.price, e.info.quantity)]
+
+    if filters.min_price is not None or filters.max_price is not None:
+        carts.sort(key=lambda e: (e.info.price, e.id))
+    elif filters.min_quantity is not None or filters.max_quantity is not None:
+        carts.sort(key=lambda e: (e.info.quantity, e.id))
+
+    return carts
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_listings_match_full_scan(seed: int) -> None:
+    rng = random.Random(seed)
+
+    items = [
+        store.add_item(store.ItemInfo(f"item-{i}", rng.randint(1, 20) / 2))
+        for i in range(60)
+    ]
+    carts = [store.add_cart() for _ in range(40)]
+
+    for _ in range(150):
+        store.add_to_cart(rng.choice(carts).id, rng.choice(items).id)
+
+    for item in rng.sample(items, 15):
+        store.patch_item(item.id, store.PatchItemInfo(price=rng.randint(1, 20) / 2))
+
+    for item in rng.sample(items, 10):
+        store.delete_item(item.id)
+
+    def bound(low: float, high: float) -> float | None:
+        return rng.choice([None, rng.uniform(low, high)])
+
+    for _ in range(50):
+        offset, limit = rng.randint(0, 20), rng.randint(1, 15)
+
+        item_filter = store.ItemFilter(bound(0, 10), bound(0, 10), rng.random() < 0.5)
+        assert (
+            list(store.get_items(offset, limit, item_filter))
+            == expected_items(item_filter)[offset : offset + limit]
+        )
+
+        cart_filter = store.CartFilter(
+            bound(0, 60),
+            bound(0, 60),
+            rng.choice([None, rng.randint(0, 8)]),
+            rng.choice([None, rng.randint(0, 8)]),
+        )
+        assert (
+            list(store.get_carts(offset, limit, cart_filter))
+            == expected_carts(cart_filter)[offset : offset + limit]
+        )
+
+
+def test_deferred_propagation() -> None:
+    item = store.add_item(store.ItemInfo("deferred", 10.0))
+    cart = store.add_cart()
+    store.add_to_cart(cart.id, item.id)
+
+    store.defer_propagation(True)
+    try:
+        store.patch_item(item.id, store.PatchItemInfo(price=20.0))
+        store.patch_item(item.id, store.PatchItemInfo(price=30.0))
+
+        assert store.get_cart(cart.id).info.price == 10.0
+
+        # pending change is applied before one more item is added
+        store.add_to_cart(cart.id, item.id)
+
+        assert store.get_cart(cart.id).info.price == 60.0
+
+        store.delete_item(item.id)
+
+        assert store.flush_pending(limit=0) == 1
+        assert store.flush_pending() == 0
+        assert store.get_cart(cart.id).info.price == 0.0
+    finally:
+        store.defer_propagation(False)
+
+
+def test_cart_price_is_exact() -> None:
+    cheap = store.add_item(store.ItemInfo("cheap", 0.1))
+    costly = store.add_item(store.ItemInfo("costly", 1e16))
+    cart = store.add_cart()
+    store.add_to_cart(cart.id, cheap.id)
+    store.add_to_cart(cart.id, costly.id)
+
+    store.patch_item(cheap.id, store.PatchItemInfo(price=0.2))
+    store.patch_item(cheap.id, store.PatchItemInfo(price=0.3))
+    store.delete_item(costly.id)
+
+    assert store.get_cart(cart.id).info.price == 0.3
+    assert cart.id in [
+        e.id for e in store.get_carts(0, 100, store.CartFilter(0.29, 0.31))
+    ]
+
+    # total is price of item rounded once, not sum of rounded changes
+    store.add_to_cart(cart.id, cheap.id)
+    store.patch_item(cheap.id, store.PatchItemInfo(price=0.1))
+
+    assert store.get_cart(cart.id).info.price == 0.2
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_cart_history_matches_replay(seed: int) -> None:
+    rng = random.Random(seed)
+    history = CartHistory()
+    # cart id -> (time, content after change) for every change
+    expected: dict[int, list[tuple[int, dict[int, int]]]] = {}
+
+    for time in range(0, 3_000, 3):
+        cart = rng.randrange(8)
+
+        if cart not in expected:
+            history.create(cart, time)
+            expected[cart] = [(time, {})]
+            continue
+
+        quantities = dict(expected[cart][-1][1])
+        item = rng.randrange(20)
+        delta = -quantities[item] if item in quantities and rng.random() < 0.2 else 1
+
+        quantities[item] = quantities.get(item, 0) + delta
+        if not quantities[item]:
+            del quantities[item]
+
+        history.append(cart, item, delta, time)
+        expected[cart].append((time, quantities))
+
+    for cart, changes in expected.items():
+        assert history.quantities_at(cart, changes[0][0] - 1) is None
+        assert history.quantities(cart) == changes[-1][1]
+
+        for time, quantities in changes:
+            assert history.quantities_at(cart, time) == quantities
+            assert history.quantities_at(cart, time + 1) == quantities
+
+    assert history.quantities_at(100, 0) is None
+    assert list(history.events(100)) == []
+
+
+def test_cart_at_point_in_time() -> None:
+    item = store.add_item(store.ItemInfo("history", 10.0))
+    cart = store.add_cart()
+
+    for _ in range(3):
+        store.add_to_cart(cart.id, item.id)
+
+    store.patch_item(item.id, store.PatchItemInfo(name="renamed", price=20.0))
+    store.delete_item(item.id)
+
+    events = store.get_cart_events(cart.id, limit=100)
+
+    assert [(e.item_id, e.quantity) for e in events] == [(item.id, 1)] * 3
+    assert store.get_cart_events(cart.id, offset=1, limit=1) == events[1:2]
+
+    cart_at = store.get_cart_at(cart.id, events[1].time)
+
+    assert cart_at.info.price == 20.0
+    assert cart_at.info.quantity == 2
+    assert cart_at.info.items == [store.CartItemInfo(item.id, "history", 2, True)]
+
+    assert store.get_cart_at(cart.id, events[0].time - timedelta(seconds=1)) is None
+    assert store.get_cart_at(cart.id, datetime.now(UTC)) == store.get_cart(cart.id)
+    assert store.get_cart_events(len(queries._carts)) is None
@@ -0,0 +1,609 @@
+import asyncio
+import json
+import struct
+from http import HTTPStatus
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from lecture_2.ws_example import server
+from lecture_2.ws_example.broadcaster import (
+    SLOW_CONSUMER_CLOSE_CODE,
+    Broadcaster,
+    Overflow,
+)
+from lecture_2.ws_example.bus import Bus
+from lecture_2.ws_example.history import History
+from lecture_2.ws_example.topics import InvalidTopicError, TopicIndex
+
+
+class FakeWebSocket:
+    def __init__(self, stalled: bool = False) -> None:
+        self.received: list[str | bytes] = []
+        self.closed_with: int | None = None
+        # stalled socket takes no messages until it is released
+        self.released = asyncio.Event()
+        if not stalled:
+            self.released.set()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send(self, event: dict[str, Any]) -> None:
+        await self.released.wait()
+        self.received.append(event["text"] if "text" in event else event["bytes"])
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+async def settle() -> None:
+    # lets writer tasks drain their queues
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+async def eventually(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_slow_subscriber():
+    broadcaster = Broadcaster(queue_size=4)
+    fast, slow = FakeWebSocket(), FakeWebSocket(stalled=True)
+    await broadcaster.subscribe(fast)
+    await broadcaster.subscribe(slow)
+
+    for i in range(3):
+        broadcaster.publish(str(i))
+    await settle()
+
+    assert fast.received == ["0", "1", "2"]
+    assert slow.received == []
+
+    slow.released.set()
+    await settle()
+
+    assert slow.received == ["0", "1", "2"]
+    assert broadcaster.stats.dropped == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("overflow", "expected_received"),
+    [
+        # the first message is taken by writer before socket stalls
+        (Overflow.DROP_OLDEST, ["0", "6", "7", "8", "9"]),
+        (Overflow.DROP_NEWEST, ["0", "1", "2", "3", "4"]),
+    ],
+)
+async def test_overflow_drops(overflow: Overflow, expected_received: list[str]):
+    broadcaster = Broadcaster(queue_size=4, overflow=overflow)
+    slow = FakeWebSocket(stalled=True)
+    await broadcaster.subscribe(slow)
+
+    broadcaster.publish("0")
+    await settle()
+    for i in range(1, 10):
+        broadcaster.publish(str(i))
+
+    slow.released.set()
+    await settle()
+
+    assert slow.received == expected_received
+    assert broadcaster.stats.dropped == 5
+    assert broadcaster.stats.disconnected == 0
+
+
+@pytest.mark.asyncio
+async def test_overflow_disconnects_slow_subscriber():
+    broadcaster = Broadcaster(queue_size=2, overflow=Overflow.DISCONNECT)
+    fast, slow = FakeWebSocket(), FakeWebSocket(stalled=True)
+    await broadcaster.subscribe(fast)
+    await broadcaster.subscribe(slow)
+
+    for i in range(5):
+        broadcaster.publish(str(i))
+        await settle()
+    await broadcaster.wait_closed()
+    await settle()
+
+    assert fast.received == ["0", "1", "2", "3", "4"]
+    assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+    assert list(broadcaster.subscribers) == [fast]
+    assert broadcaster.stats.disconnected == 1
+
+    # unsubscribing once socket is disconnected does nothing
+    await broadcaster.unsubscribe(slow)
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_stops_delivery():
+    broadcaster = Broadcaster()
+    ws = FakeWebSocket()
+    await broadcaster.subscribe(ws)
+
+    broadcaster.publish("before")
+    await settle()
+    await broadcaster.unsubscribe(ws)
+    broadcaster.publish("after")
+    await settle()
+
+    assert ws.received == ["before"]
+    assert not broadcaster.subscribers
+
+
+def test_publish_reaches_subscribers():
+    with (
+        TestClient(server.app) as client,
+        client.websocket_connect("/subscribe") as first,
+        client.websocket_connect("/subscribe") as second,
+    ):
+        assert first.receive_text().endswith("subscribed")
+        assert first.receive_text().endswith("subscribed")
+        assert second.receive_text().endswith("subscribed")
+
+        client.post("/publish", content="hello")
+        second.send_text("hi")
+
+        assert first.receive_text() == "hello"
+        assert first.receive_text() == "hi"
+        assert second.receive_text() == "hello"
+        assert second.receive_text() == "hi"
+
+
+@pytest.mark.parametrize(
+    ("pattern", "topic", "matches"),
+    [
+        ("news", "news", True),
+        ("news", "news.sport", False),
+        ("news.*", "news.sport", True),
+        ("news.*", "news", False),
+        ("news.*", "news.sport.football", False),
+        ("*.sport", "news.sport", True),
+        ("news.#", "news", True),
+        ("news.#", "news.sport.football", True),
+        ("news.#", "weather", False),
+        ("#", "news.sport", True),
+        ("#.football", "news.sport.football", True),
+        ("news.#.football", "news.football", True),
+        ("news.#.football", "news.sport.football", True),
+        ("news.#.football", "news.sport.tennis", False),
+        ("*.#", "news", True),
+        ("*.*.#", "news", False),
+    ],
+)
+def test_topic_index_match(pattern: str, topic: str, matches: bool):
+    index = TopicIndex[str]()
+    index.add(pattern, "subscriber")
+
+    assert index.match(topic) == ({"subscriber"} if matches else set())
+
+
+def test_topic_index_remove():
+    index = TopicIndex[str]()
+    patterns = ["news", "news.*", "news.#", "news.*.football"]
+    for pattern in patterns:
+        index.add(pattern, "first")
+    index.add("news.#", "second")
+
+    assert index.match("news.sport.football") == {"first", "second"}
+
+    for pattern in patterns:
+        index.remove(pattern, "first")
+
+    assert index.match("news.sport.football") == {"second"}
+    assert index.match("news") == {"second"}
+
+    index.remove("news.#", "second")
+    # unknown patterns are ignored
+    index.remove("weather.*", "second")
+
+    assert index == TopicIndex[str]()
+
+
+def test_topic_index_many_wildcards():
+    index = TopicIndex[str]()
+    index.add(".".join(["#", "*"] * 8), "any")
+    index.add(".".join(["#", "word"] * 8), "words")
+    topic = ".".join(["word"] * 16)
+
+    started = perf_counter()
+    assert index.match(topic) == {"any", "words"}
+    assert index.match(topic.rpartition(".")[0] + ".other") == {"any"}
+    assert index.match("word.word.word.word.word.word.word") == set()
+    assert perf_counter() - started < 0.1
+
+    with pytest.raises(InvalidTopicError):
+        index.add(".".join(["#"] * 12), "many")
+
+
+@pytest.mark.parametrize(
+    "pattern", ["", "news.", "news..sport", "news*", "a#.b", "#.#", "news.#.#.sport"]
+)
+def test_topic_index_invalid_pattern(pattern: str):
+    with pytest.raises(InvalidTopicError):
+        TopicIndex[str]().add(pattern, "subscriber")
+
+
+@pytest.mark.parametrize("topic", ["", "news.*", "#", "." * 20])
+def test_topic_index_invalid_topic(topic: str):
+    with pytest.raises(InvalidTopicError):
+        TopicIndex[str]().match(topic)
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_matching_subscribers():
+    broadcaster = Broadcaster()
+    news, sport, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await broadcaster.subscribe(news, ["news.#", "news.sport"])
+    await broadcaster.subscribe(sport, ["*.sport"])
+    await broadcaster.subscribe(other, ["weather"])
+
+    broadcaster.publish("1", "news.sport")
+    broadcaster.publish("2", "news")
+    broadcaster.publish("3", "tv.sport")
+    broadcaster.remove_topic(news, "news.#")
+    broadcaster.publish("4", "news.sport")
+    broadcaster.publish("5", "news.politics")
+    broadcaster.add_topic(other, "news.*")
+    broadcaster.publish("6", "news.politics")
+    await settle()
+
+    assert news.received == ["1", "2", "4"]
+    assert sport.received == ["1", "3", "4"]
+    assert other.received == ["6"]
+    assert broadcaster.topics(news) == {"news.sport"}
+
+    await broadcaster.unsubscribe(news)
+    broadcaster.publish("7", "news.sport")
+    await settle()
+
+    assert news.received == ["1", "2", "4"]
+    assert sport.received == ["1", "3", "4", "7"]
+
+
+def test_topics_over_socket():
+    with (
+        TestClient(server.app) as client,
+        client.websocket_connect("/subscribe?topic=news.*") as ws,
+    ):
+        client.post("/publish", content="weather", params={"topic": "weather"})
+        client.post("/publish", content="sport", params={"topic": "news.sport"})
+
+        assert ws.receive_text() == "sport"
+
+        ws.send_text(json.dumps({"action": "subscribe", "topic": "weather"}))
+        assert ws.receive_json() == {"action": "subscribed", "topic": "weather"}
+
+        ws.send_text(json.dumps({"action": "unsubscribe", "topic": "news.*"}))
+        assert ws.receive_json() == {"action": "unsubscribed", "topic": "news.*"}
+
+        ws.send_text(json.dumps({"action": "subscribe", "topic": "news*"}))
+        assert "error" in ws.receive_json()
+
+        ws.send_text(json.dumps({"action": "follow"}))
+        assert "error" in ws.receive_json()
+
+        client.post("/publish", content="politics", params={"topic": "news.politics"})
+        client.post("/publish", content="rain", params={"topic": "weather"})
+
+        assert ws.receive_text() == "rain"
+
+        response = client.post("/publish", content="x", params={"topic": "news.*"})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_subscribe_invalid_topic():
+    client = TestClient(server.app)
+
+    with (
+        pytest.raises(WebSocketDisconnect) as e,
+        client.websocket_connect("/subscribe?topic=news*"),
+    ):
+        pass
+
+    assert e.value.code == 1008
+
+
+@pytest.mark.asyncio
+async def test_publish_shares_event():
+    broadcaster = Broadcaster()
+    sockets = [FakeWebSocket() for _ in range(3)]
+    events = []
+
+    async def send(event: dict[str, Any]) -> None:
+        events.append(event)
+
+    for ws in sockets:
+        await broadcaster.subscribe(ws)
+        ws.send = send
+
+    payload = b"\x00" * 1024
+    broadcaster.publish(payload)
+    await settle()
+
+    assert len(events) == 3
+    assert all(event is events[0] for event in events)
+    assert events[0]["bytes"] is payload
+    assert len(broadcaster.subscribers) == 3
+
+
+def test_binary_messages():
+    with (
+        TestClient(server.app) as client,
+        client.websocket_connect("/subscribe?topic=data") as ws,
+    ):
+        client.post(
+            "/publish",
+            content=b"\xff\x00",
+            params={"topic": "data"},
+            headers={"content-type": "application/octet-stream"},
+        )
+        client.post("/publish", content="text", params={"topic": "data"})
+
+        assert ws.receive_bytes() == b"\xff\x00"
+        assert ws.receive_text() == "text"
+
+        response = client.post("/publish", content=b"\xff", params={"topic": "data"})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    with (
+        TestClient(server.app) as client,
+        client.websocket_connect("/subscribe") as first,
+        client.websocket_connect("/subscribe") as second,
+    ):
+        assert first.receive_text().endswith("subscribed")
+        assert first.receive_text().endswith("subscribed")
+        assert second.receive_text().endswith("subscribed")
+
+        second.send_bytes(b"\x01\x02")
+
+        assert first.receive_bytes() == b"\x01\x02"
+        assert second.receive_bytes() == b"\x01\x02"
+
+
+def test_history_evicts_oldest():
+    history = History(max_bytes=1200)
+
+    for i in range(20):
+        assert history.append("news", "x" * 100).seq == i + 1
+
+    assert history.last_seq == 20
+    assert history.size <= 1200
+    assert [entry.seq for entry in history.since(17)] == [18, 19, 20]
+    assert history.since(20) == []
+    # gap is not kept, or sequence number is ahead
+    assert history.since(1) is None
+    assert history.since(21) is None
+
+    first = history.since(history.last_seq - len(history))
+    assert [entry.seq for entry in first] == list(range(21 - len(history), 21))
+
+
+@pytest.mark.asyncio
+async def test_subscriber_resumes():
+    broadcaster = Broadcaster()
+    live = FakeWebSocket()
+    await broadcaster.subscribe(live, ["news.*"])
+
+    broadcaster.publish("first", "news.a")
+    broadcaster.publish("skipped", "sport")
+    broadcaster.publish("second", "news.b")
+    broadcaster.publish(b"\x01", "news.c")
+    await settle()
+
+    assert live.received == ["first", "second", b"\x01"]
+
+    ws = FakeWebSocket()
+    await broadcaster.subscribe(ws, ["news.*"], last_seq=1, epoch=broadcaster.epoch)
+    broadcaster.publish("third", "news.d")
+    await settle()
+
+    control, *texts, binary, live_text = ws.received
+    assert json.loads(control) == {
+        "action": "resumed",
+        "epoch": broadcaster.epoch,
+        "seq": 1,
+    }
+    assert [json.loads(text) for text in texts] == [
+        {"seq": 3, "topic": "news.b", "text": "second"}
+    ]
+    assert binary == struct.pack("!QH", 4, 6) + b"news.c" + b"\x01"
+    assert json.loads(live_text) == {"seq": 5, "topic": "news.d", "text": "third"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("overflow", list(Overflow))
+async def test_replay_is_not_limited_by_backlog(overflow: Overflow):
+    broadcaster = Broadcaster(queue_size=4, overflow=overflow)
+    for i in range(10):
+        broadcaster.publish(f"missed {i}")
+
+    ws = FakeWebSocket(stalled=True)
+    await broadcaster.subscribe(ws, last_seq=0)
+    broadcaster.publish("live")
+    await settle()
+
+    ws.released.set()
+    await settle()
+
+    assert json.loads(ws.received[0])["action"] == "resumed"
+    assert [json.loads(message)["text"] for message in ws.received[1:]] == [
+        *(f"missed {i}" for i in range(10)),
+        "live",
+    ]
+    assert ws.closed_with is None
+    assert broadcaster.stats.dropped == broadcaster.stats.disconnected == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("last_seq", "epoch"),
+    [(0, None), (1, "other"), (10, None)],
+    ids=["evicted", "other_epoch", "ahead"],
+)
+async def test_subscriber_reset(last_seq: int, epoch: str | None):
+    broadcaster = Broadcaster(history=History(max_bytes=200))
+    for i in range(3):
+        broadcaster.publish(f"message {i}")
+
+    ws = FakeWebSocket()
+    await broadcaster.subscribe(ws, last_seq=last_seq, epoch=epoch)
+    await settle()
+
+    assert [json.loads(message) for message in ws.received] == [
+        {"action": "reset", "epoch": broadcaster.epoch, "seq": 3}
+    ]
+
+
+def test_resume_over_socket():
+    with TestClient(server.app) as client:
+        with client.websocket_connect("/subscribe?topic=resume&last_seq=0") as ws:
+            control = json.loads(ws.receive_text())
+            assert control["action"] in ("resumed", "reset")
+
+        seq = server.broadcaster.history.last_seq
+        client.post("/publish", content="missed", params={"topic": "resume"})
+
+        with client.websocket_connect(
+            "/subscribe",
+            params={
+                "topic": "resume",
+                "last_seq": seq,
+                "epoch": server.broadcaster.epoch,
+            },
+        ) as ws:
+            assert json.loads(ws.receive_text())["action"] == "resumed"
+            assert json.loads(ws.receive_text()) == {
+                "seq": seq + 1,
+                "topic": "resume",
+                "text": "missed",
+            }
+
+
+def recorder() -> tuple[list[tuple[Any, str]], Callable[[Any, str], None]]:
+    received = []
+    return received, lambda message, topic: received.append((message, topic))
+
+
+@pytest.mark.asyncio
+async def test_bus_relays_between_workers(tmp_path: Path):
+    path = str(tmp_path / "bus.sock")
+    (a, deliver_a), (b, deliver_b), (c, deliver_c) = (recorder() for _ in range(3))
+    buses = [Bus(path, deliver) for deliver in [deliver_a, deliver_b, deliver_c]]
+    for bus in buses:
+        await bus.start()
+
+    assert [bus.is_hub for bus in buses] == [True, False, False]
+
+    for i in range(100):
+        buses[1].send(str(i), "numbers")
+    buses[2].send(b"\x00\xff", "binary")
+    await eventually(lambda: len(a) == 101 and len(c) == 100 and len(b) == 1)
+
+    # messages of one publisher keep their order, and publisher does not get
+    # its own messages back
+    assert a[:100] == c == [(str(i), "numbers") for i in range(100)]
+    assert a[100] == b[0] == (b"\x00\xff", "binary")
+
+    for bus in buses:
+        await bus.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_survives_failed_delivery(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+):
+    path = str(tmp_path / "bus.sock")
+    received, record = recorder()
+
+    def deliver(message: Any, topic: str) -> None:
+        if message == "fails":
+            raise RuntimeError(message)
+        record(message, topic)
+
+    hub, worker = Bus(path, print), Bus(path, deliver)
+    for bus in [hub, worker]:
+        await bus.start()
+
+    hub.send("fails", "general")
+    hub.send("after failure", "general")
+    await eventually(lambda: len(received) == 1)
+
+    assert received == [("after failure", "general")]
+    assert worker.stats.received == 2
+    assert worker.stats.reconnects == 0
+    assert "Failed to deliver" in caplog.text
+
+    await worker.close()
+    await hub.close()
+
+
+@pytest.mark.asyncio
+async def test_bus_hub_failover(tmp_path: Path):
+    path = str(tmp_path / "bus.sock")
+    (b, deliver_b), (c, deliver_c) = recorder(), recorder()
+    hub, second, third = Bus(path, print), Bus(path, deliver_b), Bus(path, deliver_c)
+    for bus in [hub, second, third]:
+        await bus.start()
+
+    await hub.close()
+    await eventually(lambda: second.stats.reconnects == third.stats.reconnects == 1)
+    await second.wait_connected()
+    await third.wait_connected()
+
+    assert second.is_hub != third.is_hub
+
+    second.send("after failover", "general")
+    await eventually(lambda: len(c) == 1)
+
+    assert c == [("after failover", "general")]
+    assert b == []
+
+    await second.close()
+    await third.close()
+
+
+@pytest.mark.asyncio
+async def test_broadcasters_share_bus(tmp_path: Path):
+    path = str(tmp_path / "bus.sock")
+    broadcasters = [Broadcaster(), Broadcaster()]
+    buses = []
+    sockets = []
+
+    for broadcaster in broadcasters:
+        bus = Bus(path, broadcaster.publish_local)
+        await bus.start()
+        broadcaster.relay = bus.send
+        buses.append(bus)
+
+        ws = FakeWebSocket()
+        await broadcaster.subscribe(ws, ["news.*"])
+        sockets.append(ws)
+
+    broadcasters[0].publish("sport", "news.sport")
+    broadcasters[1].publish(b"weather", "weather")
+    await eventually(lambda: len(sockets[1].received) == 1)
+    await settle()
+
+    assert sockets[0].received == sockets[1].received == ["sport"]
+
+    for bus in buses:
+        await bus.close()
+
+
+def test_server_uses_bus(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("WS_BUS_PATH", str(tmp_path / "bus.sock"))
+
+    with TestClient(server.app) as client:
+        assert server.broadcaster.relay is not None
+        assert client.post("/publish", content="hello").status_code == HTTPStatus.OK
+
+    assert server.broadcaster.relay is None